@@ -1,33 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import DISCONNECT_POLL_INTERVAL
 from database.base import get_async_session
 from domain.auth.auth_service import WildberriesAuthService
+from domain.auth.executor import BrowserBusy, browser_executor
 from domain.auth.schemas import (
     UserWithCookiesResponse,
     RequestAuthRequest, RequestAuthResponse, ConfirmAuthRequest,
     ConfirmAuthResponse,
-    BookResponse, BookRequest
+    BookResponse, BookRequest,
+    BatchBookRequest, BatchBookResult,
+    WatchResponse, JobResponse
 )
+from domain.auth.slot_watcher import WatchLimitReached, PhoneAlreadyWatched
 
 router = APIRouter(prefix="/auth", tags=["Авторизация"])
 
 
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[Any]) -> Any:
+    """Выполнить сценарий, отменив его, если клиент закрыл соединение"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print("Клиент отключился, отменяем сценарий", request.url.path)
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Клиент закрыл соединение")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def browser_busy(e: BrowserBusy) -> HTTPException:
+    """429: все браузеры заняты, клиент повторит запрос через Retry-After секунд"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def accept_job(request: Request, kind: str, phone: str,
+               call: Callable[[WildberriesAuthService], Awaitable[Dict]]) -> JSONResponse:
+    """Запустить сценарий фоновой задачей: 202 с ее состоянием, результат — в GET /jobs/{id}"""
+    browser_executor.ensure_capacity(kind)
+    job = WildberriesAuthService.start_job(kind, phone, call)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=JobResponse(**job.info()).model_dump(mode="json"),
+        headers={"Location": str(request.url_for("get_job", job_id=job.id))},
+    )
+
+
 @router.post("/request", response_model=RequestAuthResponse)
 async def request_auth(
     auth_data: RequestAuthRequest,
+    request: Request,
+    job: bool = Query(False, description="Не ждать сценарий: вернуть id фоновой задачи (202)"),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Запрос кода авторизации (первый этап)"""
     try:
+        WildberriesAuthService.ensure_not_watched(auth_data.phone)
+        if job:
+            return accept_job(request, "request_auth", auth_data.phone,
+                              lambda service: service.request_auth(phone=auth_data.phone))
+
         auth_service = WildberriesAuthService(session)
 
-        result = await auth_service.request_auth(
+        result = await cancel_on_disconnect(request, auth_service.request_auth(
             phone=auth_data.phone
-        )
+        ))
 
         return RequestAuthResponse(**result)
 
+    except PhoneAlreadyWatched:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Для этого телефона идет наблюдение за слотами: остановите его перед новым входом"
+        )
+    except BrowserBusy as e:
+        raise browser_busy(e)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -38,19 +101,33 @@ async def request_auth(
 @router.post("/confirm", response_model=ConfirmAuthResponse)
 async def confirm_auth(
     auth_data: ConfirmAuthRequest,
+    request: Request,
+    job: bool = Query(False, description="Не ждать сценарий: вернуть id фоновой задачи (202)"),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Подтверждение авторизации (второй этап)"""
     try:
+        if job:
+            return accept_job(request, "confirm_auth", auth_data.phone, lambda service: service.confirm_auth(
+                phone=auth_data.phone,
+                verification_code=auth_data.verification_code,
+                user_id=auth_data.user_id,
+            ))
+
         auth_service = WildberriesAuthService(session)
 
-        result = await auth_service.confirm_auth(
+        result = await cancel_on_disconnect(request, auth_service.confirm_auth(
             phone=auth_data.phone,
             verification_code=auth_data.verification_code,
-        )
+            user_id=auth_data.user_id,
+        ))
 
         return ConfirmAuthResponse(**result)
 
+    except BrowserBusy as e:
+        raise browser_busy(e)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -61,12 +138,13 @@ async def confirm_auth(
 @router.get("/users/{phone}", response_model=UserWithCookiesResponse)
 async def get_user_with_cookies(
     phone: int,
+    user_id: Optional[int] = Query(None, description="Проверить и сохраненные куки пользователя"),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Получить пользователя с куками"""
     try:
         auth_service = WildberriesAuthService(session)
-        success = phone in auth_service._active_sessions
+        success = await auth_service.is_logged_in(str(phone), user_id)
 
         return UserWithCookiesResponse(
             success=success
@@ -84,13 +162,20 @@ async def get_user_with_cookies(
 @router.post("/book", response_model=BookResponse)
 async def book(
     book_data: BookRequest,
+    request: Request,
+    job: bool = Query(False, description="Не ждать сценарий: вернуть id фоновой задачи (202)"),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Получить куки пользователя"""
     # try:
 
     auth_service = WildberriesAuthService(session)
-    result = await auth_service.book(book_data)
+    try:
+        if job:
+            return accept_job(request, "book", book_data.phone, lambda service: service.book(book_data))
+        result = await cancel_on_disconnect(request, auth_service.book(book_data))
+    except BrowserBusy as e:
+        raise browser_busy(e)
     return BookResponse(**result)
 
     # except Exception as e:
@@ -98,3 +183,69 @@ async def book(
     #         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
     #         detail=f"Ошибка сервера: {str(e)}"
     #     )
+
+
+@router.post("/book/batch", response_class=StreamingResponse)
+async def book_batch(batch: BatchBookRequest):
+    """Пакетное бронирование: результаты приходят построчно (NDJSON) по мере готовности"""
+
+    async def stream():
+        async for result in WildberriesAuthService.book_batch(batch.bookings):
+            yield BatchBookResult(**result).model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/watch", response_model=WatchResponse)
+async def watch_slot(
+        book_data: BookRequest,
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Наблюдать за календарем поставки и забронировать дату, как только появится слот"""
+    auth_service = WildberriesAuthService(session)
+    try:
+        watch = await auth_service.watch_slot(book_data)
+    except WatchLimitReached as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Запущено максимальное число наблюдателей: {e}"
+        )
+    except PhoneAlreadyWatched:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Для этого телефона уже запущено наблюдение за другой поставкой"
+        )
+    return WatchResponse(**watch.info())
+
+
+@router.get("/watch", response_model=List[WatchResponse])
+async def list_watches(session: AsyncSession = Depends(get_async_session)):
+    """Активные и недавно завершенные наблюдения"""
+    auth_service = WildberriesAuthService(session)
+    return [WatchResponse(**watch.info()) for watch in auth_service.list_watches()]
+
+
+@router.get("/watch/{watch_id}", response_model=WatchResponse)
+async def get_watch(watch_id: str, session: AsyncSession = Depends(get_async_session)):
+    """Состояние наблюдения"""
+    auth_service = WildberriesAuthService(session)
+    watch = auth_service.get_watch(watch_id)
+    if not watch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Наблюдение не найдено"
+        )
+    return WatchResponse(**watch.info())
+
+
+@router.delete("/watch/{watch_id}", response_model=WatchResponse)
+async def cancel_watch(watch_id: str, session: AsyncSession = Depends(get_async_session)):
+    """Остановить наблюдение и закрыть его браузер"""
+    auth_service = WildberriesAuthService(session)
+    watch = await auth_service.cancel_watch(watch_id)
+    if not watch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Наблюдение не найдено"
+        )
+    return WatchResponse(**watch.info())
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from config import JOB_EVENTS_KEEPALIVE
+from domain.auth.auth_service import WildberriesAuthService
+from domain.auth.jobs import Job
+from domain.auth.schemas import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["Фоновые задачи"])
+
+
+def find_job(job_id: str) -> Job:
+    job = WildberriesAuthService.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена или уже удалена"
+        )
+    return job
+
+
+def job_event(job: Job) -> str:
+    return f"event: {job.status}\ndata: {JobResponse(**job.info()).model_dump_json()}\n\n"
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Состояние фоновой задачи и результат сценария, когда она завершится"""
+    return JobResponse(**find_job(job_id).info())
+
+
+@router.get("/{job_id}/events", response_class=StreamingResponse)
+async def job_events(job_id: str):
+    """
+    Поток событий (SSE): текущее состояние задачи сразу и итоговое при завершении,
+    между ними — keep-alive, чтобы прокси не закрывали соединение
+    """
+    job = find_job(job_id)
+
+    async def stream():
+        yield job_event(job)
+        if job.finished:
+            return
+        while not await WildberriesAuthService.wait_job(job, JOB_EVENTS_KEEPALIVE):
+            yield ": keep-alive\n\n"
+        yield job_event(job)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@router.delete("/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Отменить фоновую задачу (браузерный сценарий останавливается между шагами)"""
+    find_job(job_id)
+    job = await WildberriesAuthService.cancel_job(job_id)
+    return JobResponse(**job.info())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска даты в календаре поставки: старый вложенный цикл по tr/td/span
+против одного вызова execute_script (domain/auth/supply_calendar.py).
+
+Запуск из корня проекта:
+    python -m benchmarks.calendar_lookup --runs 20
+"""
+
+import argparse
+import time
+from datetime import date
+
+from selenium.webdriver.common.by import By
+
+from benchmarks.common import CommandCounter, fixture_url, local_chrome, summarize
+from domain.auth.supply_calendar import find_date_cell
+
+MONTH_NAMES = [
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря"
+]
+
+
+def legacy_lookup(driver, target_date: str):
+    """Поиск ячейки так, как это делал book() до перехода на execute_script"""
+    rows = driver.find_elements(By.TAG_NAME, "tr")
+    for row in rows:
+        items = row.find_elements(By.TAG_NAME, "td")
+        for item in items:
+            spans = item.find_elements(By.TAG_NAME, "span")
+            if spans and target_date in spans[0].text:
+                driver.execute_script("arguments[0].scrollIntoView(true);", item)
+                popup_divs = item.find_elements(By.CSS_SELECTOR, "div.Custom-popup")
+                if popup_divs:
+                    return item, item.find_elements(By.TAG_NAME, "button")[-1]
+    return None
+
+
+def measure(driver, counter: CommandCounter, lookup, target_date: str, runs: int):
+    samples = []
+    commands = 0
+    for _ in range(runs):
+        counter.reset()
+        start = time.perf_counter()
+        found = lookup(driver, target_date)
+        samples.append(time.perf_counter() - start)
+        commands = counter.count
+        assert found is not None, f"Дата {target_date} не найдена в фикстуре"
+    return {**summarize(samples), "webdriver_calls": commands}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--day", type=int, default=28, help="День месяца (ближе к концу — худший случай)")
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+
+    today = date.today()
+    target_date = f"{args.day} {MONTH_NAMES[today.month - 1]}"
+
+    with local_chrome(headless=not args.headed) as driver:
+        driver.get(fixture_url("supply_calendar.html", year=today.year, month=today.month, every=2))
+        counter = CommandCounter(driver)
+
+        print(f"🗓  Ищем '{target_date}', прогонов: {args.runs}")
+        legacy = measure(driver, counter, legacy_lookup, target_date, args.runs)
+        single = measure(driver, counter, find_date_cell, target_date, args.runs)
+
+    print(f"Вложенный цикл:  {legacy}")
+    print(f"execute_script:  {single}")
+    print(f"Ускорение p50: x{legacy['p50_ms'] / max(single['p50_ms'], 0.01):.1f}")
+
+
+if __name__ == "__main__":
+    main()
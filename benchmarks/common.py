@@ -0,0 +1,73 @@
+"""
+Общие утилиты бенчмарков: локальный headless Chrome, фикстуры, статистика
+"""
+
+import os
+import statistics
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+from urllib.parse import urlencode
+
+from selenium import webdriver
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def fixture_url(name: str, **params) -> str:
+    """file:// URL фикстуры с параметрами в query string"""
+    url = (FIXTURES_DIR / name).resolve().as_uri()
+    if params:
+        url += "?" + urlencode(params)
+    return url
+
+
+@contextmanager
+def local_chrome(headless: bool = True) -> Iterator[webdriver.Chrome]:
+    """Локальный Chrome для бенчмарков (путь к chromedriver — из CHROMEDRIVER, если задан)"""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1200,800")
+    service = webdriver.ChromeService(executable_path=os.getenv("CHROMEDRIVER")) if os.getenv("CHROMEDRIVER") \
+        else webdriver.ChromeService()
+    driver = webdriver.Chrome(options=options, service=service)
+    try:
+        yield driver
+    finally:
+        driver.quit()
+
+
+class CommandCounter:
+    """Считает HTTP-запросы (команды) драйвера к WebDriver"""
+
+    def __init__(self, driver):
+        self.count = 0
+        self._execute = driver.execute
+
+        def execute(command, params=None):
+            self.count += 1
+            return self._execute(command, params)
+
+        driver.execute = execute
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/среднее в миллисекундах"""
+    return {
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
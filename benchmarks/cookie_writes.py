@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк записи куки: старый путь (удалить все + create_cookie на каждую куку)
+против CookieRepository.upsert_cookies. Нужна база из DB_URL с примененными миграциями.
+
+Запуск из корня проекта:
+    python -m benchmarks.cookie_writes --sizes 40 200 1000 --runs 5
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import summarize
+from database.base import async_session_maker
+from database.repositories import DatabaseManager
+
+BENCH_USER_ID = 990000000001
+
+
+def make_jar(size: int, generation: int):
+    expire_date = datetime.utcnow() + timedelta(days=30)
+    return [
+        {'name': f'cookie_{i}', 'value': f'value_{generation}_{i}' * 8, 'expire_date': expire_date}
+        for i in range(size)
+    ]
+
+
+async def legacy_write(db: DatabaseManager, jar):
+    await db.cookies.delete_all_cookies_by_user(BENCH_USER_ID)
+    for cookie in jar:
+        await db.cookies.create_cookie(
+            user_id=BENCH_USER_ID,
+            name=cookie['name'],
+            value=cookie['value'],
+            expire_date=cookie['expire_date'],
+        )
+
+
+async def upsert_write(db: DatabaseManager, jar):
+    await db.cookies.upsert_cookies(BENCH_USER_ID, jar)
+
+
+async def measure(db: DatabaseManager, write, size: int, runs: int):
+    samples = []
+    for generation in range(runs):
+        jar = make_jar(size, generation)
+        start = time.perf_counter()
+        await write(db, jar)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40, 200, 1000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    async with async_session_maker() as session:
+        db = DatabaseManager(session)
+        if not await db.users.get_user_by_id(BENCH_USER_ID):
+            await db.users.create_user(BENCH_USER_ID)
+
+        try:
+            for size in args.sizes:
+                legacy = await measure(db, legacy_write, size, args.runs)
+                upsert = await measure(db, upsert_write, size, args.runs)
+                print(f"🍪 {size} куки")
+                print(f"   delete + create_cookie: {legacy}")
+                print(f"   upsert_cookies:         {upsert}")
+        finally:
+            await db.users.delete_user(BENCH_USER_ID)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Локальный фейковый кабинет Wildberries для бенчмарков и отладки браузерных сценариев.
+
+Страницы повторяют селекторы, с которыми работают request_code, verify_code и book:
+поле номера, выпадающий список кодов стран, поля ввода кода, кнопка "Запланировать"
+и календарь поставки. Задержки и режимы ошибок настраиваются.
+
+Запуск из корня проекта:
+    python -m benchmarks.fake_wb_site --port 8200 --mode ok --code-screen-delay 300
+и в .env сервиса:
+    WB_AUTH_URL=http://127.0.0.1:8200/ru/
+    WB_SELLER_URL=http://127.0.0.1:8200
+
+Режимы (--mode):
+    ok                 — все сценарии проходят (код из SMS — --code, по умолчанию 123456)
+    cooldown           — после отправки номера показывается "Запрос кода возможен через"
+    wrong_code         — любой код отклоняется
+    not_authenticated  — страница поставки перенаправляет на авторизацию
+    no_slot            — в календаре нет доступных дат
+    transfer_missing   — после выбора даты не появляется кнопка "Перенести"
+
+С --assets N страницы, как настоящее SPA, тянут N картинок, шрифты и счетчики аналитики
+(/fake-wb/tracker/...): на них измеряется блокировка запросов (benchmarks/resource_blocking.py).
+Сервер считает отданные запросы и байты (FakeWbSite.served).
+"""
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "fake_wb"
+
+MODES = ("ok", "cooldown", "wrong_code", "not_authenticated", "no_slot", "transfer_missing")
+
+AUTH_PATH = "/ru/"
+SUPPLY_DETAIL_PATH = "/supplies-management/all-supplies/supply-detail"
+ASSETS_PATH = "/fake-wb/assets/"
+TRACKER_PATH = "/fake-wb/tracker/"
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "woff2": "font/woff2",
+    "js": "application/javascript",
+    "gif": "image/gif",
+}
+
+
+@dataclass
+class FakeSiteSettings:
+    """Поведение фейкового сайта; можно менять на лету между прогонами"""
+    mode: str = "ok"
+    code: str = "123456"
+    # Задержки, миллисекунды
+    page_delay_ms: int = 0           # ответ сервера на загрузку страницы
+    code_screen_delay_ms: int = 200  # от отправки номера до экрана ввода кода
+    code_result_delay_ms: int = 200  # от ввода кода до входа или ошибки
+    calendar_delay_ms: int = 200     # от нажатия "Запланировать" до календаря
+    transfer_delay_ms: int = 100     # от выбора даты до кнопки "Перенести"
+    cooldown_seconds: int = 59
+    # Попап с кнопкой "Принимаю", который закрывает close_popups
+    terms_popup: bool = False
+    # Доступен каждый N-й день месяца
+    slot_every: int = 2
+    # Тяжелые ресурсы страниц: картинки (и к ним два шрифта и счетчики), размер и задержка ответа
+    assets: int = 0
+    asset_kb: int = 64
+    asset_delay_ms: int = 0
+
+
+class FakeWbSite:
+    """HTTP-сервер фейкового кабинета в фоновом потоке"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, settings: Optional[FakeSiteSettings] = None):
+        self.settings = settings or FakeSiteSettings()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def auth_url(self) -> str:
+        return self.base_url + AUTH_PATH
+
+    def served(self) -> Dict[str, int]:
+        """Сколько запросов и байт тела отдано с последнего reset_counters"""
+        with self._lock:
+            return {"requests": self.requests, "bytes": self.bytes_sent}
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        path = urlparse(request.path).path
+        settings = self.settings
+        if path == "/fake-wb/config.js":
+            body = f"window.FAKE_WB = {json.dumps(asdict(settings))};"
+            return self._send(request, 200, body.encode(), "application/javascript")
+        if path.startswith((ASSETS_PATH, TRACKER_PATH)):
+            return self._send_asset(request, path)
+
+        if settings.page_delay_ms:
+            time.sleep(settings.page_delay_ms / 1000)
+
+        if path == AUTH_PATH:
+            return self._send_page(request, "auth.html")
+        if path == SUPPLY_DETAIL_PATH:
+            if settings.mode == "not_authenticated":
+                request.send_response(302)
+                request.send_header("Location", AUTH_PATH)
+                request.end_headers()
+                return
+            return self._send_page(request, "supply_detail.html")
+        if path == "/":
+            return self._send_page(request, "home.html")
+        self._send(request, 404, b"not found", "text/plain")
+
+    def _send_page(self, request: BaseHTTPRequestHandler, name: str) -> None:
+        body = (PAGES_DIR / name).read_bytes()
+        if self.settings.assets:
+            body = body.replace(b"</body>", self._assets_markup().encode() + b"</body>")
+        self._send(request, 200, body, "text/html; charset=utf-8")
+
+    def _assets_markup(self) -> str:
+        """Картинки, шрифты и счетчики, как у настоящего кабинета (только грузятся, на сценарии не влияют)"""
+        fonts = "".join(
+            f'@font-face {{ font-family: "FakeWb{i}"; src: url({ASSETS_PATH}font-{i}.woff2); }}' for i in range(2)
+        )
+        images = "".join(
+            f'<img src="{ASSETS_PATH}img-{i}.png" width="1" height="1" alt="">' for i in range(self.settings.assets)
+        )
+        return (
+            f'<style>{fonts}</style>'
+            f'<div id="fake-assets" style="position: absolute; left: -1000px;">{images}'
+            f'<span style="font-family: FakeWb0">Aa</span><span style="font-family: FakeWb1">Aa</span></div>'
+            f'<script src="{TRACKER_PATH}tag.js" async></script>'
+            f'<img src="{TRACKER_PATH}pixel.gif?event=pageview" width="1" height="1" alt="">'
+        )
+
+    def _send_asset(self, request: BaseHTTPRequestHandler, path: str) -> None:
+        settings = self.settings
+        if settings.asset_delay_ms:
+            time.sleep(settings.asset_delay_ms / 1000)
+        extension = path.rsplit(".", 1)[-1]
+        if path.startswith(TRACKER_PATH):
+            # Счетчик: небольшой скрипт или пиксель
+            body = b"/* tracker */" if extension == "js" else b"GIF89a" + bytes(36)
+        else:
+            body = bytes(settings.asset_kb * 1024)
+        self._send(request, 200, body, CONTENT_TYPES.get(extension, "application/octet-stream"))
+
+    def _send(self, request: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(body)
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        request.wfile.write(body)
+
+    def start(self) -> "FakeWbSite":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-wb-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeWbSite":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--mode", choices=MODES, default="ok")
+    parser.add_argument("--code", default="123456")
+    parser.add_argument("--page-delay", type=int, default=0, help="мс")
+    parser.add_argument("--code-screen-delay", type=int, default=200, help="мс")
+    parser.add_argument("--code-result-delay", type=int, default=200, help="мс")
+    parser.add_argument("--calendar-delay", type=int, default=200, help="мс")
+    parser.add_argument("--transfer-delay", type=int, default=100, help="мс")
+    parser.add_argument("--terms-popup", action="store_true")
+    parser.add_argument("--assets", type=int, default=0, help="Картинок на странице (0 — без тяжелых ресурсов)")
+    parser.add_argument("--asset-kb", type=int, default=64)
+    parser.add_argument("--asset-delay", type=int, default=0, help="мс")
+    args = parser.parse_args()
+
+    settings = FakeSiteSettings(
+        mode=args.mode,
+        code=args.code,
+        page_delay_ms=args.page_delay,
+        code_screen_delay_ms=args.code_screen_delay,
+        code_result_delay_ms=args.code_result_delay,
+        calendar_delay_ms=args.calendar_delay,
+        transfer_delay_ms=args.transfer_delay,
+        terms_popup=args.terms_popup,
+        assets=args.assets,
+        asset_kb=args.asset_kb,
+        asset_delay_ms=args.asset_delay,
+    )
+    site = FakeWbSite(args.host, args.port, settings).start()
+    print(f"Фейковый кабинет: WB_AUTH_URL={site.auth_url} WB_SELLER_URL={site.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Локальный mock API управления поставками для проверки HTTP-бронирования.
+
+Запуск из корня проекта:
+    MOCK_LATENCY_MS=50 uvicorn benchmarks.mock_supply_api:app --port 8100
+и в .env сервиса:
+    SUPPLY_API_URL=http://127.0.0.1:8100
+
+Запрос считается авторизованным, если в Cookie есть кука MOCK_AUTH_COOKIE (по умолчанию WBTokenV3).
+Дата недоступна, если ее день входит в MOCK_BUSY_DAYS (через запятую).
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = int(os.getenv("MOCK_LATENCY_MS", "0")) / 1000
+AUTH_COOKIE = os.getenv("MOCK_AUTH_COOKIE", "WBTokenV3")
+BUSY_DAYS = {int(day) for day in os.getenv("MOCK_BUSY_DAYS", "").split(",") if day}
+
+app = FastAPI(title="Mock supply-management API")
+bookings = {}
+
+
+@app.post("/{method}")
+async def rpc(method: str, request: Request):
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+    if f"{AUTH_COOKIE}=" not in request.headers.get("cookie", ""):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    body = await request.json()
+    reply = {"jsonrpc": "2.0", "id": body.get("id")}
+    if method != "updatePlanDate":
+        reply["error"] = {"code": -32601, "message": f"Неизвестный метод {method}"}
+        return reply
+
+    params = body.get("params", {})
+    delivery_date = datetime.fromisoformat(params["deliveryDate"].replace("Z", "+00:00"))
+    if delivery_date.day in BUSY_DAYS:
+        reply["error"] = {"code": 409, "message": "Дата недоступна для поставки"}
+        return reply
+
+    bookings[params["supplyId"]] = params["deliveryDate"]
+    reply["result"] = {"supplyId": params["supplyId"], "deliveryDate": params["deliveryDate"]}
+    return reply
+
+
+@app.get("/bookings")
+async def list_bookings():
+    """Что успели забронировать (для проверки)"""
+    return bookings
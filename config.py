@@ -8,3 +8,145 @@ load_dotenv()
 DB_URL = os.environ["DB_URL"]
 
 PORT = int(os.environ["PORT"])
+
+# Адреса кабинета Wildberries (для бенчмарков можно указать локальный фейковый сайт)
+WB_AUTH_URL = os.getenv("WB_AUTH_URL", "https://seller-auth.wildberries.ru/ru/")
+WB_SELLER_URL = os.getenv("WB_SELLER_URL", "https://seller.wildberries.ru").rstrip("/")
+
+# Пул потоков для Selenium-сценариев
+BROWSER_MAX_WORKERS = int(os.getenv("BROWSER_MAX_WORKERS", "8"))
+# Очередь к браузерам: не больше BROWSER_QUEUE_MAX ждущих сценариев и не дольше BROWSER_QUEUE_TIMEOUT
+# секунд, иначе 429 с Retry-After. Порядок в очереди: confirm, request, book, наблюдатели
+BROWSER_QUEUE_MAX = int(os.getenv("BROWSER_QUEUE_MAX", "32"))
+BROWSER_QUEUE_TIMEOUT = float(os.getenv("BROWSER_QUEUE_TIMEOUT", "60"))
+# Как часто проверять, не отключился ли клиент (секунды)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "1.0"))
+
+# Selenium Grid и профили Chrome
+SELENIUM_GRID_URL = os.getenv("SELENIUM_GRID_URL", "http://127.0.0.1:4444/wd/hub")
+CHROME_PROFILE_ROOT = os.getenv("CHROME_PROFILE_ROOT", "/chrome_profile")
+# Бэкенд браузера: grid — Selenium Grid, fake — фейковый драйвер для нагрузочных тестов
+WEBDRIVER_BACKEND = os.getenv("WEBDRIVER_BACKEND", "grid").lower()
+
+# Фейковый драйвер (WEBDRIVER_BACKEND=fake): задержки в миллисекундах и режим страницы
+FAKE_DRIVER_MODE = os.getenv("FAKE_DRIVER_MODE", "ok")
+FAKE_DRIVER_CREATE_MS = int(os.getenv("FAKE_DRIVER_CREATE_MS", "1500"))
+FAKE_DRIVER_COMMAND_MS = int(os.getenv("FAKE_DRIVER_COMMAND_MS", "20"))
+FAKE_DRIVER_NAVIGATION_MS = int(os.getenv("FAKE_DRIVER_NAVIGATION_MS", "500"))
+FAKE_DRIVER_REACTION_MS = int(os.getenv("FAKE_DRIVER_REACTION_MS", "300"))
+
+# Бэкенд сценариев авторизации и бронирования: webdriver — Selenium в пуле потоков,
+# cdp — асинхронный Chrome DevTools Protocol (локальный Chrome, без потоков)
+BROWSER_BACKEND = os.getenv("BROWSER_BACKEND", "webdriver").lower()
+CHROME_BINARY = os.getenv("CHROME_BINARY", "google-chrome")
+CDP_HEADLESS = os.getenv("CDP_HEADLESS", "true").lower() == "true"
+# Таймауты CDP (секунды): запуск Chrome, одна команда, загрузка страницы
+CDP_LAUNCH_TIMEOUT = float(os.getenv("CDP_LAUNCH_TIMEOUT", "20"))
+CDP_COMMAND_TIMEOUT = float(os.getenv("CDP_COMMAND_TIMEOUT", "30"))
+CDP_NAVIGATION_TIMEOUT = float(os.getenv("CDP_NAVIGATION_TIMEOUT", "30"))
+
+# Фоновые задачи сценариев (?job=true): сколько завершенных хранить и как долго (секунды)
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "3600"))
+# Как часто слать keep-alive в потоке событий задачи (секунды)
+JOB_EVENTS_KEEPALIVE = float(os.getenv("JOB_EVENTS_KEEPALIVE", "15"))
+
+# Блокировка запросов, не нужных сценариям (картинки, шрифты, медиа, аналитика).
+# Сценарии, в которых блокировать: request_auth, book, watch
+RESOURCE_BLOCKING_ENABLED = os.getenv("RESOURCE_BLOCKING_ENABLED", "true").lower() == "true"
+RESOURCE_BLOCKING_FLOWS = os.getenv("RESOURCE_BLOCKING_FLOWS", "request_auth,book,watch")
+# Дополнительные шаблоны URL через запятую (* — любые символы) и исключения из блокировки
+RESOURCE_BLOCK_PATTERNS = os.getenv("RESOURCE_BLOCK_PATTERNS", "")
+RESOURCE_ALLOW_PATTERNS = os.getenv("RESOURCE_ALLOW_PATTERNS", "*captcha*")
+# В WebDriver исключения не работают (блокировка без перехвата запросов), поэтому там блокировка
+# включается только в сценариях из этого списка. В request_auth она бы закрыла картинку капчи
+RESOURCE_BLOCKING_DRIVER_FLOWS = os.getenv("RESOURCE_BLOCKING_DRIVER_FLOWS", "book,watch")
+
+# Пул заранее запущенных драйверов
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+# Открывать страницу авторизации в прогретом драйвере
+DRIVER_POOL_WARMUP = os.getenv("DRIVER_POOL_WARMUP", "true").lower() == "true"
+# Через сколько секунд простоя прогретый драйвер пересоздается
+DRIVER_POOL_MAX_AGE = int(os.getenv("DRIVER_POOL_MAX_AGE", "600"))
+
+# Ожидания в браузерных сценариях (секунды)
+WAIT_POLL_INTERVAL = float(os.getenv("WAIT_POLL_INTERVAL", "0.1"))
+CODE_SCREEN_TIMEOUT = float(os.getenv("CODE_SCREEN_TIMEOUT", "15"))
+CODE_RESULT_TIMEOUT = float(os.getenv("CODE_RESULT_TIMEOUT", "10"))
+CODE_DIGIT_DELAY = float(os.getenv("CODE_DIGIT_DELAY", "0"))
+BOOK_MODAL_TIMEOUT = float(os.getenv("BOOK_MODAL_TIMEOUT", "10"))
+
+# Хранилище сессий авторизации: memory или redis
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Через сколько секунд ожидающая SMS-кода сессия считается истекшей
+SESSION_TTL = int(os.getenv("SESSION_TTL", "600"))
+
+# Кэш куки пользователей: memory, redis или off
+COOKIE_CACHE_BACKEND = os.getenv("COOKIE_CACHE_BACKEND", "memory")
+COOKIE_CACHE_TTL = int(os.getenv("COOKIE_CACHE_TTL", "60"))
+COOKIE_CACHE_MAX_ENTRIES = int(os.getenv("COOKIE_CACHE_MAX_ENTRIES", "1000"))
+COOKIE_CACHE_MAX_BYTES = int(os.getenv("COOKIE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Фоновая очистка истекших куки
+COOKIE_PURGE_INTERVAL = int(os.getenv("COOKIE_PURGE_INTERVAL", "3600"))
+COOKIE_PURGE_BATCH_SIZE = int(os.getenv("COOKIE_PURGE_BATCH_SIZE", "1000"))
+# Пауза между пачками, чтобы не держать таблицу занятой (секунды)
+COOKIE_PURGE_PAUSE = float(os.getenv("COOKIE_PURGE_PAUSE", "0.1"))
+
+# Профили Chrome: шаблон, способ клонирования (auto, reflink, hardlink, copy) и квота на диск
+PROFILE_TEMPLATE_DIR = os.getenv("PROFILE_TEMPLATE_DIR", os.path.join(CHROME_PROFILE_ROOT, "_template"))
+PROFILE_CLONE_MODE = os.getenv("PROFILE_CLONE_MODE", "auto")
+# 0 — без ограничения
+PROFILE_QUOTA_MB = int(os.getenv("PROFILE_QUOTA_MB", "0"))
+PROFILE_QUOTA_CHECK_INTERVAL = int(os.getenv("PROFILE_QUOTA_CHECK_INTERVAL", "300"))
+
+# Бронирование через HTTP API кабинета (с сохраненными куками) вместо браузера.
+# Адрес и метод API сняты со страницы кабинета и могут устареть — включать после проверки
+SUPPLY_HTTP_ENABLED = os.getenv("SUPPLY_HTTP_ENABLED", "false").lower() == "true"
+SUPPLY_API_URL = os.getenv(
+    "SUPPLY_API_URL", "https://seller-supply.wildberries.ru/ns/sm-supply/supply-manager/api/v1/supply"
+)
+SUPPLY_API_TIMEOUT = float(os.getenv("SUPPLY_API_TIMEOUT", "15"))
+SUPPLY_API_MAX_CONNECTIONS = int(os.getenv("SUPPLY_API_MAX_CONNECTIONS", "100"))
+
+# Бронирование в браузере с сохраненными куками (BookRequest.user_id): Chrome запускается с чистым
+# временным профилем и получает куки через CDP вместо профиля телефона — его может обслужить любой узел
+COOKIE_SESSIONS_ENABLED = os.getenv("COOKIE_SESSIONS_ENABLED", "true").lower() == "true"
+# В БД у куки нет домена — при подстановке в браузер они ставятся на этот
+WB_COOKIE_DOMAIN = os.getenv("WB_COOKIE_DOMAIN", ".wildberries.ru")
+
+# Максимум бронирований в одном пакетном запросе
+BOOK_BATCH_MAX_SIZE = int(os.getenv("BOOK_BATCH_MAX_SIZE", "500"))
+
+# Наблюдение за слотами поставок. Каждый наблюдатель держит сессию в Grid
+SLOT_WATCH_MAX = int(os.getenv("SLOT_WATCH_MAX", "4"))
+# Интервал опроса календаря: от минимального, растет в SLOT_WATCH_BACKOFF раз, пока календарь не меняется
+SLOT_WATCH_MIN_INTERVAL = float(os.getenv("SLOT_WATCH_MIN_INTERVAL", "2"))
+SLOT_WATCH_MAX_INTERVAL = float(os.getenv("SLOT_WATCH_MAX_INTERVAL", "30"))
+SLOT_WATCH_BACKOFF = float(os.getenv("SLOT_WATCH_BACKOFF", "1.5"))
+# Календарь открывается один раз на браузер, дальше опрос только перечитывает его.
+# Раз в столько секунд страница все же открывается заново — на случай, если календарь сам не обновляется
+SLOT_WATCH_RELOAD_INTERVAL = float(os.getenv("SLOT_WATCH_RELOAD_INTERVAL", "300"))
+# Сколько секунд наблюдать, прежде чем сдаться
+SLOT_WATCH_MAX_DURATION = int(os.getenv("SLOT_WATCH_MAX_DURATION", "3600"))
+
+# Кэш браузеров, уже вошедших в кабинет (после confirm_auth). Каждый держит слот Grid или процесс Chrome,
+# поэтому бюджет — число браузеров (0 — кэш выключен). Простой — меньше таймаута сессии в Grid.
+# Браузеры кэша простаивают вне BROWSER_MAX_WORKERS, поэтому размер ограничен им же: в пике открыто
+# до BROWSER_MAX_WORKERS + BROWSER_CACHE_SIZE + SLOT_WATCH_MAX + DRIVER_POOL_SIZE браузеров — столько
+# сессий должен выдерживать Grid
+BROWSER_CACHE_SIZE = int(os.getenv("BROWSER_CACHE_SIZE", "4"))
+BROWSER_CACHE_IDLE_TIMEOUT = float(os.getenv("BROWSER_CACHE_IDLE_TIMEOUT", "240"))
+
+# Трассировка сценариев: скриншот и DOM сохраняются только для упавших и медленных шагов
+TRACE_ARTIFACTS_ENABLED = os.getenv("TRACE_ARTIFACTS_ENABLED", "true").lower() == "true"
+TRACE_ARTIFACT_DIR = os.getenv("TRACE_ARTIFACT_DIR", "traces")
+# Шаг дольше порога считается медленным (секунды); пороги отдельных шагов: "navigation=5,code_result=8"
+TRACE_SLOW_STEP_SECONDS = float(os.getenv("TRACE_SLOW_STEP_SECONDS", "15"))
+TRACE_STEP_THRESHOLDS = os.getenv("TRACE_STEP_THRESHOLDS", "")
+# Хранение: не больше TRACE_MAX_TRACES трасс и не дольше TRACE_RETENTION_HOURS
+TRACE_MAX_TRACES = int(os.getenv("TRACE_MAX_TRACES", "200"))
+TRACE_RETENTION_HOURS = float(os.getenv("TRACE_RETENTION_HOURS", "24"))
+# Сколько раз за сценарий можно снять артефакты
+TRACE_MAX_CAPTURES = int(os.getenv("TRACE_MAX_CAPTURES", "3"))
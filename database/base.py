@@ -3,6 +3,7 @@ from sqlalchemy.orm import declarative_base
 from sqlalchemy import MetaData
 
 from config import DB_URL
+from .metrics import instrument_engine
 
 # Создаем базовый класс для моделей
 Base = declarative_base()
@@ -17,6 +18,7 @@ async_engine = create_async_engine(
     pool_pre_ping=True,
     pool_recycle=300,
 )
+instrument_engine(async_engine)
 
 # Создаем фабрику сессий
 async_session_maker = async_sessionmaker(
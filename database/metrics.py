@@ -0,0 +1,57 @@
+import time
+
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+DB_QUERY_SECONDS = Histogram(
+    "wb_db_query_seconds",
+    "Время выполнения SQL-запроса",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_POOL_SIZE = Gauge("wb_db_pool_size", "Размер пула соединений с БД")
+DB_POOL_CHECKED_OUT = Gauge("wb_db_pool_checked_out", "Соединения с БД, выданные сессиям")
+DB_POOL_OVERFLOW = Gauge("wb_db_pool_overflow", "Соединения сверх размера пула")
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "wb_db_pool_checkout_seconds",
+    "Сколько сессия держала соединение из пула",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Метрики пула соединений и времени запросов движка"""
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+
+    DB_POOL_SIZE.set_function(pool.size)
+    DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+    DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # Запрос упал — снимаем отметку времени, чтобы стек не рос
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_start"] = time.perf_counter()
+
+    @event.listens_for(pool, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        start = connection_record.info.pop("checkout_start", None)
+        if start is not None:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, BigInteger, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -22,11 +22,21 @@ class User(Base):
 class Cookie(Base):
     """Модель куки для авторизации"""
     __tablename__ = "cookies"
+    __table_args__ = (
+        # Одноименные куки разных доменов и путей — разные куки
+        UniqueConstraint("user_id", "name", "domain", "path", name="uq_cookies_user_id_name_domain_path"),
+        # Удаление истекших куки одного пользователя
+        Index("ix_cookies_user_id_expire_date", "user_id", "expire_date"),
+        # Пакетная очистка истекших куки всех пользователей
+        Index("ix_cookies_expire_date", "expire_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="ID пользователя")
     name = Column(String(255), nullable=False, comment="Название куки")
     value = Column(Text, nullable=False, comment="Значение куки")
+    domain = Column(String(255), nullable=False, server_default="", comment="Домен куки (с точкой — для поддоменов, без — только хост)")
+    path = Column(String(255), nullable=False, server_default="/", comment="Путь куки")
     expire_date = Column(DateTime(timezone=True), nullable=True, comment="Дата истечения куки")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="Дата создания записи")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="Дата обновления записи")
@@ -1,12 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
 from .models import User, Cookie
 from .base import Base
 
 
+# asyncpg ограничивает число параметров в запросе (32767), у куки их 4
+UPSERT_CHUNK_SIZE = 1000
+
+
 class UserRepository:
     """Репозиторий для работы с пользователями"""
 
@@ -69,12 +74,15 @@ class CookieRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create_cookie(self, user_id: int, name: str, value: str, expire_date: Optional[datetime] = None) -> Cookie:
+    async def create_cookie(self, user_id: int, name: str, value: str, expire_date: Optional[datetime] = None,
+                            domain: str = "", path: str = "/") -> Cookie:
         """Создать новую куку"""
         cookie = Cookie(
             user_id=user_id,
             name=name,
             value=value,
+            domain=domain,
+            path=path,
             expire_date=expire_date
         )
         self.session.add(cookie)
@@ -82,6 +90,52 @@ class CookieRepository:
         await self.session.refresh(cookie)
         return cookie
 
+    async def upsert_cookies(self, user_id: int, cookies: List[Dict]) -> int:
+        """
+        Заменить набор куки пользователя одной транзакцией:
+        INSERT ... ON CONFLICT (user_id, name, domain, path) DO UPDATE и удаление куки, которых больше нет.
+        cookies - список словарей с ключами name, value, expire_date и необязательными domain, path
+        """
+        rows = [
+            {
+                'user_id': user_id,
+                'name': cookie['name'],
+                'value': cookie['value'],
+                'domain': cookie.get('domain') or "",
+                'path': cookie.get('path') or "/",
+                'expire_date': cookie.get('expire_date'),
+            }
+            for cookie in cookies
+        ]
+
+        try:
+            for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                stmt = insert(Cookie).values(rows[start:start + UPSERT_CHUNK_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_cookies_user_id_name_domain_path",
+                    set_={
+                        'value': stmt.excluded.value,
+                        'expire_date': stmt.excluded.expire_date,
+                        'updated_at': func.now(),
+                    },
+                )
+                await self.session.execute(stmt)
+
+            await self.session.execute(
+                delete(Cookie).where(
+                    Cookie.user_id == user_id,
+                    tuple_(Cookie.name, Cookie.domain, Cookie.path).not_in(
+                        [(row['name'], row['domain'], row['path']) for row in rows]
+                    ),
+                )
+            )
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+        return len(rows)
+
     async def get_cookies_by_user_id(self, user_id: int) -> List[Cookie]:
         """Получить все куки пользователя"""
         result = await self.session.execute(
@@ -133,11 +187,41 @@ class CookieRepository:
         await self.session.commit()
         return True
 
+    async def delete_expired_cookies(self, user_id: int) -> int:
+        """Удалить истекшие куки пользователя одним запросом"""
+        result = await self.session.execute(
+            delete(Cookie).where(
+                Cookie.user_id == user_id,
+                Cookie.expire_date < func.now()
+            )
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def purge_expired_cookies_batch(self, batch_size: int) -> int:
+        """
+        Удалить не больше batch_size истекших куки всех пользователей.
+        Каждая пачка — отдельная короткая транзакция; строки, занятые другими
+        транзакциями, пропускаются и будут удалены в следующий раз.
+        """
+        expired_ids = (
+            select(Cookie.id)
+            .where(Cookie.expire_date < func.now())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            delete(Cookie).where(Cookie.id.in_(expired_ids))
+        )
+        await self.session.commit()
+        return result.rowcount
+
     async def get_expired_cookies(self) -> List[Cookie]:
         """Получить все истекшие куки"""
         result = await self.session.execute(
             select(Cookie).where(
-                Cookie.expire_date < datetime.utcnow()
+                Cookie.expire_date < datetime.now(timezone.utc)
             )
         )
         return list(result.scalars().all())
@@ -1,100 +1,174 @@
 import undetected_chromedriver as uc
 from time import sleep
+from typing import Callable, Optional, Tuple, TypeVar
 
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver import ActionChains
 
-SELLER_WILDBERRIES_URL = "https://seller-auth.wildberries.ru/ru/"
+from config import WAIT_POLL_INTERVAL, CODE_SCREEN_TIMEOUT, CODE_RESULT_TIMEOUT, CODE_DIGIT_DELAY, WB_AUTH_URL
+from .timing import StepTimer
+from .page_state import PageState, classify_page, CODE_SCREEN, COOLDOWN, WRONG_CODE, LOGGED_IN, UNKNOWN
+
+SELLER_WILDBERRIES_URL = WB_AUTH_URL
 
 NUMBER_INPUT_CSS_SELECTOR = ".SimpleInput-JIIQvb037j"
 COUNTRY_CODE_INPUT_CSS_SELECTOR = ".FormPhoneInputBorderless__select-dR9O1RdqnB"
 NUMBER_INPUT_BUTTON_CSS_SELECTOR = "button.IconButton-dyRP\\+yvOcb:nth-child(1)"
 CODE_INPUT_CONTAINER_CSS_SELECTOR = "li.SimpleCodeInput__item-Pk-qM5fzm\\+"
+COUNTRY_DROPDOWN_CSS_SELECTOR = "ul.SelectDropdown-RY5wl9c2I9"
+COUNTRY_OPTION_CSS_SELECTOR = "button.DropdownListItem-avWolvN3jh"
 COUNTRY_CODES = ["374", "375", "852", "7X", "996", "86", "853", "7", "90", "998"]
 
+CODE_SCREEN_TEXT = "Введите код из СМС"
+COOLDOWN_TEXT = "Запрос кода возможен через"
+WRONG_CODE_TEXT = "Неверный код"
+
+# Аргументы PAGE_STATE_SCRIPT (для classify_page и асинхронных сценариев)
+PAGE_STATE_ARGS = (SELLER_WILDBERRIES_URL, CODE_INPUT_CONTAINER_CSS_SELECTOR,
+                   CODE_SCREEN_TEXT, COOLDOWN_TEXT, WRONG_CODE_TEXT)
+
 ## 7X bu Qozoqiston nomeri
 
+T = TypeVar("T")
+
+
+def wait_for(driver: uc.Chrome, condition: Callable[[uc.Chrome], T], timeout: float,
+             poll: float = WAIT_POLL_INTERVAL) -> T:
+    """Ждать, пока condition(driver) не вернет истинное значение"""
+    return WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+
+
+def page_state(driver: uc.Chrome) -> PageState:
+    """Состояние страницы авторизации (один небольшой execute_script вместо чтения page_source)"""
+    return classify_page(driver, *PAGE_STATE_ARGS)
+
 
-def request_code(driver: uc.Chrome, number: str) -> None:
+def _timed(timer: Optional[StepTimer], name: str):
+    return (timer or StepTimer()).step(name)
+
+
+def split_country_code(number: str) -> Tuple[int, str]:
+    """Индекс кода страны в выпадающем списке и номер без кода (индекс вне списка, если код не распознан)"""
+    for index, code in enumerate(COUNTRY_CODES):
+        if number.startswith(code):
+            return index, number[len(code):]
+    return len(COUNTRY_CODES), number[len(COUNTRY_CODES[0]):]
+
+
+def request_code(driver: uc.Chrome, number: str, timer: Optional[StepTimer] = None) -> None:
     """
     Requests SMS verification code from seller.wildberries.ru
     Args:
         driver - selenium web driver
         number - number in format 9991231212 or with country code like 998901234567
+        timer - optional per-step timer
     """
-    driver.get(SELLER_WILDBERRIES_URL)
+    with _timed(timer, "navigation"):
+        driver.get(SELLER_WILDBERRIES_URL)
 
-    # Wait for phone input field
-    number_input = WebDriverWait(driver, 30).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, NUMBER_INPUT_CSS_SELECTOR))
-    )
+        # Wait for phone input field
+        number_input = WebDriverWait(driver, 30, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, NUMBER_INPUT_CSS_SELECTOR))
+        )
 
     # Detect country code
-    country_code = COUNTRY_CODES[0]
-    index_of_country_code = 0
-
-    for c in COUNTRY_CODES:
-        if number.startswith(c):
-            country_code = c
-            break
-        index_of_country_code += 1
-
-    number = number[len(country_code):]
-
-    # Open dropdown
-    WebDriverWait(driver, 30).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, COUNTRY_CODE_INPUT_CSS_SELECTOR))
-    ).click()
-
-    # Wait until dropdown appears
-    dropdown = WebDriverWait(driver, 10).until(
-        EC.visibility_of_element_located((By.CSS_SELECTOR, "ul.SelectDropdown-RY5wl9c2I9"))
-    )
-
-    # Find all country options
-    options = dropdown.find_elements(By.CSS_SELECTOR, "button.DropdownListItem-avWolvN3jh")
-
-    # Scroll to and click the correct code
-    if index_of_country_code < len(options):
-        target = options[index_of_country_code]
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", target)
-        ActionChains(driver).move_to_element(target).click().perform()
-    else:
-        print(f"⚠️ Could not find country code index {index_of_country_code}")
-
-    # Enter number
-    number_input.send_keys(number)
-
-    # Click send button
-    send_button = WebDriverWait(driver, 30).until(
-        EC.element_to_be_clickable((By.CSS_SELECTOR, NUMBER_INPUT_BUTTON_CSS_SELECTOR))
-    )
-    send_button.click()
-
-
-def verify_code(driver: uc.Chrome, verification_code: str) -> dict:
-    code_input_containers: list[WebElement] = WebDriverWait(driver, 30).until(
-        EC.presence_of_all_elements_located(
-            (By.CSS_SELECTOR, CODE_INPUT_CONTAINER_CSS_SELECTOR)
+    index_of_country_code, number = split_country_code(number)
+
+    with _timed(timer, "country_select"):
+        # Open dropdown
+        WebDriverWait(driver, 30, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, COUNTRY_CODE_INPUT_CSS_SELECTOR))
+        ).click()
+
+        # Wait until dropdown appears
+        dropdown = WebDriverWait(driver, 10, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.visibility_of_element_located((By.CSS_SELECTOR, COUNTRY_DROPDOWN_CSS_SELECTOR))
         )
-    )
 
-    for i in range(len(code_input_containers)):
-        code_input_container = code_input_containers[i]
-        code_input_cell = code_input_container.find_element(By.TAG_NAME, "input")
-        code_input_cell.send_keys(verification_code[i])
-        sleep(0.2)
+        # Find all country options
+        options = dropdown.find_elements(By.CSS_SELECTOR, COUNTRY_OPTION_CSS_SELECTOR)
 
-    sleep(5)
+        # Scroll to and click the correct code
+        if index_of_country_code < len(options):
+            target = options[index_of_country_code]
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", target)
+            ActionChains(driver).move_to_element(target).click().perform()
+        else:
+            print(f"⚠️ Could not find country code index {index_of_country_code}")
+
+    with _timed(timer, "phone_submit"):
+        # Enter number
+        number_input.send_keys(number)
+
+        # Click send button
+        send_button = WebDriverWait(driver, 30, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, NUMBER_INPUT_BUTTON_CSS_SELECTOR))
+        )
+        send_button.click()
+
+
+def wait_code_screen(driver: uc.Chrome, timeout: float = CODE_SCREEN_TIMEOUT,
+                     timer: Optional[StepTimer] = None) -> PageState:
+    """
+    Ждать реакции страницы на отправку номера.
+    Возвращает состояние CODE_SCREEN, COOLDOWN (с секундами до повторного запроса),
+    LOGGED_IN (страница входа закрылась) или UNKNOWN, если за timeout ничего не появилось.
+    """
+    def state(d: uc.Chrome) -> Optional[PageState]:
+        page = page_state(d)
+        # Уход со страницы входа тоже ответ: дальше ждать нечего
+        return page if page.state in (CODE_SCREEN, COOLDOWN, LOGGED_IN) else None
+
+    with _timed(timer, "code_screen"):
+        try:
+            return wait_for(driver, state, timeout)
+        except TimeoutException:
+            return PageState(UNKNOWN)
+
+
+def code_rejected(state: str) -> dict:
+    """Результат verify_code без входа: неверный код или страница так и не показала вход"""
+    message = "Неверный код из SMS" if state == WRONG_CODE else "Кабинет не подтвердил вход"
+    return {
+        "success": False,
+        "message": message,
+        "state": state,
+    }
+
+
+def verify_code(driver: uc.Chrome, verification_code: str, timer: Optional[StepTimer] = None) -> dict:
+    with _timed(timer, "code_entry"):
+        code_input_containers: list[WebElement] = WebDriverWait(driver, 30, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.presence_of_all_elements_located(
+                (By.CSS_SELECTOR, CODE_INPUT_CONTAINER_CSS_SELECTOR)
+            )
+        )
 
-    if "Неверный код" in driver.page_source:
-        return {
-            "success": False,
-            "message": "Неверный код из SMS"
-        }
+        for i in range(len(code_input_containers)):
+            code_input_container = code_input_containers[i]
+            code_input_cell = code_input_container.find_element(By.TAG_NAME, "input")
+            code_input_cell.send_keys(verification_code[i])
+            if CODE_DIGIT_DELAY:
+                sleep(CODE_DIGIT_DELAY)
+
+    # Ждем ошибку "Неверный код" или уход со страницы входа
+    def state(d: uc.Chrome) -> Optional[str]:
+        page = page_state(d)
+        return page.state if page.state in (WRONG_CODE, LOGGED_IN) else None
+
+    with _timed(timer, "code_result"):
+        try:
+            result = wait_for(driver, state, CODE_RESULT_TIMEOUT)
+        except TimeoutException:
+            # Вход засчитывается, только если страница его показала
+            result = page_state(driver).state
+
+    if result != LOGGED_IN:
+        return code_rejected(result)
 
     return {
         "success": True,
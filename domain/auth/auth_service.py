@@ -1,22 +1,61 @@
-import shutil
-from typing import List, Dict, Optional
-from datetime import datetime, date
+import asyncio
+import time
+from collections import defaultdict
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional
+import httpx
 import undetected_chromedriver as uc
 from sqlalchemy.ext.asyncio import AsyncSession
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from database.base import async_session_maker
 from database.repositories import DatabaseManager
 from database.models import User
-from selenium import webdriver
 from domain.auth.schemas import BookRequest
-from .auth import request_code, verify_code
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+from .auth import request_code, verify_code, wait_code_screen, wait_for, CODE_SCREEN, COOLDOWN
+from .page_state import PageState, WRONG_CODE
+from .cdp_browser import CdpBrowser, close_remote_browser
+from . import browser_flows
+from .timing import StepTimer
+from .dates import get_formated_date
+from .supply_calendar import (
+    find_date_cell, available_dates, supply_detail_url, calendar_is_open,
+    PLAN_BUTTON_CLASS, CONFIRM_POPUP_XPATH, CALENDAR_CELL_CSS_SELECTOR, TRANSFER_BUTTON_XPATH,
+)
+from .executor import browser_executor, check_cancelled, FlowCancelled, SingleFlight
+from .driver import create_driver, attach_driver
+from .driver_pool import driver_pool
+from .resource_blocking import block_driver_resources, block_browser_resources
+from .session_cookies import (
+    read_driver_cookies, read_browser_cookies, inject_driver_cookies, inject_browser_cookies, live_cookies,
+    cookie_rows,
+)
+from .profiles import profile_manager
+from .session_store import AuthSession, create_session_store
+from .session_reaper import SessionReaper
+from .cookie_cache import cookie_cache
+from .supply_api import supply_api, SessionRejected, UnexpectedResponse
+from .slot_watcher import SlotWatcher, Watch, PhoneAlreadyWatched
+from .jobs import JobManager, Job
+from .browser_cache import BrowserCache, CachedBrowser
+from . import metrics
+from config import (
+    WAIT_POLL_INTERVAL, BOOK_MODAL_TIMEOUT, SELENIUM_GRID_URL, SESSION_TTL, SUPPLY_HTTP_ENABLED, BROWSER_BACKEND,
+    SLOT_WATCH_MAX, SLOT_WATCH_MIN_INTERVAL, SLOT_WATCH_MAX_INTERVAL, SLOT_WATCH_BACKOFF, SLOT_WATCH_MAX_DURATION,
+    SLOT_WATCH_RELOAD_INTERVAL,
+    JOB_HISTORY, JOB_RETENTION, BROWSER_CACHE_SIZE, BROWSER_CACHE_IDLE_TIMEOUT, COOKIE_SESSIONS_ENABLED,
+)
 from selenium.webdriver.common.action_chains import ActionChains
-import time
-import os
 
-sessions = {}
+# Сессии, ожидающие ввода SMS-кода (общие для воркеров при SESSION_STORE=redis)
+sessions = create_session_store()
+# Драйверы сессий, открытых этим процессом: переподключаться к ним не нужно
+local_drivers = {}
+# То же для BROWSER_BACKEND=cdp
+local_browsers = {}
+# Повторный запрос кода (или ввод того же кода), пока первый еще выполняется, ждет его результат
+auth_flights = SingleFlight()
 
 
 class WildberriesAuthService:
@@ -25,7 +64,7 @@ class WildberriesAuthService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self.db_manager = DatabaseManager(session)
-        # Хранилище активных сессий (в продакшене лучше использовать Redis)
+        # Хранилище активных сессий
         self._active_sessions = sessions
 
     async def create_user(self, user_id: int) -> User:
@@ -46,31 +85,19 @@ class WildberriesAuthService:
         if not user:
             return False
 
-        # Удаляем старые куки
-        await self.db_manager.cookies.delete_all_cookies_by_user(user.id)
-
-        # Сохраняем новые куки
-        for cookie_data in cookies:
-            name = cookie_data.get('name')
-            value = cookie_data.get('value')
-            expiry = cookie_data.get('expiry')
-
-            if name and value:
-                expire_date = None
-                if expiry:
-                    expire_date = datetime.fromtimestamp(expiry)
-
-                await self.db_manager.cookies.create_cookie(
-                    user_id=user.id,
-                    name=name,
-                    value=value,
-                    expire_date=expire_date
-                )
+        await self.db_manager.cookies.upsert_cookies(user.id, cookie_rows(cookies))
+        await cookie_cache.invalidate(user.id)
 
         return True
 
     async def get_user_cookies(self, user_id: int) -> List[Dict]:
         """Получить куки пользователя"""
+        cached = await cookie_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        # Поколение до чтения из БД: если куки тем временем перезапишут, прочитанные в кэш не попадут
+        generation = await cookie_cache.generation(user_id)
         user = await self.get_user_with_cookies(user_id)
         if not user:
             return []
@@ -80,176 +107,421 @@ class WildberriesAuthService:
             cookie_dict = {
                 'name': cookie.name,
                 'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
                 'expire_date': cookie.expire_date.isoformat() if cookie.expire_date else None
             }
             cookies.append(cookie_dict)
 
+        expire_dates = [cookie.expire_date for cookie in user.cookies if cookie.expire_date]
+        await cookie_cache.set(user_id, cookies, min(expire_dates) if expire_dates else None, generation)
+
         return cookies
 
     def create_new_driver(self, phone: str, new_profile=False):
         """Создаем новый драйвер для пользователя"""
-        profile_dir = os.path.abspath(f"/chrome_profile/{phone}")
-
         if new_profile:
-            print("Removing old profile", phone)
-            if os.path.exists(profile_dir):
-                print("Removing old profile", phone)
-                shutil.rmtree(profile_dir)
-
-        options = Options()
-        options.add_argument(f"--user-data-dir={profile_dir}")  # ✅ persistent browser profile
-        options.add_argument("--profile-directory=Default")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option("useAutomationExtension", False)
-        options.add_argument("--disable-infobars")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--start-maximized")
-        # options.add_argument("--headless=new")
-
-        # return uc.Chrome(headless=True, options=options)
-        return webdriver.Remote(
-            command_executor='http://127.0.0.1:4444/wd/hub',
-            options=options,
-        )
+            # Новая авторизация: берем прогретый драйвер из пула
+            return driver_pool.acquire(phone)
+
+        return create_driver(profile_manager.open(phone))
+
+    def create_book_driver(self, phone: str, cookies: Optional[List[Dict]] = None):
+        """
+        Драйвер для бронирования: с сохраненными куками — чистый временный профиль
+        (профиль телефона не нужен, подойдет любой узел Grid), иначе профиль телефона.
+        Истекшие куки до очистки еще лежат в БД: если живых не осталось, нужен профиль
+        """
+        cookies = live_cookies(cookies or [])
+        if cookies:
+            driver = create_driver()
+            try:
+                block_driver_resources(driver, "book")
+                inject_driver_cookies(driver, cookies)
+                return driver
+            except Exception as e:
+                print(f"⚠️ Не удалось подставить куки, бронируем с профилем телефона: {e}")
+                quit_driver(driver)
+
+        # Профиль телефона может держать только один Chrome: закрываем браузер сессии авторизации
+        # (без кэша браузеров он остается открытым после входа)
+        auth_session = self._active_sessions.get(phone)
+        if phone in local_drivers or (auth_session is not None and auth_session.verified):
+            self.close_session(phone)
+        driver = self.create_new_driver(phone)
+        block_driver_resources(driver, "book")
+        return driver
+
+    @staticmethod
+    def ensure_not_watched(phone: str) -> None:
+        """
+        Новый вход заменяет профиль телефона, а браузер наблюдателя работает в нем же:
+        пока идет наблюдение, запрос кода отклоняется (PhoneAlreadyWatched)
+        """
+        if slot_watcher.is_watching(phone):
+            raise PhoneAlreadyWatched(phone)
 
     async def request_auth(self, phone: str) -> Dict:
         """Запрос кода авторизации (первый этап)"""
+        self.ensure_not_watched(phone)
+        return await auth_flights.do(f"request_auth:{phone}", self._submit_request_auth, phone)
+
+    async def _submit_request_auth(self, phone: str) -> Dict:
+        if BROWSER_BACKEND == "cdp":
+            return await browser_executor.run(phone, self._request_auth_cdp, phone, flow="request_auth")
+        return await browser_executor.submit(phone, self._request_auth, phone, flow="request_auth")
+
+    def _request_auth(self, phone: str) -> Dict:
+        """Запрос кода авторизации в браузере (выполняется в пуле потоков)"""
+        timer = StepTimer("request_auth")
+        driver = None
         try:
-            # Создаем драйвер
+            # Код запрашивают заново: закрываем браузер прежней сессии, ее профиль сейчас заменится
+            self.close_session(phone)
 
-            driver = self.create_new_driver(phone, new_profile=True)
+            # Создаем драйвер
+            with timer.step("driver_create"):
+                driver = self.create_new_driver(phone, new_profile=True)
+                block_driver_resources(driver, "request_auth")
+            timer.driver = driver
+            check_cancelled()
 
             # Запрашиваем код
-            request_code(driver, phone)
-
-            time.sleep(5)
+            request_code(driver, phone, timer)
+
+            # Ждем экран ввода кода или сообщение об ограничении
+            page = wait_code_screen(driver, timer=timer)
+            check_cancelled()
+            print("Запрос кода", phone, page.state, timer.report())
+
+            if page.state == CODE_SCREEN:
+                # Сохраняем сессию: по id сессии в Grid любой воркер сможет к ней подключиться
+                local_drivers[phone] = driver
+                return self._code_sent(AuthSession(
+                    phone=phone,
+                    remote_session_id=driver.session_id,
+                    executor_url=SELENIUM_GRID_URL,
+                ), timer)
+
+            if page.state != COOLDOWN:
+                timer.capture("code_screen")
+
+            # Закрываем драйвер
+            driver.quit()
+            return self._code_not_sent(page, timer)
 
-            # Генерируем уникальный session_id
-            session_id = phone
+        except FlowCancelled:
+            print("Запрос авторизации отменен клиентом", phone)
+            metrics.record_outcome("request_auth", metrics.CANCELLED, timer)
+            if driver is not None:
+                driver.quit()
+            raise
 
-            # Сохраняем сессию
-            self._active_sessions[session_id] = {
-                'phone': phone,
-                'driver': driver,
-                'created_at': datetime.utcnow(),
-                'verified': False,
+        except Exception as e:
+            print(f"Ошибка запроса авторизации: {e}")
+            metrics.record_outcome("request_auth", metrics.ERROR, timer)
+            # Иначе Chrome остался бы висеть: держит слот Grid и профиль телефона
+            local_drivers.pop(phone, None)
+            quit_driver(driver)
+            return {
+                'success': False,
+                'message': f'Ошибка запроса кода: {str(e)}',
+                'session_id': None,
+                'timings': timer.report(),
             }
 
-            if "Введите код из СМС" in driver.page_source:
-                return {
-                    'success': True,
-                    'message': 'Код подтверждения отправлен на указанный номер',
-                    'session_id': session_id
-                }
+    def _code_sent(self, auth_session: AuthSession, timer: StepTimer) -> Dict:
+        """Код отправлен: сохраняем сессию до ввода кода"""
+        self._active_sessions.save(auth_session)
+        session_reaper.schedule(auth_session)
+        metrics.record_outcome("request_auth", metrics.SUCCESS, timer)
+        return {
+            'success': True,
+            'message': 'Код подтверждения отправлен на указанный номер',
+            'session_id': auth_session.phone,
+            'timings': timer.report(),
+        }
+
+    @staticmethod
+    def _code_not_sent(page: PageState, timer: StepTimer) -> Dict:
+        """Ответ, если вместо экрана ввода кода — ограничение на запрос или ничего"""
+        if page.state == COOLDOWN:
+            metrics.record_outcome("request_auth", metrics.COOLDOWN, timer)
+            if page.seconds is not None:
+                message = f'Запрос кода возможен через {page.seconds} сек. Попробуйте позже.'
             else:
-                # Закрываем драйвер
-                driver.quit()
-                # Удаляем сессию
-                del self._active_sessions[session_id]
-
-                if "Запрос кода возможен через" in driver.page_source:
-                    return {
-                        'success': False,
-                        'message': 'Запрос кода возможен через некоторое время. Попробуйте позже.',
-                    }
-                return {
-                    'success': False,
-                    'message': 'Не удалось отправить код подтверждения. Проверьте номер телефона и попробуйте позже.',
-                    'session_id': None
-                }
+                message = 'Запрос кода возможен через некоторое время. Попробуйте позже.'
+            return {
+                'success': False,
+                'message': message,
+                'retry_after': page.seconds,
+                'timings': timer.report(),
+            }
+        metrics.record_outcome("request_auth", metrics.FAILED, timer)
+        return {
+            'success': False,
+            'message': 'Не удалось отправить код подтверждения. Проверьте номер телефона и попробуйте позже.',
+            'session_id': None,
+            'timings': timer.report(),
+        }
+
+    async def _request_auth_cdp(self, phone: str) -> Dict:
+        """Запрос кода авторизации в CDP-браузере (в event loop, без потока)"""
+        timer = StepTimer("request_auth")
+        browser = None
+        try:
+            await asyncio.to_thread(close_session, phone)
+
+            with timer.step("driver_create"):
+                profile_dir = await asyncio.to_thread(profile_manager.assign, phone)
+                browser = await CdpBrowser.launch(profile_dir)
+                await block_browser_resources(browser, "request_auth")
+
+            await browser_flows.request_code(browser, phone, timer)
+            page = await browser_flows.wait_code_screen(browser, timer=timer)
+            print("Запрос кода", phone, page.state, timer.report())
+
+            if page.state == CODE_SCREEN:
+                # Другой воркер подключится к браузеру по адресу DevTools и id вкладки
+                local_browsers[phone] = browser
+                auth_session = AuthSession(
+                    phone=phone,
+                    remote_session_id=browser.session_id,
+                    executor_url=browser.executor_url,
+                    backend="cdp",
+                )
+                return await asyncio.to_thread(self._code_sent, auth_session, timer)
+
+            await browser.quit()
+            return self._code_not_sent(page, timer)
+
+        except asyncio.CancelledError:
+            print("Запрос авторизации отменен клиентом", phone)
+            metrics.record_outcome("request_auth", metrics.CANCELLED, timer)
+            if browser is not None:
+                await browser.quit()
+            raise
 
         except Exception as e:
             print(f"Ошибка запроса авторизации: {e}")
+            metrics.record_outcome("request_auth", metrics.ERROR, timer)
+            if browser is not None:
+                await browser.quit()
             return {
                 'success': False,
                 'message': f'Ошибка запроса кода: {str(e)}',
-                'session_id': None
+                'session_id': None,
+                'timings': timer.report(),
             }
 
-    async def confirm_auth(self, phone: str, verification_code: str) -> Dict:
-        """Подтверждение авторизации (второй этап)"""
+    async def confirm_auth(self, phone: str, verification_code: str, user_id: Optional[int] = None) -> Dict:
+        """Подтверждение авторизации (второй этап). С user_id куки кабинета сохраняются для пользователя"""
+        result = await auth_flights.do(
+            f"confirm_auth:{phone}:{verification_code}", self._submit_confirm_auth, phone, verification_code
+        )
+        # Куки сценарий отдает только для сохранения, в ответ клиенту они не идут
+        cookies = result.get('cookies')
+        result = {key: value for key, value in result.items() if key != 'cookies'}
+        if user_id is not None and cookies and await self.save_login_cookies(user_id, cookies):
+            result['user_id'] = user_id
+        return result
+
+    async def save_login_cookies(self, user_id: int, cookies: List[Dict]) -> bool:
+        """Сохранить куки после входа (пользователь создается, если его еще нет)"""
+        try:
+            if await self.get_user(user_id) is None:
+                await self.create_user(user_id)
+            return await self.save_cookies(user_id, cookies)
+        except Exception as e:
+            print(f"Ошибка сохранения куки пользователя {user_id}: {e}")
+            return False
+
+    async def _submit_confirm_auth(self, phone: str, verification_code: str) -> Dict:
+        if BROWSER_BACKEND == "cdp":
+            return await browser_executor.run(
+                phone, self._confirm_auth_cdp, phone, verification_code, flow="confirm_auth"
+            )
+        return await browser_executor.submit(
+            phone, self._confirm_auth, phone, verification_code, flow="confirm_auth"
+        )
+
+    def _confirm_auth(self, phone: str, verification_code: str) -> Dict:
+        """Ввод кода подтверждения в браузере (выполняется в пуле потоков)"""
+        timer = StepTimer("confirm_auth")
+        driver = None
         try:
             # Проверяем сессию
-            if phone not in self._active_sessions:
+            auth_session = self._active_sessions.get(phone)
+            if auth_session is None:
+                metrics.record_outcome("confirm_auth", metrics.NOT_AUTHENTICATED)
                 return {
                     'success': False,
                     'message': 'Сессия не найдена или истекла. Запросите код заново.',
                 }
 
-            session_data = self._active_sessions[phone]
-
-            driver = session_data['driver']
+            with timer.step("driver_attach"):
+                driver = self.get_session_driver(auth_session)
+            timer.driver = driver
 
             # Вводим код и получаем куки
-            result = verify_code(driver, verification_code)
+            result = verify_code(driver, verification_code, timer)
+            if result["success"]:
+                with timer.step("cookies"):
+                    cookies = read_driver_cookies(driver)
+            print("Подтверждение кода", phone, result["success"], timer.report())
 
             if not result["success"]:
-                # Закрываем драйвер
-                driver.quit()
+                # Закрываем драйвер и удаляем сессию
+                self.close_session(phone, driver)
+                return self._code_rejected(result, timer)
+
+            if browser_cache.enabled:
+                # Браузер уже в кабинете: оставляем его горячим для бронирований, сессия входа закончена
+                local_drivers.pop(phone, None)
+                self._active_sessions.delete(phone)
+                browser_cache.put(phone, driver, "webdriver")
+            else:
+                auth_session.verified = True
+                self._active_sessions.save(auth_session)
+            metrics.record_outcome("confirm_auth", metrics.SUCCESS, timer)
+
+            return {
+                'success': True,
+                'message': 'Пользователь успешно аутентифицирован',
+                'cookies': cookies,
+                'timings': timer.report(),
+            }
+
+        except Exception as e:
+            print(f"Ошибка подтверждения авторизации: {e}")
+            metrics.record_outcome("confirm_auth", metrics.ERROR, timer)
+            # Сессия в неизвестном состоянии: закрываем браузер, код нужно запросить заново
+            try:
+                self.close_session(phone, driver)
+            except Exception as close_error:
+                print(f"Ошибка закрытия сессии {phone}: {close_error}")
+            return {
+                'success': False,
+                'message': f'Ошибка подтверждения: {str(e)}',
+                'timings': timer.report(),
+            }
+
+    @staticmethod
+    def _code_rejected(result: Dict, timer: StepTimer) -> Dict:
+        """Ответ, если вход не состоялся: неверный код или страница не показала вход"""
+        if result.get('state') == WRONG_CODE:
+            metrics.record_outcome("confirm_auth", metrics.WRONG_CODE, timer)
+            message = 'Неверный код подтверждения'
+        else:
+            metrics.record_outcome("confirm_auth", metrics.FAILED, timer)
+            message = 'Кабинет не подтвердил вход. Запросите код заново.'
+        return {
+            'success': False,
+            'message': message,
+            'timings': timer.report(),
+        }
 
-                # Удаляем сессию
-                del self._active_sessions[phone]
+    async def _confirm_auth_cdp(self, phone: str, verification_code: str) -> Dict:
+        """Ввод кода подтверждения в CDP-браузере (в event loop, без потока)"""
+        timer = StepTimer("confirm_auth")
+        browser = None
+        try:
+            auth_session = await asyncio.to_thread(self._active_sessions.get, phone)
+            if auth_session is None:
+                metrics.record_outcome("confirm_auth", metrics.NOT_AUTHENTICATED)
                 return {
                     'success': False,
-                    'message': 'Неверный код подтверждения',
+                    'message': 'Сессия не найдена или истекла. Запросите код заново.',
                 }
 
+            with timer.step("driver_attach"):
+                browser = await get_session_browser(auth_session)
+
+            result = await browser_flows.verify_code(browser, verification_code, timer)
+            if result["success"]:
+                with timer.step("cookies"):
+                    cookies = await read_browser_cookies(browser)
+            print("Подтверждение кода", phone, result["success"], timer.report())
+
+            if not result["success"]:
+                await close_browser_session(phone, browser)
+                return self._code_rejected(result, timer)
+
+            if browser_cache.enabled:
+                local_browsers.pop(phone, None)
+                await asyncio.to_thread(self._active_sessions.delete, phone)
+                browser_cache.put(phone, browser, "cdp")
+            else:
+                auth_session.verified = True
+                await asyncio.to_thread(self._active_sessions.save, auth_session)
+            metrics.record_outcome("confirm_auth", metrics.SUCCESS, timer)
+
             return {
                 'success': True,
                 'message': 'Пользователь успешно аутентифицирован',
+                'cookies': cookies,
+                'timings': timer.report(),
             }
 
+        except asyncio.CancelledError:
+            metrics.record_outcome("confirm_auth", metrics.CANCELLED, timer)
+            raise
+
         except Exception as e:
             print(f"Ошибка подтверждения авторизации: {e}")
+            metrics.record_outcome("confirm_auth", metrics.ERROR, timer)
+            await close_browser_session(phone, browser)
             return {
                 'success': False,
                 'message': f'Ошибка подтверждения: {str(e)}',
+                'timings': timer.report(),
             }
 
     async def refresh_cookies(self, user_id: int) -> bool:
         """Обновить куки пользователя"""
         # Здесь можно добавить логику для обновления куки
         # Например, проверка срока действия и повторная авторизация
-        user = await self.get_user_with_cookies(user_id)
+        user = await self.get_user(user_id)
         if not user:
             return False
 
-        # Проверяем истекшие куки
-        expired_cookies = await self.db_manager.cookies.get_expired_cookies()
-        for cookie in expired_cookies:
-            if cookie.user_id == user.id:
-                await self.db_manager.cookies.delete_cookie(cookie.id)
+        # Удаляем истекшие куки
+        await self.db_manager.cookies.delete_expired_cookies(user.id)
+        await cookie_cache.invalidate(user.id)
 
         return True
 
     async def delete_user(self, user_id: int) -> bool:
         """Удалить пользователя и все его куки"""
-        return await self.db_manager.users.delete_user(user_id)
+        deleted = await self.db_manager.users.delete_user(user_id)
+        await cookie_cache.invalidate(user_id)
+        return deleted
 
-    def cleanup_expired_sessions(self):
-        """Очистка истекших сессий"""
-        current_time = datetime.utcnow()
-        expired_sessions = []
+    async def has_session(self, phone: str) -> bool:
+        """Есть ли у телефона сессия авторизации (хранилище опрашивается в потоке)"""
+        return await asyncio.to_thread(self._active_sessions.__contains__, phone)
 
-        for session_id, session_data in self._active_sessions.items():
-            # Сессии истекают через 10 минут
-            if (current_time - session_data['created_at']).total_seconds() > 600:
-                expired_sessions.append(session_id)
+    async def is_logged_in(self, phone: str, user_id: Optional[int] = None) -> bool:
+        """
+        Вошел ли телефон в кабинет или ждет кода. После confirm_auth сессии авторизации уже нет,
+        поэтому вход подтверждает браузер в кэше или сохраненные непросроченные куки user_id
+        """
+        if browser_cache.has(phone) or await self.has_session(phone):
+            return True
+        if user_id is None:
+            return False
+        return bool(live_cookies(await self.get_user_cookies(user_id)))
 
-        for session_id in expired_sessions:
-            session_data = self._active_sessions[session_id]
-            if 'driver' in session_data:
-                try:
-                    session_data['driver'].quit()
-                except:
-                    pass
-            del self._active_sessions[session_id]
+    def get_session_driver(self, auth_session: AuthSession):
+        """Драйвер сессии: свой, если сессию открыл этот процесс, иначе переподключаемся к Grid"""
+        return get_session_driver(auth_session)
 
-    def close_popups(self, driver):
+    def close_session(self, phone: str, driver=None):
+        """Закрыть браузер сессии и удалить ее из хранилища"""
+        close_session(phone, driver)
+
+    @staticmethod
+    def close_popups(driver):
         """
         Принятие условий использования, если появляется соответствующий попап, чтобы не мешал дальнейшей работе.
         """
@@ -277,93 +549,594 @@ class WildberriesAuthService:
 
     async def book(self, book_data: BookRequest) -> Dict:
         """Бронирование товара"""
+        if SUPPLY_HTTP_ENABLED and book_data.user_id is not None:
+            result = await self._book_http(book_data)
+            if result is not None:
+                return result
+        cookies = None
+        if COOKIE_SESSIONS_ENABLED and book_data.user_id is not None:
+            cookies = await self.get_user_cookies(book_data.user_id)
+        if BROWSER_BACKEND == "cdp":
+            return await browser_executor.run(book_data.phone, self._book_cdp, book_data, cookies, flow="book")
+        return await browser_executor.submit(book_data.phone, self._book, book_data, cookies, flow="book")
+
+    @classmethod
+    async def book_batch(cls, bookings: List[BookRequest]) -> AsyncIterator[Dict]:
+        """
+        Пакетное бронирование. Результаты отдаются по мере готовности.
+        Бронирования одного телефона выполняются по порядку, разных — параллельно
+        (не больше, чем потоков у браузерного пула).
+        """
+        by_phone = defaultdict(list)
+        for index, book_data in enumerate(bookings):
+            by_phone[book_data.phone].append((index, book_data))
+
+        results = asyncio.Queue()
+        capacity = asyncio.Semaphore(browser_executor.max_workers)
+
+        async def report(index, book_data, result):
+            await results.put({
+                **result,
+                'index': index,
+                'phone': book_data.phone,
+                'supply_id': book_data.supply_id,
+                'dt': book_data.dt,
+            })
+
+        def failure(e):
+            print(f"Ошибка бронирования: {e}")
+            return {
+                'success': False,
+                'message': f'Ошибка бронирования: {str(e)}',
+            }
+
+        async def book_phone(items):
+            pending = list(items)
+            try:
+                async with capacity:
+                    # У каждого телефона своя сессия БД: AsyncSession нельзя использовать параллельно
+                    async with async_session_maker() as session:
+                        service = cls(session)
+                        while pending:
+                            index, book_data = pending[0]
+                            try:
+                                result = await service.book(book_data)
+                            except Exception as e:
+                                result = failure(e)
+                            pending.pop(0)
+                            await report(index, book_data, result)
+            except Exception as e:
+                # Упало вне бронирования (например, не открылась сессия БД): без ответа по оставшимся
+                # бронированиям поток результатов ждал бы их вечно
+                result = failure(e)
+                for index, book_data in pending:
+                    await report(index, book_data, result)
+
+        tasks = [asyncio.create_task(book_phone(items)) for items in by_phone.values()]
+        try:
+            for _ in range(len(bookings)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @classmethod
+    def start_job(cls, kind: str, phone: str, call: Callable[["WildberriesAuthService"], Awaitable[Dict]]) -> Job:
+        """
+        Запустить сценарий call(service) в фоне. У задачи своя сессия БД:
+        сессия запроса закроется, как только клиент получит id задачи.
+        """
+        async def run() -> Dict:
+            async with async_session_maker() as session:
+                return await call(cls(session))
+
+        return job_manager.start(kind, phone, run)
 
-        driver = self.create_new_driver(book_data.phone)
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Job]:
+        return job_manager.get(job_id)
 
-        url = f"https://seller.wildberries.ru/supplies-management/all-supplies/supply-detail?preorderId&supplyId={book_data.supply_id}"
+    @staticmethod
+    async def wait_job(job: Job, timeout: float) -> bool:
+        return await job_manager.wait(job, timeout)
 
-        driver.get(url)
+    @staticmethod
+    async def cancel_job(job_id: str) -> Optional[Job]:
+        return await job_manager.cancel(job_id)
 
-        wait = WebDriverWait(driver, 30)
+    async def watch_slot(self, book_data: BookRequest) -> Watch:
+        """Наблюдать за календарем поставки и забронировать дату, как только она освободится"""
+        return slot_watcher.add(book_data.phone, book_data.supply_id, book_data.dt)
 
-        self.close_popups(driver)
+    def get_watch(self, watch_id: str) -> Optional[Watch]:
+        return slot_watcher.get(watch_id)
+
+    def list_watches(self) -> List[Watch]:
+        return slot_watcher.list()
+
+    async def cancel_watch(self, watch_id: str) -> Optional[Watch]:
+        return await slot_watcher.cancel(watch_id)
+
+    async def _book_http(self, book_data: BookRequest) -> Optional[Dict]:
+        """
+        Бронирование через API кабинета с сохраненными куками.
+        Возвращает None, если нужен браузер: куки нет или API их не принял.
+        """
+        cookies = await self.get_user_cookies(book_data.user_id)
+        if not cookies:
+            return None
+
+        timer = StepTimer("book_http")
+        try:
+            with timer.step("http_book"):
+                result = await supply_api.book(cookies, book_data.supply_id, book_data.dt)
+        except SessionRejected as e:
+            print("Сессия отклонена API поставок, бронируем через браузер", book_data.phone, e)
+            metrics.record_outcome("book_http", metrics.NOT_AUTHENTICATED, timer)
+            return None
+        except (httpx.HTTPError, UnexpectedResponse) as e:
+            print(f"Ошибка API поставок, бронируем через браузер: {e}")
+            metrics.record_outcome("book_http", metrics.ERROR, timer)
+            return None
+
+        print("Бронирование через API", book_data.phone, result['success'], timer.report())
+        metrics.record_outcome("book_http", metrics.SUCCESS if result['success'] else metrics.FAILED, timer)
+        if result['success']:
+            return {
+                'success': True,
+                'message': 'Товар успешно забронирован',
+                'timings': timer.report(),
+            }
+        return {
+            'success': False,
+            'message': result['message'],
+            'timings': timer.report(),
+        }
+
+    def _book(self, book_data: BookRequest, cookies: Optional[List[Dict]] = None) -> Dict:
+        """Бронирование товара в браузере (выполняется в пуле потоков)"""
+        timer = StepTimer("book")
+        driver = None
+        try:
+            with timer.step("driver_create"):
+                driver = take_cached_driver(book_data.phone) or self.create_book_driver(book_data.phone, cookies)
+            timer.driver = driver
+            result = self._book_with_driver(driver, book_data, timer)
+        except FlowCancelled:
+            print("Бронирование отменено клиентом", book_data.phone)
+            quit_driver(driver)
+            metrics.record_outcome("book", metrics.CANCELLED, timer)
+            raise
+        except Exception:
+            quit_driver(driver)
+            metrics.record_outcome("book", metrics.ERROR, timer)
+            raise
+        release_driver(book_data.phone, driver, result)
+        metrics.record_outcome("book", book_outcome(result), timer)
+        result['timings'] = timer.report()
+        print("Бронирование", book_data.phone, result['success'], result['timings'])
+        return result
+
+    async def _book_cdp(self, book_data: BookRequest, cookies: Optional[List[Dict]] = None) -> Dict:
+        """Бронирование товара в CDP-браузере (в event loop, без потока)"""
+        timer = StepTimer("book")
+        phone = book_data.phone
+        browser = None
+        try:
+            with timer.step("driver_create"):
+                browser = await take_cached_browser(phone)
+                if browser is None and live_cookies(cookies or []):
+                    browser = await launch_with_cookies(cookies)
+                if browser is None:
+                    # Профиль телефона может держать только один Chrome: закрываем браузер сессии авторизации
+                    if phone in local_browsers:
+                        await close_browser_session(phone)
+                    profile_dir = await asyncio.to_thread(profile_manager.open, phone)
+                    browser = await CdpBrowser.launch(profile_dir)
+                    await block_browser_resources(browser, "book")
+
+            result = await browser_flows.open_calendar(browser, book_data.supply_id, timer)
+            if result is None:
+                result = await browser_flows.book_date(browser, get_formated_date(book_data.dt), timer)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                print("Бронирование отменено клиентом", phone)
+                metrics.record_outcome("book", metrics.CANCELLED, timer)
+            elif isinstance(e, Exception):
+                metrics.record_outcome("book", metrics.ERROR, timer)
+            if browser is not None:
+                await browser.quit()
+            raise
+        if result.get('code') == 'NOT_AUTHENTICATED':
+            await browser.quit()
+        else:
+            browser_cache.put(phone, browser, "cdp")
+        metrics.record_outcome("book", book_outcome(result), timer)
+        result['timings'] = timer.report()
+        print("Бронирование", phone, result['success'], result['timings'])
+        return result
+
+    @classmethod
+    def _book_with_driver(cls, driver, book_data: BookRequest, timer: StepTimer) -> Dict:
+        error = cls._open_calendar(driver, book_data.supply_id, timer)
+        if error is not None:
+            return error
+
+        target_date = get_formated_date(book_data.dt)
+
+        with timer.step("date_lookup"):
+            found = find_date_cell(driver, target_date)
+
+        if found and found[1] is not None:
+            item, button = found
+            return cls._confirm_booking(driver, item, button, timer)
+
+        timer.capture("date_lookup")
+        print("⚠️ Target date not found or booking failed.")
+        return {
+            'success': False,
+            'message': 'Не удалось забронировать товар на указанную дату'
+        }
+
+    @classmethod
+    def _open_calendar(cls, driver, supply_id: int, timer: StepTimer) -> Optional[Dict]:
+        """Открыть страницу поставки и календарь переноса. Возвращает ошибку или None"""
+        url = supply_detail_url(supply_id)
+
+        with timer.step("navigation"):
+            driver.get(url)
+        check_cancelled()
+
+        wait = WebDriverWait(driver, 30, poll_frequency=WAIT_POLL_INTERVAL)
+
+        cls.close_popups(driver)
 
         if url != driver.current_url:
-            driver.quit()
             print("⚠️ Redirected to another page, possibly not logged in.")
+            timer.capture("navigation")
             return {
                 'success': False,
                 'message': 'Пользователь не авторизован',
                 'code': 'NOT_AUTHENTICATED'
             }
 
-        # Wait for any buttons to appear
-        buttons = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "Supply-detail-options__plan-desktop-button__-N407e2FDC")))
-        if len(buttons) >= 1:
-            buttons[0].click()
-        else:
-            driver.quit()
-            print("⚠️ Not enough buttons found on page.")
+        with timer.step("plan_button"):
+            # Wait for any buttons to appear
+            buttons = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, PLAN_BUTTON_CLASS)))
+            if len(buttons) >= 1:
+                buttons[0].click()
+            else:
+                print("⚠️ Not enough buttons found on page.")
+                timer.capture("plan_button")
+                return {
+                    'success': False,
+                    'message': 'Не удалось найти кнопку бронирования'
+                }
+
+        with timer.step("modal"):
+            # Ждем, пока отрисуется попап подтверждения или календарь
+            try:
+                wait_for(driver, lambda d: d.find_elements(By.XPATH, CONFIRM_POPUP_XPATH)
+                         or d.find_elements(By.CSS_SELECTOR, CALENDAR_CELL_CSS_SELECTOR), BOOK_MODAL_TIMEOUT)
+            except TimeoutException:
+                print("⚠️ Modal did not render in time.")
+            check_cancelled()
+            cls.close_popups(driver)
+            confirm_pop_up = driver.find_elements(By.XPATH, CONFIRM_POPUP_XPATH)
+            if confirm_pop_up:
+                confirm_pop_up[0].click()
+                try:
+                    wait_for(driver, lambda d: not d.find_elements(By.XPATH, CONFIRM_POPUP_XPATH)
+                             and d.find_elements(By.CSS_SELECTOR, CALENDAR_CELL_CSS_SELECTOR), BOOK_MODAL_TIMEOUT)
+                except TimeoutException:
+                    print("⚠️ Calendar did not render in time.")
+
+            cls.close_popups(driver)
+        check_cancelled()
+        return None
+
+    @staticmethod
+    def _confirm_booking(driver, item, button, timer: StepTimer) -> Dict:
+        """Выбрать дату в ячейке календаря и подтвердить перенос"""
+        with timer.step("date_select"):
+            ActionChains(driver).scroll_to_element(item).move_to_element(item).perform()
+            ActionChains(driver).move_to_element(button).perform()
+            button.click()
+
+            # Ждем кнопку подтверждения переноса
+            try:
+                confirm_button = wait_for(
+                    driver, EC.element_to_be_clickable((By.XPATH, TRANSFER_BUTTON_XPATH)), BOOK_MODAL_TIMEOUT
+                )
+            except TimeoutException:
+                confirm_button = None
+
+        if confirm_button is None:
+            timer.capture("date_select")
+            print("⚠️ Transfer button did not appear.")
             return {
                 'success': False,
-                'message': 'Не удалось найти кнопку бронирования'
+                'message': 'Не удалось забронировать товар на указанную дату'
             }
 
-        time.sleep(3)  # Let popup render
-        self.close_popups(driver)
-        confirm_pop_up = driver.find_elements(By.XPATH, """//*[@id="Portal-modal"]/div[5]/div/div/div[4]/div[1]/button""")
-        if confirm_pop_up:
-            confirm_pop_up[0].click()
-            time.sleep(3)
+        with timer.step("date_confirm"):
+            confirm_button.click()
+            WebDriverWait(driver, 30, poll_frequency=WAIT_POLL_INTERVAL).until(EC.invisibility_of_element(confirm_button))
+        print("✅ Supply successfully booked.")
 
-        self.close_popups(driver)
+        return {
+            'success': True,
+            'message': 'Товар успешно забронирован'
+        }
 
-        rows = driver.find_elements(By.TAG_NAME, "tr")
-        target_date = get_formated_date(book_data.dt)
 
-        for row in rows:
-            items = row.find_elements(By.TAG_NAME, "td")
-            for item in items:
-                spans = item.find_elements(By.TAG_NAME, "span")
-                if spans and target_date in spans[0].text:
-                    driver.execute_script("arguments[0].scrollIntoView(true);", item)
-                    popup_divs = item.find_elements(By.CSS_SELECTOR, "div.Custom-popup")
-
-                    if popup_divs:
-
-                        ActionChains(driver).scroll_to_element(item).move_to_element(item).perform()
-                        button = item.find_elements(By.TAG_NAME, "button")[-1]
-                        ActionChains(driver).move_to_element(button).perform()
-                        button.click()
-                        time.sleep(2)
-
-                        driver.save_screenshot("screenshot.png")
-
-                        confirm_buttons = driver.find_elements(By.TAG_NAME, "button")
-                        for confirm_button in confirm_buttons:
-                            if "Перенести" == confirm_button.text.strip():
-                                driver.save_screenshot("screenshot1.png")
-                                confirm_button.click()
-                                wait.until(EC.invisibility_of_element(confirm_button))
-                                driver.save_screenshot("screenshot2.png")
-                                print("✅ Supply successfully booked.")
-
-                                driver.quit()
-                                return {
-                                    'success': True,
-                                    'message': 'Товар успешно забронирован'
-                                }
+def get_session_driver(auth_session: AuthSession):
+    """Драйвер сессии: свой, если сессию открыл этот процесс, иначе переподключаемся к Grid"""
+    driver = local_drivers.get(auth_session.phone)
+    if driver is not None and driver.session_id == auth_session.remote_session_id:
+        return driver
+
+    driver = attach_driver(auth_session.executor_url, auth_session.remote_session_id)
+    local_drivers[auth_session.phone] = driver
+    return driver
+
+
+def close_session(phone: str, driver=None):
+    """Закрыть браузер сессии и удалить ее из хранилища (выполняется в пуле потоков)"""
+    cached = browser_cache.pop(phone)
+    if cached is not None:
+        close_cached_browser_now(cached)
+    browser = local_browsers.pop(phone, None)
+    if browser is not None:
+        try:
+            browser.close_threadsafe()
+        except Exception:
+            pass
+    elif driver is None:
+        auth_session = sessions.get(phone)
+        if auth_session is not None and auth_session.backend == "cdp":
+            try:
+                close_remote_browser(auth_session.executor_url)
+            except Exception:
+                pass
+        elif auth_session is not None:
+            driver = get_session_driver(auth_session)
+    if driver is not None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    local_drivers.pop(phone, None)
+    sessions.delete(phone)
+
+
+async def get_session_browser(auth_session: AuthSession) -> CdpBrowser:
+    """CDP-браузер сессии: свой или подключаемся к браузеру другого воркера"""
+    browser = local_browsers.get(auth_session.phone)
+    if browser is not None and browser.session_id == auth_session.remote_session_id:
+        return browser
+
+    browser = await CdpBrowser.attach(auth_session.executor_url, auth_session.remote_session_id)
+    local_browsers[auth_session.phone] = browser
+    return browser
+
+
+async def close_browser_session(phone: str, browser: Optional[CdpBrowser] = None) -> None:
+    """Закрыть CDP-браузер сессии и удалить ее из хранилища"""
+    browser = local_browsers.pop(phone, None) or browser
+    if browser is not None:
+        try:
+            await browser.quit()
+        except Exception:
+            pass
+    await asyncio.to_thread(sessions.delete, phone)
+
+
+async def close_local_browsers() -> None:
+    """Закрыть CDP-браузеры этого процесса (при остановке приложения)"""
+    browsers = list(local_browsers.values())
+    local_browsers.clear()
+    await asyncio.gather(*(browser.quit() for browser in browsers), return_exceptions=True)
+
+
+def poll_watch(watch: Watch) -> Optional[Dict]:
+    """
+    Один опрос календаря наблюдателя (выполняется в пуле потоков).
+    Возвращает результат, когда наблюдение закончено, иначе None.
+    """
+    timer = StepTimer("watch")
+    if watch.driver is None:
+        with timer.step("driver_create"):
+            watch.driver = take_cached_driver(watch.phone)
+            if watch.driver is None:
+                watch.driver = create_driver(profile_manager.open(watch.phone))
+                block_driver_resources(watch.driver, "watch")
+    driver = timer.driver = watch.driver
+
+    try:
+        if not watch_calendar_ready(watch, driver):
+            error = WildberriesAuthService._open_calendar(driver, watch.supply_id, timer)
+            if error is not None:
+                if error.get('code') == 'NOT_AUTHENTICATED':
+                    metrics.record_outcome("watch", metrics.NOT_AUTHENTICATED, timer)
+                    return error
+                # Страница не догрузилась — попробуем в следующий раз
+                return None
+            watch.calendar_opened_at = time.monotonic()
+
+        with timer.step("date_lookup"):
+            found = find_date_cell(driver, get_formated_date(watch.dt))
+        if found and found[1] is not None:
+            item, button = found
+            result = WildberriesAuthService._confirm_booking(driver, item, button, timer)
+            result['timings'] = timer.report()
+            metrics.record_outcome("watch", book_outcome(result), timer)
+            # После подтверждения календарь закрыт — в следующий раз его нужно открыть заново
+            watch.calendar_opened_at = None
+            if result['success']:
+                # Наблюдение закончено, а браузер по-прежнему в кабинете — пригодится следующему бронированию
+                watch.driver = None
+                browser_cache.put(watch.phone, driver, "webdriver")
+                return result
+            print("⚠️ Слот заняли до подтверждения, продолжаем наблюдение", watch.phone)
+            return None
+
+        watch.observe(available_dates(driver))
+        return None
+    except Exception:
+        # Браузер мог сломаться — в следующий раз запустим новый
+        close_watch(watch)
+        raise
+
+
+def watch_calendar_ready(watch: Watch, driver) -> bool:
+    """
+    Календарь, открытый прошлым опросом, можно просто перечитать: страница не устарела
+    и не пора открыть ее заново (SLOT_WATCH_RELOAD_INTERVAL)
+    """
+    if watch.calendar_opened_at is None:
+        return False
+    if time.monotonic() - watch.calendar_opened_at >= SLOT_WATCH_RELOAD_INTERVAL:
+        watch.calendar_opened_at = None
+        return False
+    if not calendar_is_open(driver, watch.supply_id):
+        print("⚠️ Календарь наблюдателя закрылся, открываем заново", watch.phone)
+        watch.calendar_opened_at = None
+        return False
+    return True
+
+
+def close_watch(watch: Watch) -> None:
+    """Закрыть браузер наблюдателя"""
+    watch.calendar_opened_at = None
+    if watch.driver is not None:
+        try:
+            watch.driver.quit()
+        except Exception:
+            pass
+        watch.driver = None
+
+
+slot_watcher = SlotWatcher(
+    poll_watch,
+    close_watch,
+    max_watchers=SLOT_WATCH_MAX,
+    min_interval=SLOT_WATCH_MIN_INTERVAL,
+    max_interval=SLOT_WATCH_MAX_INTERVAL,
+    backoff=SLOT_WATCH_BACKOFF,
+    max_duration=SLOT_WATCH_MAX_DURATION,
+)
+
+# Фоновые задачи сценариев (?job=true)
+job_manager = JobManager(history=JOB_HISTORY, retention=JOB_RETENTION)
+
+
+def quit_driver(driver) -> None:
+    """Закрыть драйвер, не обращая внимания на ошибки (браузер мог уже упасть)"""
+    if driver is None:
+        return
+    try:
         driver.quit()
-        print("⚠️ Target date not found or booking failed.")
-        return {
-            'success': False,
-            'message': 'Не удалось забронировать товар на указанную дату'
-        }
+    except Exception:
+        pass
+
+
+def take_cached_driver(phone: str):
+    """Горячий драйвер телефона из кэша, если браузер еще жив (выполняется в пуле потоков)"""
+    driver = browser_cache.take(phone, "webdriver")
+    if driver is None:
+        return None
+    try:
+        driver.execute_script("return 1")
+        return driver
+    except Exception:
+        quit_driver(driver)
+        return None
+
+
+async def take_cached_browser(phone: str) -> Optional[CdpBrowser]:
+    """Горячий CDP-браузер телефона из кэша, если он еще жив"""
+    browser = browser_cache.take(phone, "cdp")
+    if browser is None:
+        return None
+    try:
+        await browser.evaluate("return 1;")
+        return browser
+    except Exception:
+        try:
+            await browser.quit()
+        except Exception:
+            pass
+        return None
+
+
+async def launch_with_cookies(cookies: List[Dict]) -> Optional[CdpBrowser]:
+    """CDP-браузер с чистым временным профилем и сохраненными куками; None — куки подставить не удалось"""
+    browser = await CdpBrowser.launch()
+    try:
+        await block_browser_resources(browser, "book")
+        await inject_browser_cookies(browser, cookies)
+        return browser
+    except Exception as e:
+        print(f"⚠️ Не удалось подставить куки, бронируем с профилем телефона: {e}")
+        await browser.quit()
+        return None
+
+
+def release_driver(phone: str, driver, result: Dict) -> None:
+    """После сценария: вернуть драйвер в кэш или закрыть, если кабинет разлогинил браузер"""
+    if result.get('code') == 'NOT_AUTHENTICATED':
+        quit_driver(driver)
+    else:
+        browser_cache.put(phone, driver, "webdriver")
+
+
+async def close_cached_browser(entry: CachedBrowser) -> None:
+    """Закрыть браузер, вытесненный из кэша"""
+    if entry.backend == "cdp":
+        await entry.browser.quit()
+    else:
+        await asyncio.to_thread(quit_driver, entry.browser)
+
+
+def close_cached_browser_now(entry: CachedBrowser) -> None:
+    """То же из пула потоков (при закрытии сессии телефона)"""
+    if entry.backend == "cdp":
+        try:
+            entry.browser.close_threadsafe()
+        except Exception:
+            pass
+    else:
+        quit_driver(entry.browser)
+
+
+def browser_cache_size() -> int:
+    """Размер кэша браузеров: не больше потоков executor (простаивающие браузеры им не считаются)"""
+    if BROWSER_CACHE_SIZE > browser_executor.max_workers:
+        print(f"⚠️ BROWSER_CACHE_SIZE={BROWSER_CACHE_SIZE} больше BROWSER_MAX_WORKERS, "
+              f"кэш ограничен {browser_executor.max_workers} браузерами")
+        return browser_executor.max_workers
+    return BROWSER_CACHE_SIZE
+
+
+# Браузеры, уже вошедшие в кабинет, по телефонам: бронирования идут в них без запуска Chrome
+browser_cache = BrowserCache(close_cached_browser, max_size=browser_cache_size(), idle_timeout=BROWSER_CACHE_IDLE_TIMEOUT)
+
+
+def book_outcome(result: Dict) -> str:
+    """Исход бронирования для метрик"""
+    if result['success']:
+        return metrics.SUCCESS
+    if result.get('code') == 'NOT_AUTHENTICATED':
+        return metrics.NOT_AUTHENTICATED
+    return metrics.FAILED
+
+
+def is_profile_active(phone: str) -> bool:
+    """Профиль телефона сейчас используется: открыт браузер или выполняется сценарий"""
+    return (phone in local_drivers or phone in local_browsers or phone in sessions or browser_executor.is_busy(phone)
+            or slot_watcher.is_watching(phone) or browser_cache.has(phone))
 
 
-def get_formated_date(d: date) -> str:
-    month_names = [
-        "января", "февраля", "марта", "апреля", "мая", "июня",
-        "июля", "августа", "сентября", "октября", "ноября", "декабря"
-    ]
-    return f"{d.day} {month_names[d.month - 1]}"
+session_reaper = SessionReaper(sessions, close_session, SESSION_TTL)
+metrics.AUTH_SESSIONS.set_function(lambda: session_reaper.live)
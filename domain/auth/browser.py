@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Protocol, TypeVar
+
+from config import WAIT_POLL_INTERVAL
+
+T = TypeVar("T")
+
+
+class BrowserError(Exception):
+    """Ошибка браузерного бэкенда"""
+
+
+class ElementNotFound(BrowserError):
+    """На странице нет элемента по селектору"""
+
+
+def is_xpath(selector: str) -> bool:
+    """Селекторы — CSS, а начинающиеся с / или ( — XPath"""
+    return selector.startswith(("/", "("))
+
+
+class Browser(Protocol):
+    """
+    Браузер, с которым работают асинхронные сценарии (browser_flows).
+    Реализация одна — CdpBrowser: Selenium-сценарии (auth.py, WildberriesAuthService)
+    работают с WebDriver напрямую и этот протокол не используют.
+
+    Все операции — корутины: ожидание страницы не занимает поток.
+    Селектор — CSS или XPath (см. is_xpath). Скрипты evaluate — тело функции
+    с аргументами в arguments, как у execute_script в Selenium.
+    """
+
+    # Чтобы переподключиться к браузеру из другого воркера (как AuthSession у Grid)
+    session_id: str
+    executor_url: str
+
+    async def goto(self, url: str) -> None: ...
+
+    async def current_url(self) -> str: ...
+
+    async def evaluate(self, script: str, *args: Any) -> Any: ...
+
+    async def count(self, selector: str) -> int: ...
+
+    async def is_visible(self, selector: str) -> bool: ...
+
+    async def hover(self, selector: str) -> None: ...
+
+    async def click(self, selector: str) -> None: ...
+
+    async def type(self, selector: str, text: str) -> None: ...
+
+    async def screenshot(self) -> bytes: ...
+
+    async def page_source(self) -> str: ...
+
+    async def cookies(self) -> List[Dict]: ...
+
+    async def set_cookies(self, cookies: List[Dict]) -> None: ...
+
+    async def quit(self) -> None: ...
+
+
+async def wait_until(check: Callable[[], Awaitable[T]], timeout: float, poll: float = WAIT_POLL_INTERVAL) -> T:
+    """Ждать, пока check() не вернет истинное значение; TimeoutError по истечении timeout"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        value = await check()
+        if value:
+            return value
+        if loop.time() >= deadline:
+            raise TimeoutError(f"Условие не выполнилось за {timeout} сек.")
+        await asyncio.sleep(poll)
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class CachedBrowser:
+    """Авторизованный браузер телефона (драйвер Selenium или CdpBrowser)"""
+    phone: str
+    browser: Any = field(repr=False)
+    backend: str
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class BrowserCache:
+    """
+    Горячие браузеры, уже вошедшие в кабинет, по телефонам (LRU).
+
+    После confirm_auth браузер остается здесь, и book и другие сценарии после входа берут
+    его вместо запуска нового Chrome с профиля. Сценарий забирает браузер целиком (take)
+    и возвращает после себя (put). Браузеров не больше max_size: лишний закрывается, начиная
+    с давно не использованного, а простаивающие дольше idle_timeout секунд закрывает фоновая
+    задача. Каждый браузер держит слот Grid или процесс Chrome, поэтому бюджет небольшой.
+    put и take можно вызывать из любого потока; закрытие всегда идет в фоновой задаче.
+    """
+
+    def __init__(self, close: Callable[[CachedBrowser], Awaitable[None]], max_size: int, idle_timeout: float):
+        self.close = close
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._entries: "OrderedDict[str, CachedBrowser]" = OrderedDict()
+        self._closing: List[CachedBrowser] = []
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._misses = 0
+        self._evicted_idle = 0
+        self._evicted_size = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def put(self, phone: str, browser: Any, backend: str) -> None:
+        """Оставить браузер телефона горячим"""
+        entry = CachedBrowser(phone=phone, browser=browser, backend=backend)
+        with self._lock:
+            old = self._entries.pop(phone, None)
+            if old is not None and old.browser is not browser:
+                self._closing.append(old)
+            self._entries[phone] = entry
+            while len(self._entries) > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._closing.append(evicted)
+                self._evicted_size += 1
+        self._wake_up()
+
+    def take(self, phone: str, backend: str) -> Optional[Any]:
+        """
+        Забрать браузер телефона для сценария бэкенда backend (webdriver или cdp).
+        None — в кэше нет, он уже остыл или он другого бэкенда (такой закрывается своим способом).
+        """
+        with self._lock:
+            entry = self._entries.pop(phone, None)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.backend == backend and time.monotonic() - entry.last_used <= self.idle_timeout:
+                self._hits += 1
+                return entry.browser
+            self._closing.append(entry)
+            self._misses += 1
+            if entry.backend == backend:
+                self._evicted_idle += 1
+        self._wake_up()
+        return None
+
+    def pop(self, phone: str) -> Optional[CachedBrowser]:
+        """Убрать браузер телефона из кэша, не закрывая (его закроет вызвавший)"""
+        with self._lock:
+            return self._entries.pop(phone, None)
+
+    def has(self, phone: str) -> bool:
+        with self._lock:
+            return phone in self._entries
+
+    def start(self) -> None:
+        """Запустить фоновую задачу в текущем event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу и закрыть все браузеры"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        with self._lock:
+            closing = self._closing + list(self._entries.values())
+            self._closing = []
+            self._entries.clear()
+        await self._close_all(closing)
+
+    def _wake_up(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            await self._close_all(self._collect())
+
+            delay = self._next_delay()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _collect(self) -> List[CachedBrowser]:
+        """Браузеры, которые пора закрыть: вытесненные и остывшие"""
+        expired_before = time.monotonic() - self.idle_timeout
+        with self._lock:
+            closing, self._closing = self._closing, []
+            for phone, entry in list(self._entries.items()):
+                if entry.last_used <= expired_before:
+                    del self._entries[phone]
+                    closing.append(entry)
+                    self._evicted_idle += 1
+        return closing
+
+    def _next_delay(self) -> Optional[float]:
+        with self._lock:
+            if not self._entries:
+                return None
+            oldest = min(entry.last_used for entry in self._entries.values())
+        return max(oldest + self.idle_timeout - time.monotonic(), 0)
+
+    async def _close_all(self, entries: List[CachedBrowser]) -> None:
+        for entry in entries:
+            try:
+                await self.close(entry)
+            except Exception as e:
+                print(f"Ошибка закрытия браузера из кэша {entry.phone}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evicted_idle": self._evicted_idle,
+                "evicted_size": self._evicted_size,
+            }
@@ -0,0 +1,227 @@
+import asyncio
+from typing import Dict, Optional
+
+from config import CODE_SCREEN_TIMEOUT, CODE_RESULT_TIMEOUT, CODE_DIGIT_DELAY, BOOK_MODAL_TIMEOUT
+from .auth import (
+    SELLER_WILDBERRIES_URL, NUMBER_INPUT_CSS_SELECTOR, COUNTRY_CODE_INPUT_CSS_SELECTOR,
+    NUMBER_INPUT_BUTTON_CSS_SELECTOR, CODE_INPUT_CONTAINER_CSS_SELECTOR, COUNTRY_DROPDOWN_CSS_SELECTOR,
+    COUNTRY_OPTION_CSS_SELECTOR, PAGE_STATE_ARGS, split_country_code, code_rejected, _timed,
+)
+from .browser import Browser, wait_until
+from .page_state import PAGE_STATE_SCRIPT, PageState, CODE_SCREEN, COOLDOWN, WRONG_CODE, LOGGED_IN, UNKNOWN
+from .supply_calendar import (
+    supply_detail_url, MARK_DATE_CELL_SCRIPT, DATE_CELL_SELECTOR, DATE_BUTTON_SELECTOR,
+    PLAN_BUTTON_CLASS, CONFIRM_POPUP_XPATH, CALENDAR_CELL_CSS_SELECTOR, TRANSFER_BUTTON_XPATH,
+)
+from .timing import StepTimer
+
+# Асинхронные версии сценариев auth.py и бронирования для BROWSER_BACKEND=cdp (CdpBrowser).
+# Это отдельная реализация, а не общий код с Selenium-сценариями: общие у них только селекторы
+# и скрипты страниц (auth.py, page_state.py, supply_calendar.py). Меняя шаги сценария,
+# меняйте обе версии.
+
+# Помечает index-й элемент по селектору атрибутом data-wb-target=mark, чтобы кликнуть по нему
+MARK_SCRIPT = """
+const [selector, index, mark] = arguments;
+document.querySelectorAll('[data-wb-target="' + mark + '"]').forEach(el => el.removeAttribute('data-wb-target'));
+const elements = document.querySelectorAll(selector);
+if (index >= elements.length) {
+    return false;
+}
+elements[index].setAttribute('data-wb-target', mark);
+return true;
+"""
+
+# Попапы, которые закрывает WildberriesAuthService.close_popups
+CLOSE_POPUPS_SCRIPT = """
+let closed = 0;
+for (const span of document.querySelectorAll('button span')) {
+    if (span.textContent === 'Принимаю') {
+        span.closest('button').click();
+        closed++;
+        break;
+    }
+}
+for (const selector of [
+    "div[class*='Button-tooltip'][role='button'][tabindex='0']",
+    "div[class*='Tooltip-hint-view__close-button'][aria-label='Close'][data-action='close']",
+]) {
+    const element = document.querySelector(selector);
+    if (element) {
+        element.click();
+        closed++;
+    }
+}
+return closed;
+"""
+
+
+def marked(mark: str) -> str:
+    return f'[data-wb-target="{mark}"]'
+
+
+async def page_state(browser: Browser) -> PageState:
+    state, seconds = await browser.evaluate(PAGE_STATE_SCRIPT, *PAGE_STATE_ARGS)
+    return PageState(state, seconds)
+
+
+async def request_code(browser: Browser, number: str, timer: Optional[StepTimer] = None) -> None:
+    """Запросить SMS-код (как auth.request_code)"""
+    with _timed(timer, "navigation"):
+        await browser.goto(SELLER_WILDBERRIES_URL)
+        await wait_until(lambda: browser.count(NUMBER_INPUT_CSS_SELECTOR), 30)
+
+    index, number = split_country_code(number)
+
+    with _timed(timer, "country_select"):
+        await wait_until(lambda: browser.is_visible(COUNTRY_CODE_INPUT_CSS_SELECTOR), 30)
+        await browser.click(COUNTRY_CODE_INPUT_CSS_SELECTOR)
+        await wait_until(lambda: browser.is_visible(COUNTRY_DROPDOWN_CSS_SELECTOR), 10)
+
+        options = f"{COUNTRY_DROPDOWN_CSS_SELECTOR} {COUNTRY_OPTION_CSS_SELECTOR}"
+        if await browser.evaluate(MARK_SCRIPT, options, index, "country"):
+            await browser.click(marked("country"))
+        else:
+            print(f"⚠️ Could not find country code index {index}")
+
+    with _timed(timer, "phone_submit"):
+        await browser.type(NUMBER_INPUT_CSS_SELECTOR, number)
+        await wait_until(lambda: browser.is_visible(NUMBER_INPUT_BUTTON_CSS_SELECTOR), 30)
+        await browser.click(NUMBER_INPUT_BUTTON_CSS_SELECTOR)
+
+
+async def wait_code_screen(browser: Browser, timeout: float = CODE_SCREEN_TIMEOUT,
+                           timer: Optional[StepTimer] = None) -> PageState:
+    """Ждать экран ввода кода или ограничение на запрос (как auth.wait_code_screen)"""
+    async def state() -> Optional[PageState]:
+        page = await page_state(browser)
+        # Уход со страницы входа тоже ответ: дальше ждать нечего
+        return page if page.state in (CODE_SCREEN, COOLDOWN, LOGGED_IN) else None
+
+    with _timed(timer, "code_screen"):
+        try:
+            return await wait_until(state, timeout)
+        except TimeoutError:
+            return PageState(UNKNOWN)
+
+
+async def verify_code(browser: Browser, verification_code: str, timer: Optional[StepTimer] = None) -> Dict:
+    """Ввести код из SMS (как auth.verify_code)"""
+    with _timed(timer, "code_entry"):
+        count = await wait_until(lambda: browser.count(CODE_INPUT_CONTAINER_CSS_SELECTOR), 30)
+        for i in range(count):
+            await browser.evaluate(MARK_SCRIPT, f"{CODE_INPUT_CONTAINER_CSS_SELECTOR} input", i, "code")
+            await browser.type(marked("code"), verification_code[i])
+            if CODE_DIGIT_DELAY:
+                await asyncio.sleep(CODE_DIGIT_DELAY)
+
+    async def state() -> Optional[str]:
+        page = await page_state(browser)
+        return page.state if page.state in (WRONG_CODE, LOGGED_IN) else None
+
+    with _timed(timer, "code_result"):
+        try:
+            result = await wait_until(state, CODE_RESULT_TIMEOUT)
+        except TimeoutError:
+            result = (await page_state(browser)).state
+
+    if result != LOGGED_IN:
+        return code_rejected(result)
+
+    return {
+        "success": True,
+        "message": "Авторизация успешна",
+    }
+
+
+async def open_calendar(browser: Browser, supply_id: int, timer: StepTimer) -> Optional[Dict]:
+    """Открыть календарь переноса поставки (как WildberriesAuthService._open_calendar). Возвращает ошибку или None"""
+    url = supply_detail_url(supply_id)
+
+    with timer.step("navigation"):
+        await browser.goto(url)
+
+    await browser.evaluate(CLOSE_POPUPS_SCRIPT)
+
+    if url != await browser.current_url():
+        print("⚠️ Redirected to another page, possibly not logged in.")
+        return {
+            'success': False,
+            'message': 'Пользователь не авторизован',
+            'code': 'NOT_AUTHENTICATED'
+        }
+
+    with timer.step("plan_button"):
+        plan_button = "." + PLAN_BUTTON_CLASS
+        try:
+            await wait_until(lambda: browser.count(plan_button), 30)
+        except TimeoutError:
+            print("⚠️ Not enough buttons found on page.")
+            return {
+                'success': False,
+                'message': 'Не удалось найти кнопку бронирования'
+            }
+        await browser.click(plan_button)
+
+    with timer.step("modal"):
+        async def modal() -> int:
+            return await browser.count(CONFIRM_POPUP_XPATH) or await browser.count(CALENDAR_CELL_CSS_SELECTOR)
+
+        try:
+            await wait_until(modal, BOOK_MODAL_TIMEOUT)
+        except TimeoutError:
+            print("⚠️ Modal did not render in time.")
+        await browser.evaluate(CLOSE_POPUPS_SCRIPT)
+
+        if await browser.count(CONFIRM_POPUP_XPATH):
+            await browser.click(CONFIRM_POPUP_XPATH)
+
+            async def calendar() -> bool:
+                return not await browser.count(CONFIRM_POPUP_XPATH) and bool(
+                    await browser.count(CALENDAR_CELL_CSS_SELECTOR))
+
+            try:
+                await wait_until(calendar, BOOK_MODAL_TIMEOUT)
+            except TimeoutError:
+                print("⚠️ Calendar did not render in time.")
+
+        await browser.evaluate(CLOSE_POPUPS_SCRIPT)
+    return None
+
+
+async def book_date(browser: Browser, target_date: str, timer: StepTimer) -> Dict:
+    """Выбрать дату target_date ("5 ноября") в открытом календаре и подтвердить перенос"""
+    failed = {
+        'success': False,
+        'message': 'Не удалось забронировать товар на указанную дату'
+    }
+
+    with timer.step("date_lookup"):
+        found = await browser.evaluate(MARK_DATE_CELL_SCRIPT, target_date)
+    if not found:
+        print("⚠️ Target date not found or booking failed.")
+        return failed
+
+    with timer.step("date_select"):
+        await browser.hover(DATE_CELL_SELECTOR)
+        await browser.hover(DATE_BUTTON_SELECTOR)
+        await browser.click(DATE_BUTTON_SELECTOR)
+        try:
+            await wait_until(lambda: browser.is_visible(TRANSFER_BUTTON_XPATH), BOOK_MODAL_TIMEOUT)
+        except TimeoutError:
+            print("⚠️ Transfer button did not appear.")
+            return failed
+
+    with timer.step("date_confirm"):
+        await browser.click(TRANSFER_BUTTON_XPATH)
+
+        async def closed() -> bool:
+            return not await browser.is_visible(TRANSFER_BUTTON_XPATH)
+
+        await wait_until(closed, 30)
+    print("✅ Supply successfully booked.")
+
+    return {
+        'success': True,
+        'message': 'Товар успешно забронирован'
+    }
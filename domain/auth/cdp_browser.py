@@ -0,0 +1,404 @@
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import CHROME_BINARY, CDP_HEADLESS, CDP_LAUNCH_TIMEOUT, CDP_COMMAND_TIMEOUT, CDP_NAVIGATION_TIMEOUT
+from .browser import BrowserError, ElementNotFound
+
+# Файл, в который Chrome пишет порт и путь DevTools при --remote-debugging-port=0
+DEVTOOLS_PORT_FILE = "DevToolsActivePort"
+
+# Поиск элемента по CSS или XPath внутри evaluate (селекторы — как в browser.is_xpath)
+FIND_ELEMENT_JS = """
+const findElement = (selector) => (selector.startsWith('/') || selector.startsWith('('))
+    ? document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+    : document.querySelector(selector);
+"""
+
+COUNT_SCRIPT = """
+const [selector] = arguments;
+if (selector.startsWith('/') || selector.startsWith('(')) {
+    return document.evaluate('count(' + selector + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+}
+return document.querySelectorAll(selector).length;
+"""
+
+# Центр видимого элемента после прокрутки к нему или null
+ELEMENT_CENTER_SCRIPT = FIND_ELEMENT_JS + """
+const element = findElement(arguments[0]);
+if (!element) {
+    return null;
+}
+element.scrollIntoView({block: 'center', inline: 'center'});
+const rect = element.getBoundingClientRect();
+if (!rect.width || !rect.height) {
+    return null;
+}
+return [rect.left + rect.width / 2, rect.top + rect.height / 2];
+"""
+
+IS_VISIBLE_SCRIPT = FIND_ELEMENT_JS + """
+const element = findElement(arguments[0]);
+if (!element) {
+    return false;
+}
+const style = getComputedStyle(element);
+const rect = element.getBoundingClientRect();
+return style.visibility !== 'hidden' && style.display !== 'none' && rect.width > 0 && rect.height > 0;
+"""
+
+
+class CdpError(BrowserError):
+    """Ошибка команды Chrome DevTools Protocol"""
+
+
+class CdpConnection:
+    """
+    Соединение с браузером по CDP (один websocket на браузер, сессии страниц — flatten).
+    Ответы на команды и события разбирает одна фоновая задача.
+    """
+
+    def __init__(self, websocket):
+        self._ws = websocket
+        self._next_id = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._waiters: Dict[Tuple[Optional[str], str], List[asyncio.Future]] = {}
+        self._listeners: Dict[Tuple[Optional[str], str], List[Callable[[Dict], None]]] = {}
+        self._reader = asyncio.create_task(self._read())
+
+    @classmethod
+    async def connect(cls, url: str) -> "CdpConnection":
+        try:
+            import websockets
+        except ImportError:
+            raise RuntimeError("Для BROWSER_BACKEND=cdp нужен пакет websockets: pip install websockets")
+        websocket = await websockets.connect(url, max_size=None, ping_interval=None)
+        return cls(websocket)
+
+    async def _read(self) -> None:
+        try:
+            async for raw in self._ws:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self._pending.pop(message["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CdpError(message["error"].get("message", "ошибка CDP")))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+                key = (message.get("sessionId"), message.get("method"))
+                for future in self._waiters.pop(key, []):
+                    if not future.done():
+                        future.set_result(message.get("params", {}))
+                for listener in self._listeners.get(key, []):
+                    listener(message.get("params", {}))
+        except Exception as e:
+            print(f"Соединение CDP прервано: {e}")
+        finally:
+            for future in list(self._pending.values()) + [f for fs in self._waiters.values() for f in fs]:
+                if not future.done():
+                    future.set_exception(CdpError("Соединение с браузером закрыто"))
+            self._pending.clear()
+            self._waiters.clear()
+
+    async def send(self, method: str, params: Optional[Dict] = None, session_id: Optional[str] = None,
+                   timeout: float = CDP_COMMAND_TIMEOUT) -> Dict:
+        self._next_id += 1
+        message_id = self._next_id
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self._ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def wait_event(self, method: str, session_id: Optional[str] = None) -> asyncio.Future:
+        """Будущее, которое завершится параметрами ближайшего события method"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault((session_id, method), []).append(future)
+        return future
+
+    def subscribe(self, method: str, session_id: Optional[str], listener: Callable[[Dict], None]) -> None:
+        """Вызывать listener(params) на каждое событие method (из задачи чтения: без await внутри)"""
+        self._listeners.setdefault((session_id, method), []).append(listener)
+
+    async def close(self) -> None:
+        await self._ws.close()
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+
+
+class CdpBrowser:
+    """
+    Chrome под управлением CDP: асинхронная реализация Browser.
+
+    launch запускает локальный Chrome с профилем телефона, attach подключается к уже
+    запущенному по адресу DevTools (executor_url) и id вкладки (session_id) — так
+    сессию авторизации может продолжить другой воркер на той же машине.
+    Клики и ввод — настоящие события мыши и клавиатуры (Input.*), а не element.click().
+    """
+
+    def __init__(self, connection: CdpConnection, executor_url: str, target_id: str, session: str,
+                 process: Optional[asyncio.subprocess.Process] = None, temp_dir: Optional[str] = None):
+        self._connection = connection
+        self.executor_url = executor_url
+        self.session_id = target_id
+        self._session = session
+        self._process = process
+        self._temp_dir = temp_dir
+        self._loop = asyncio.get_running_loop()
+        self._closed = False
+
+    @classmethod
+    async def launch(cls, profile_dir: Optional[str] = None, headless: bool = CDP_HEADLESS) -> "CdpBrowser":
+        """Запустить Chrome с профилем profile_dir (без него — во временном профиле)"""
+        temp_dir = None
+        if profile_dir is None:
+            profile_dir = temp_dir = tempfile.mkdtemp(prefix="cdp-profile-")
+        os.makedirs(profile_dir, exist_ok=True)
+        port_file = os.path.join(profile_dir, DEVTOOLS_PORT_FILE)
+        if os.path.exists(port_file):
+            os.remove(port_file)
+
+        args = [
+            CHROME_BINARY,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={profile_dir}",
+            "--profile-directory=Default",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-blink-features=AutomationControlled",
+            "--disable-extensions",
+            "--disable-gpu",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--window-size=1200,800",
+            "--lang=ru-RU",
+        ]
+        if headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            executor_url = await asyncio.wait_for(cls._devtools_url(port_file, process), CDP_LAUNCH_TIMEOUT)
+            connection = await CdpConnection.connect(executor_url)
+            targets = await connection.send("Target.getTargets")
+            pages = [t["targetId"] for t in targets.get("targetInfos", []) if t.get("type") == "page"]
+            target_id = pages[0] if pages else (await connection.send("Target.createTarget", {"url": "about:blank"}))["targetId"]
+            browser = await cls._attach(connection, executor_url, target_id, process, temp_dir)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        return browser
+
+    @staticmethod
+    async def _devtools_url(port_file: str, process: asyncio.subprocess.Process) -> str:
+        while True:
+            if process.returncode is not None:
+                raise CdpError(f"Chrome завершился при запуске (код {process.returncode})")
+            try:
+                with open(port_file, encoding="utf-8") as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    return f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+            except FileNotFoundError:
+                pass
+            await asyncio.sleep(0.05)
+
+    @classmethod
+    async def attach(cls, executor_url: str, target_id: str) -> "CdpBrowser":
+        """Подключиться к вкладке браузера, запущенного другим воркером"""
+        connection = await CdpConnection.connect(executor_url)
+        try:
+            return await cls._attach(connection, executor_url, target_id)
+        except BaseException:
+            await connection.close()
+            raise
+
+    @classmethod
+    async def _attach(cls, connection: CdpConnection, executor_url: str, target_id: str,
+                      process: Optional[asyncio.subprocess.Process] = None,
+                      temp_dir: Optional[str] = None) -> "CdpBrowser":
+        attached = await connection.send("Target.attachToTarget", {"targetId": target_id, "flatten": True})
+        browser = cls(connection, executor_url, target_id, attached["sessionId"], process, temp_dir)
+        await browser._send("Page.enable")
+        return browser
+
+    async def _send(self, method: str, params: Optional[Dict] = None, timeout: float = CDP_COMMAND_TIMEOUT) -> Dict:
+        return await self._connection.send(method, params, self._session, timeout)
+
+    # --- Browser ---
+
+    async def goto(self, url: str) -> None:
+        loaded = self._connection.wait_event("Page.loadEventFired", self._session)
+        result = await self._send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            loaded.cancel()
+            raise CdpError(f"Не удалось открыть {url}: {result['errorText']}")
+        await asyncio.wait_for(loaded, CDP_NAVIGATION_TIMEOUT)
+
+    async def current_url(self) -> str:
+        return await self.evaluate("return location.href;")
+
+    async def evaluate(self, script: str, *args: Any) -> Any:
+        expression = f"(function() {{\n{script}\n}}).apply(null, {json.dumps(list(args), default=str)})"
+        result = await self._send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": True,
+        })
+        details = result.get("exceptionDetails")
+        if details:
+            description = details.get("exception", {}).get("description") or details.get("text")
+            raise CdpError(f"Ошибка скрипта: {description}")
+        return result.get("result", {}).get("value")
+
+    async def count(self, selector: str) -> int:
+        return int(await self.evaluate(COUNT_SCRIPT, selector) or 0)
+
+    async def is_visible(self, selector: str) -> bool:
+        return bool(await self.evaluate(IS_VISIBLE_SCRIPT, selector))
+
+    async def _center(self, selector: str) -> Tuple[float, float]:
+        center = await self.evaluate(ELEMENT_CENTER_SCRIPT, selector)
+        if not center:
+            raise ElementNotFound(selector)
+        return center[0], center[1]
+
+    async def _mouse(self, event: str, x: float, y: float) -> None:
+        params = {"type": event, "x": x, "y": y}
+        if event != "mouseMoved":
+            params.update(button="left", clickCount=1)
+        await self._send("Input.dispatchMouseEvent", params)
+
+    async def hover(self, selector: str) -> None:
+        x, y = await self._center(selector)
+        await self._mouse("mouseMoved", x, y)
+
+    async def click(self, selector: str) -> None:
+        x, y = await self._center(selector)
+        for event in ("mouseMoved", "mousePressed", "mouseReleased"):
+            await self._mouse(event, x, y)
+
+    async def type(self, selector: str, text: str) -> None:
+        await self.click(selector)
+        await self._send("Input.insertText", {"text": text})
+
+    async def screenshot(self) -> bytes:
+        result = await self._send("Page.captureScreenshot", {"format": "png"})
+        return base64.b64decode(result["data"])
+
+    async def page_source(self) -> str:
+        return await self.evaluate("return document.documentElement.outerHTML;")
+
+    async def cookies(self) -> List[Dict]:
+        """Все куки браузера в формате Selenium (expiry — unix-время, если кука не сессионная)"""
+        result = await self._connection.send("Storage.getCookies")
+        cookies = []
+        for cookie in result.get("cookies", []):
+            item = {
+                "name": cookie["name"],
+                "value": cookie["value"],
+                "domain": cookie.get("domain"),
+                "path": cookie.get("path"),
+                "secure": cookie.get("secure", False),
+                "httpOnly": cookie.get("httpOnly", False),
+            }
+            if not cookie.get("session") and cookie.get("expires", -1) > 0:
+                item["expiry"] = int(cookie["expires"])
+            cookies.append(item)
+        return cookies
+
+    async def set_cookies(self, cookies: List[Dict]) -> None:
+        """Поставить куки (параметры CookieParam из Network.setCookies)"""
+        await self._send("Network.setCookies", {"cookies": cookies})
+
+    # --- блокировка запросов ---
+
+    async def block_urls(self, blocked: Sequence[str], allowed: Sequence[str] = ()) -> None:
+        """
+        Не загружать URL по шаблонам blocked (* — любые символы).
+        Без исключений — Network.setBlockedURLs. С исключениями allowed — перехват Fetch только
+        для подходящих под blocked запросов: их пропускаем, если они подходят под allowed.
+        """
+        if not allowed:
+            await self._send("Network.enable")
+            await self._send("Network.setBlockedURLs", {"urls": list(blocked)})
+            return
+
+        from .resource_blocking import matches_any
+
+        def paused(params: Dict) -> None:
+            if matches_any(params["request"]["url"], allowed):
+                command = self._send("Fetch.continueRequest", {"requestId": params["requestId"]})
+            else:
+                command = self._send("Fetch.failRequest", {"requestId": params["requestId"],
+                                                           "errorReason": "BlockedByClient"})
+            asyncio.ensure_future(command).add_done_callback(_ignore_result)
+
+        self._connection.subscribe("Fetch.requestPaused", self._session, paused)
+        await self._send("Fetch.enable", {"patterns": [{"urlPattern": pattern} for pattern in blocked]})
+
+    async def quit(self) -> None:
+        """Закрыть браузер (и дождаться процесса Chrome, если его запустил этот воркер)"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._connection.send("Browser.close", timeout=5)
+        except Exception:
+            pass
+        try:
+            await self._connection.close()
+        except Exception:
+            pass
+        if self._process is not None and self._process.returncode is None:
+            try:
+                await asyncio.wait_for(self._process.wait(), 10)
+            except asyncio.TimeoutError:
+                self._process.kill()
+                await self._process.wait()
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+    def close_threadsafe(self, timeout: float = 15) -> None:
+        """Закрыть браузер из потока пула (уборщик сессий закрывает их в потоках)"""
+        asyncio.run_coroutine_threadsafe(self.quit(), self._loop).result(timeout)
+
+
+def _ignore_result(future: asyncio.Future) -> None:
+    # Запрос мог завершиться раньше (вкладка закрыта) — это не ошибка сценария
+    if not future.cancelled():
+        future.exception()
+
+
+def close_remote_browser(executor_url: str, timeout: float = 15) -> None:
+    """Закрыть браузер, запущенный другим воркером (вызывать из потока без event loop)"""
+    async def close() -> None:
+        connection = await CdpConnection.connect(executor_url)
+        try:
+            await connection.send("Browser.close", timeout=timeout)
+        finally:
+            await connection.close()
+
+    asyncio.run(close())
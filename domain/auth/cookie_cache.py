@@ -0,0 +1,246 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    COOKIE_CACHE_BACKEND, COOKIE_CACHE_TTL, COOKIE_CACHE_MAX_ENTRIES, COOKIE_CACHE_MAX_BYTES, REDIS_URL,
+)
+from .redis_client import get_redis
+
+
+def cache_ttl(ttl: float, earliest_expire: Optional[datetime]) -> float:
+    """TTL записи: не дольше, чем живет самая рано истекающая кука"""
+    if earliest_expire is None:
+        return ttl
+    if earliest_expire.tzinfo is None:
+        earliest_expire = earliest_expire.replace(tzinfo=timezone.utc)
+    return min(ttl, (earliest_expire - datetime.now(timezone.utc)).total_seconds())
+
+
+def copy_cookies(cookies: List[Dict]) -> List[Dict]:
+    return [dict(cookie) for cookie in cookies]
+
+
+class CookieCache:
+    """
+    Кэш куки пользователей в памяти процесса: TTL + LRU с ограничением по числу записей и байтам.
+
+    Чтение из БД может разминуться с invalidate: прочитали старые куки, их тут же перезаписали
+    и сбросили кэш, а потом старые попали в кэш. Поэтому set принимает поколение, взятое
+    через generation до чтения из БД, и ничего не пишет, если после него был invalidate.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # user_id -> (момент истечения, размер, куки)
+        self._entries: "OrderedDict[int, Tuple[float, int, List[Dict]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Поколение растет при каждом invalidate; помним последние сбросы, для забытых — максимум
+        self._generation = 0
+        self._invalidated: "OrderedDict[int, int]" = OrderedDict()
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(user_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            # Копия: вызывающий может менять список, не портя кэш
+            return copy_cookies(entry[2])
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._generation
+
+    def set(self, user_id: int, cookies: List[Dict], earliest_expire: Optional[datetime] = None,
+            generation: Optional[int] = None) -> None:
+        ttl = cache_ttl(self.ttl, earliest_expire)
+        size = len(json.dumps(cookies))
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and self._invalidated.get(user_id, self._forgotten) > generation:
+                # Куки прочитаны до invalidate — уже устарели
+                return
+            cookies = copy_cookies(cookies)
+            if user_id in self._entries:
+                self._remove(user_id)
+            self._entries[user_id] = (time.monotonic() + ttl, size, cookies)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidated[user_id] = self._generation
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.max_entries:
+                _, forgotten = self._invalidated.popitem(last=False)
+                self._forgotten = max(self._forgotten, forgotten)
+            if user_id in self._entries:
+                self._remove(user_id)
+
+    def _remove(self, user_id: int) -> None:
+        _, size, _ = self._entries.pop(user_id)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class RedisCookieCache:
+    """
+    Общий для реплик кэш куки в Redis (вытеснение — по политике maxmemory сервера).
+    Поколение пользователя — счетчик сбросов в отдельном ключе; запись с поколением
+    идет скриптом, который сверяет счетчик и пишет атомарно.
+    """
+
+    KEY_PREFIX = "wb_auth:cookies:"
+    GENERATION_PREFIX = "wb_auth:cookies_generation:"
+    # Счетчик сбросов живет дольше любой записи кэша
+    GENERATION_TTL = 24 * 3600
+    SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+end
+"""
+    blocking = True
+
+    def __init__(self, ttl: float, url: Optional[str] = None, client=None):
+        self.ttl = ttl
+        self.client = client if client is not None else get_redis(url or REDIS_URL)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.KEY_PREFIX}{user_id}"
+
+    def _generation_key(self, user_id: int) -> str:
+        return f"{self.GENERATION_PREFIX}{user_id}"
+
+    def get(self, user_id: int) -> Optional[List[Dict]]:
+        raw = self.client.get(self._key(user_id))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def generation(self, user_id: int) -> int:
+        return int(self.client.get(self._generation_key(user_id)) or 0)
+
+    def set(self, user_id: int, cookies: List[Dict], earliest_expire: Optional[datetime] = None,
+            generation: Optional[int] = None) -> None:
+        ttl = cache_ttl(self.ttl, earliest_expire)
+        if ttl <= 0:
+            return
+        if generation is None:
+            self.client.set(self._key(user_id), json.dumps(cookies), px=int(ttl * 1000))
+            return
+        self.client.eval(self.SET_IF_GENERATION, 2, self._key(user_id), self._generation_key(user_id),
+                         str(generation), json.dumps(cookies), int(ttl * 1000))
+
+    def invalidate(self, user_id: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.incr(self._generation_key(user_id))
+        pipe.expire(self._generation_key(user_id), self.GENERATION_TTL)
+        pipe.delete(self._key(user_id))
+        pipe.execute()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class NoCookieCache:
+    """Кэш выключен"""
+
+    blocking = False
+
+    def get(self, user_id: int) -> Optional[List[Dict]]:
+        return None
+
+    def generation(self, user_id: int) -> int:
+        return 0
+
+    def set(self, user_id: int, cookies: List[Dict], earliest_expire: Optional[datetime] = None,
+            generation: Optional[int] = None) -> None:
+        pass
+
+    def invalidate(self, user_id: int) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "off"}
+
+
+class AsyncCookieCache:
+    """Кэш куки для event loop: сетевой бэкенд (Redis) вызывается в потоке, память — сразу"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def _call(self, fn, *args):
+        if self.cache.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get(self, user_id: int) -> Optional[List[Dict]]:
+        return await self._call(self.cache.get, user_id)
+
+    async def generation(self, user_id: int) -> int:
+        return await self._call(self.cache.generation, user_id)
+
+    async def set(self, user_id: int, cookies: List[Dict], earliest_expire: Optional[datetime] = None,
+                  generation: Optional[int] = None) -> None:
+        await self._call(self.cache.set, user_id, cookies, earliest_expire, generation)
+
+    async def invalidate(self, user_id: int) -> None:
+        await self._call(self.cache.invalidate, user_id)
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+
+def create_cookie_cache():
+    """Кэш по настройке COOKIE_CACHE_BACKEND: memory (по умолчанию), redis или off"""
+    if COOKIE_CACHE_BACKEND == "redis":
+        return RedisCookieCache(COOKIE_CACHE_TTL, REDIS_URL)
+    if COOKIE_CACHE_BACKEND == "off":
+        return NoCookieCache()
+    return CookieCache(COOKIE_CACHE_TTL, COOKIE_CACHE_MAX_ENTRIES, COOKIE_CACHE_MAX_BYTES)
+
+
+cookie_cache = AsyncCookieCache(create_cookie_cache())
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Dict, Optional
+
+from config import COOKIE_PURGE_INTERVAL, COOKIE_PURGE_BATCH_SIZE, COOKIE_PURGE_PAUSE
+from database.base import async_session_maker
+from database.repositories import CookieRepository
+
+
+class CookiePurger:
+    """Периодически удаляет истекшие куки всех пользователей небольшими пачками"""
+
+    def __init__(self, interval: int, batch_size: int, pause: float):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._task: Optional[asyncio.Task] = None
+        self._purged = 0
+        self._runs = 0
+
+    async def purge(self) -> int:
+        """Удалить все истекшие куки, пачка за пачкой"""
+        total = 0
+        async with async_session_maker() as session:
+            cookies = CookieRepository(session)
+            while True:
+                deleted = await cookies.purge_expired_cookies_batch(self.batch_size)
+                total += deleted
+                if deleted < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+
+        self._purged += total
+        self._runs += 1
+        return total
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                deleted = await self.purge()
+                if deleted:
+                    print("Удалено истекших куки:", deleted)
+            except Exception as e:
+                print(f"Ошибка очистки истекших куки: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "purged": self._purged,
+            "runs": self._runs,
+        }
+
+
+cookie_purger = CookiePurger(COOKIE_PURGE_INTERVAL, COOKIE_PURGE_BATCH_SIZE, COOKIE_PURGE_PAUSE)
@@ -0,0 +1,11 @@
+from datetime import date
+
+MONTH_NAMES = [
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря"
+]
+
+
+def get_formated_date(d: date) -> str:
+    """Дата так, как она подписана в календаре поставок: «5 марта»"""
+    return f"{d.day} {MONTH_NAMES[d.month - 1]}"
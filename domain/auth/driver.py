@@ -1,4 +1,11 @@
+from typing import Dict, Optional
+
 import undetected_chromedriver as uc
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+from config import SELENIUM_GRID_URL, WEBDRIVER_BACKEND
 
 
 def get_driver():
@@ -10,3 +17,71 @@ def get_driver():
     options.add_argument("--lang=ru-RU")
     return uc.Chrome(options=options, headless=True)
 
+
+def create_remote_driver(profile_dir: Optional[str] = None) -> webdriver.Remote:
+    """Создать драйвер в Selenium Grid (с постоянным профилем, если он указан)"""
+    options = Options()
+    if profile_dir:
+        options.add_argument(f"--user-data-dir={profile_dir}")  # ✅ persistent browser profile
+        options.add_argument("--profile-directory=Default")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    options.add_argument("--disable-infobars")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--start-maximized")
+    # options.add_argument("--headless=new")
+
+    # return uc.Chrome(headless=True, options=options)
+    return webdriver.Remote(
+        command_executor=chrome_connection(SELENIUM_GRID_URL),
+        options=options,
+    )
+
+
+def chrome_connection(url: str) -> ChromiumRemoteConnection:
+    """Соединение с Grid, которое знает команды Chrome (executeCdpCommand)"""
+    return ChromiumRemoteConnection(url, "goog", "chrome")
+
+
+def execute_cdp(driver, cmd: str, params: Optional[Dict] = None) -> Dict:
+    """Выполнить команду Chrome DevTools Protocol через chromedriver"""
+    response = driver.execute("executeCdpCommand", {"cmd": cmd, "params": params or {}})
+    return (response or {}).get("value") or {}
+
+
+class AttachedRemote(webdriver.Remote):
+    """Драйвер, подключенный к уже существующей сессии в Selenium Grid"""
+
+    def __init__(self, command_executor: str, session_id: str):
+        self._attach_session_id = session_id
+        super().__init__(command_executor=chrome_connection(command_executor), options=Options())
+
+    def start_session(self, capabilities, *args, **kwargs) -> None:
+        # Новую сессию не создаем — используем существующую
+        self.session_id = self._attach_session_id
+        self.caps = {}
+
+
+def attach_remote_driver(executor_url: str, session_id: str) -> webdriver.Remote:
+    """Переподключиться к сессии браузера, созданной другим воркером"""
+    return AttachedRemote(executor_url, session_id)
+
+
+def create_driver(profile_dir: Optional[str] = None):
+    """Создать драйвер выбранного бэкенда (WEBDRIVER_BACKEND)"""
+    if WEBDRIVER_BACKEND == "fake":
+        from .fake_driver import create_fake_driver
+        return create_fake_driver(profile_dir)
+    return create_remote_driver(profile_dir)
+
+
+def attach_driver(executor_url: str, session_id: str):
+    """Подключиться к существующей сессии выбранного бэкенда"""
+    if WEBDRIVER_BACKEND == "fake":
+        from .fake_driver import attach_fake_driver
+        return attach_fake_driver(session_id)
+    return attach_remote_driver(executor_url, session_id)
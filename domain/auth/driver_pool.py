@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from config import DRIVER_POOL_SIZE, DRIVER_POOL_WARMUP, DRIVER_POOL_MAX_AGE
+from .auth import SELLER_WILDBERRIES_URL
+from .driver import create_driver
+from .profiles import ProfileManager, profile_manager
+
+
+@dataclass
+class WarmDriver:
+    """Заранее запущенный драйвер со своим (пока ничьим) профилем"""
+    driver: WebDriver
+    profile_dir: str
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class DriverPool:
+    """
+    Пул заранее запущенных сессий Chrome в Selenium Grid.
+
+    Каждый прогретый драйвер запускается со своим каталогом профиля в {profile_root}/_warm.
+    Когда телефон начинает новую авторизацию, драйвер выдается ему, а каталог
+    {profile_root}/{phone} становится ссылкой на профиль этого драйвера — следующие
+    сценарии телефона запускаются с тем же профилем, как и раньше.
+    Профили создаются и удаляются через ProfileManager.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        profiles: ProfileManager,
+        warmup_url: Optional[str] = None,
+        max_age: int = 600,
+        factory: Callable[[Optional[str]], WebDriver] = create_driver,
+    ):
+        self.size = size
+        self.profiles = profiles
+        self.warmup_url = warmup_url
+        self.max_age = max_age
+        self.factory = factory
+        self._idle: Deque[WarmDriver] = deque()
+        self._launching = 0
+        self._lock = threading.Lock()
+        self._launcher = ThreadPoolExecutor(max_workers=max(size, 1), thread_name_prefix="driver-pool")
+        self._closed = False
+        self._hits = 0
+        self._misses = 0
+        self._replaced = 0
+
+    def start(self) -> None:
+        """Прогреть пул в фоне, не блокируя запуск приложения"""
+        self._launcher.submit(self._start)
+
+    def _start(self) -> None:
+        try:
+            self.profiles.ensure_template(self.factory, self.warmup_url)
+        except Exception as e:
+            print(f"Не удалось собрать шаблон профиля: {e}")
+        self._replenish()
+
+    def acquire(self, phone: str) -> WebDriver:
+        """
+        Выдать драйвер для новой авторизации телефона.
+        Старый профиль телефона удаляется, его место занимает профиль прогретого драйвера.
+        """
+        warm = self._pop_healthy()
+        self._replenish()
+
+        if warm is None:
+            with self._lock:
+                self._misses += 1
+            print("Пул драйверов пуст, запускаем новый", phone)
+            return self.factory(self.profiles.assign(phone))
+
+        with self._lock:
+            self._hits += 1
+        self.profiles.assign(phone, warm.profile_dir)
+        return warm.driver
+
+    def _pop_healthy(self) -> Optional[WarmDriver]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                warm = self._idle.popleft()
+
+            too_old = time.monotonic() - warm.created_at > self.max_age
+            if not too_old and self._is_alive(warm.driver):
+                return warm
+
+            # Драйвер устарел или сессия в Grid умерла — заменяем
+            with self._lock:
+                self._replaced += 1
+            self._discard(warm)
+
+    @staticmethod
+    def _is_alive(driver: WebDriver) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _replenish(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - len(self._idle) - self._launching
+            self._launching += max(missing, 0)
+        for _ in range(missing):
+            self._launcher.submit(self._launch)
+
+    def _launch(self) -> None:
+        warm = None
+        try:
+            profile_dir = self.profiles.new_slot()
+            driver = self.factory(profile_dir)
+            warm = WarmDriver(driver=driver, profile_dir=profile_dir)
+            if self.warmup_url:
+                driver.get(self.warmup_url)
+        except Exception as e:
+            print(f"Не удалось прогреть драйвер: {e}")
+            if warm is not None:
+                self._discard(warm)
+            return
+        finally:
+            with self._lock:
+                self._launching -= 1
+
+        with self._lock:
+            if not self._closed:
+                self._idle.append(warm)
+                return
+        self._discard(warm)
+
+    def _discard(self, warm: WarmDriver) -> None:
+        try:
+            warm.driver.quit()
+        except Exception:
+            pass
+        self.profiles.remove_dir(warm.profile_dir)
+
+    def stats(self) -> Dict[str, int]:
+        """Состояние пула"""
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "launching": self._launching,
+                "hits": self._hits,
+                "misses": self._misses,
+                "replaced": self._replaced,
+            }
+
+    def shutdown(self) -> None:
+        """Закрыть все прогретые драйверы"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        self._launcher.shutdown(wait=False, cancel_futures=True)
+        for warm in idle:
+            self._discard(warm)
+
+
+driver_pool = DriverPool(
+    size=DRIVER_POOL_SIZE,
+    profiles=profile_manager,
+    warmup_url=SELLER_WILDBERRIES_URL if DRIVER_POOL_WARMUP else None,
+    max_age=DRIVER_POOL_MAX_AGE,
+)
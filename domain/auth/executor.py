@@ -0,0 +1,335 @@
+import asyncio
+import contextvars
+import heapq
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import BROWSER_MAX_WORKERS, BROWSER_QUEUE_MAX, BROWSER_QUEUE_TIMEOUT
+from . import metrics
+
+
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "browser_flow_cancel_event", default=None
+)
+_queue_wait: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "browser_flow_queue_wait", default=None
+)
+
+# Очередность сценариев в ожидании браузера (меньше — раньше). Код из SMS живет недолго,
+# поэтому confirm_auth идет первым; закрытие браузеров освобождает ресурсы и не отклоняется
+PRIORITIES = {
+    "close": 0,
+    "confirm_auth": 1,
+    "request_auth": 2,
+    "book": 3,
+    "watch": 4,
+}
+# Оценка длительности сценария до первых измерений (секунды)
+INITIAL_FLOW_SECONDS = 10.0
+
+
+class FlowCancelled(Exception):
+    """Сценарий отменен: клиент отключился, результат больше никому не нужен"""
+
+
+class BrowserBusy(Exception):
+    """Все браузеры заняты и очередь переполнена: повторить запрос через retry_after секунд"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Все браузеры заняты, повторите через {retry_after} сек.")
+        self.retry_after = retry_after
+
+
+def current_queue_wait() -> Optional[float]:
+    """Сколько текущий сценарий ждал свободного браузера (секунды)"""
+    return _queue_wait.get()
+
+
+def check_cancelled() -> None:
+    """
+    Проверка отмены внутри браузерного сценария.
+    Вызывается между шагами, чтобы не продолжать работу для отключившегося клиента.
+    """
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise FlowCancelled()
+
+
+class BrowserExecutor:
+    """
+    Выполняет блокирующие Selenium-сценарии в отдельном пуле потоков,
+    а асинхронные (BROWSER_BACKEND=cdp) — в event loop через run.
+
+    Сценарии одного телефона выполняются строго по очереди, разные телефоны — параллельно.
+    Одновременно браузер занимают не больше max_workers сценариев (обоих бэкендов); остальные
+    ждут в очереди по приоритету flow (PRIORITIES). Если в очереди уже queue_max сценариев
+    или свободный браузер не нашелся за queue_timeout секунд — BrowserBusy.
+    """
+
+    def __init__(self, max_workers: int, queue_max: int = BROWSER_QUEUE_MAX,
+                 queue_timeout: float = BROWSER_QUEUE_TIMEOUT):
+        self.max_workers = max_workers
+        self.queue_max = queue_max
+        self.queue_timeout = queue_timeout
+        self._busy = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._queue_seq = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._flow_seconds = INITIAL_FLOW_SECONDS
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="browser")
+        self._phone_locks: Dict[str, asyncio.Lock] = {}
+        self._phone_users: Dict[str, int] = {}
+        self._counters_lock = threading.Lock()
+        self._waiting = 0  # ждут завершения другого сценария того же телефона
+        self._pending = 0  # ждут свободного потока
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    async def submit(self, phone: str, fn: Callable[..., Any], *args, flow: str = "book") -> Any:
+        """Выполнить fn(*args) в пуле потоков с сериализацией по телефону"""
+        async with self._phone_turn(phone), self._slot(flow):
+            return await self._run(fn, *args)
+
+    async def run(self, phone: str, fn: Callable[..., Awaitable[Any]], *args, flow: str = "book") -> Any:
+        """
+        Выполнить асинхронный сценарий fn(*args) прямо в event loop (без потока из пула)
+        с той же сериализацией по телефону. Отмена — обычная отмена задачи.
+        """
+        async with self._phone_turn(phone), self._slot(flow):
+            self._change("_running", 1)
+            try:
+                result = await fn(*args)
+                self._change("_completed", 1)
+                return result
+            except asyncio.CancelledError:
+                self._change("_cancelled", 1)
+                raise
+            except BaseException:
+                self._change("_failed", 1)
+                raise
+            finally:
+                self._change("_running", -1)
+
+    @asynccontextmanager
+    async def _phone_turn(self, phone: str) -> AsyncIterator[None]:
+        """Дождаться очереди телефона: его сценарии выполняются строго по одному"""
+        lock = self._phone_locks.get(phone)
+        if lock is None:
+            lock = self._phone_locks[phone] = asyncio.Lock()
+        self._phone_users[phone] = self._phone_users.get(phone, 0) + 1
+
+        try:
+            self._change("_waiting", 1)
+            try:
+                await lock.acquire()
+            finally:
+                self._change("_waiting", -1)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._phone_users[phone] -= 1
+            if not self._phone_users[phone]:
+                del self._phone_users[phone]
+                del self._phone_locks[phone]
+
+    @asynccontextmanager
+    async def _slot(self, flow: str) -> AsyncIterator[None]:
+        """Занять браузер: сразу, если есть свободный, иначе дождаться очереди по приоритету"""
+        loop = asyncio.get_running_loop()
+        priority = PRIORITIES.get(flow, PRIORITIES["book"])
+        start = loop.time()
+
+        if self._busy < self.max_workers and not self._queue:
+            self._busy += 1
+        else:
+            cleanup = priority == PRIORITIES["close"]
+            if not cleanup and len(self._queue) >= self.queue_max:
+                self._reject(flow, "full")
+            future = loop.create_future()
+            self._queue_seq += 1
+            entry = (priority, self._queue_seq, future)
+            heapq.heappush(self._queue, entry)
+            try:
+                await asyncio.wait_for(future, None if cleanup else self.queue_timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+                if future.done() and not future.cancelled():
+                    # Браузер уже передали этому сценарию — отдаем следующему
+                    self._release()
+                elif entry in self._queue:
+                    # Отмененную запись мог уже вынуть _release, пока отмена доходила сюда
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                if isinstance(e, asyncio.TimeoutError):
+                    self._reject(flow, "timeout")
+                raise
+
+        waited = loop.time() - start
+        token = _queue_wait.set(round(waited, 3))
+        metrics.observe_queue_wait(flow, waited)
+        try:
+            yield
+        finally:
+            _queue_wait.reset(token)
+            # Скользящее среднее длительности сценария — для Retry-After
+            self._flow_seconds += 0.2 * (loop.time() - start - waited - self._flow_seconds)
+            self._release()
+
+    def _release(self) -> None:
+        """Передать браузер первому в очереди или освободить"""
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy -= 1
+
+    def ensure_capacity(self, flow: str) -> None:
+        """BrowserBusy сразу, если очередь уже заполнена (для фоновых задач — до их запуска)"""
+        if len(self._queue) >= self.queue_max:
+            self._reject(flow, "full")
+
+    def _reject(self, flow: str, reason: str) -> None:
+        if reason == "timeout":
+            self._timed_out += 1
+        else:
+            self._rejected += 1
+        metrics.record_rejected(flow, reason)
+        raise BrowserBusy(self.retry_after())
+
+    def retry_after(self) -> int:
+        """Через сколько секунд очередь, скорее всего, разойдется"""
+        rounds = (len(self._queue) + 1) / self.max_workers
+        return max(1, math.ceil(self._flow_seconds * rounds))
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        cancel_event = threading.Event()
+        ctx = contextvars.copy_context()
+        ctx.run(_cancel_event.set, cancel_event)
+
+        self._change("_pending", 1)
+        future = self._pool.submit(ctx.run, self._call, fn, *args)
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            self._change("_cancelled", 1)
+            if future.cancel():
+                # Сценарий еще не начался — просто убираем его из очереди
+                self._change("_pending", -1)
+                raise
+            # Сценарий уже выполняется: просим его остановиться и дожидаемся,
+            # чтобы следующий сценарий этого телефона не начался раньше времени
+            cancel_event.set()
+            try:
+                await result
+            except Exception:
+                pass
+            raise
+
+    def _call(self, fn: Callable[..., Any], *args) -> Any:
+        self._change("_pending", -1)
+        self._change("_running", 1)
+        try:
+            result = fn(*args)
+            self._change("_completed", 1)
+            return result
+        except FlowCancelled:
+            raise
+        except BaseException:
+            self._change("_failed", 1)
+            raise
+        finally:
+            self._change("_running", -1)
+
+    def _change(self, counter: str, delta: int) -> None:
+        with self._counters_lock:
+            setattr(self, counter, getattr(self, counter) + delta)
+
+    def is_busy(self, phone: str) -> bool:
+        """Есть ли у телефона выполняющийся или ожидающий сценарий"""
+        return phone in self._phone_users
+
+    def stats(self) -> Dict[str, int]:
+        """Состояние очереди браузерных сценариев"""
+        with self._counters_lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "pending": self._pending,
+                "waiting_for_phone": self._waiting,
+                "queued": len(self._queue),
+                "queue_max": self.queue_max,
+                "queue_depth": self._pending + self._waiting + len(self._queue),
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "retry_after": self.retry_after(),
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+            }
+
+    def shutdown(self) -> None:
+        """Остановить пул, не дожидаясь выполнения очереди"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Объединяет одинаковые одновременные вызовы: пока сценарий с ключом выполняется,
+    повторный вызов с тем же ключом не запускает новый, а ждет результат первого.
+    Сценарий отменяется, только когда его перестали ждать все вызвавшие.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._started = 0
+        self._joined = 0
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn(*args)))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self._started += 1
+        else:
+            self._joined += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Больше никто не ждет: отменяем, а новый вызов с этим ключом запустит сценарий заново
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "started": self._started,
+            "joined": self._joined,
+        }
+
+
+browser_executor = BrowserExecutor(BROWSER_MAX_WORKERS)
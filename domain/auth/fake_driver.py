@@ -0,0 +1,307 @@
+import os
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from config import (
+    WB_AUTH_URL, WB_SELLER_URL, FAKE_DRIVER_MODE, FAKE_DRIVER_CREATE_MS, FAKE_DRIVER_COMMAND_MS,
+    FAKE_DRIVER_NAVIGATION_MS, FAKE_DRIVER_REACTION_MS,
+)
+from .auth import (
+    NUMBER_INPUT_CSS_SELECTOR, COUNTRY_CODE_INPUT_CSS_SELECTOR, NUMBER_INPUT_BUTTON_CSS_SELECTOR,
+    CODE_INPUT_CONTAINER_CSS_SELECTOR, COUNTRY_DROPDOWN_CSS_SELECTOR, COUNTRY_OPTION_CSS_SELECTOR,
+    COUNTRY_CODES, COOLDOWN_TEXT,
+)
+from .dates import get_formated_date
+from .page_state import PAGE_STATE_SCRIPT, CODE_SCREEN, COOLDOWN, WRONG_CODE, LOGGED_IN, UNKNOWN
+from .supply_calendar import (
+    FIND_DATE_CELL_SCRIPT, AVAILABLE_DATES_SCRIPT, PLAN_BUTTON_CLASS, CALENDAR_CELL_CSS_SELECTOR, TRANSFER_BUTTON_XPATH,
+)
+
+CODE_LENGTH = 6
+# Слот доступен в каждый N-й день месяца (как в benchmarks/fake_wb_site.py)
+SLOT_EVERY = 2
+CALENDAR_DAYS = 60
+
+# Запущенные фейковые сессии: для attach_driver, как сессии в Grid
+_sessions: Dict[str, "FakeDriver"] = {}
+_sessions_lock = threading.Lock()
+
+
+class FakeElement:
+    """Элемент фейковой страницы: умеет то, что вызывают сценарии и expected_conditions"""
+
+    def __init__(self, driver: "FakeDriver", name: str, text: str = "", on_click=None, children=None):
+        self.id = uuid.uuid4().hex
+        self._driver = driver
+        self.name = name
+        self.text = text
+        self._on_click = on_click
+        self._children = children or {}
+        self.value = ""
+
+    def click(self) -> None:
+        self._driver._command()
+        if self._on_click is not None:
+            self._on_click()
+
+    def send_keys(self, *values) -> None:
+        self._driver._command()
+        self.value += "".join(str(v) for v in values)
+        self._driver._on_input(self)
+
+    def is_displayed(self) -> bool:
+        self._driver._command()
+        return self._driver._visible(self)
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> "FakeElement":
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"{by}={value}")
+        return found[0]
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List["FakeElement"]:
+        self._driver._command()
+        return list(self._children.get(value, []))
+
+
+# ActionChains (move_to_element и т.п.) принимает только WebElement
+WebElement.register(FakeElement)
+
+
+class FakeDriver:
+    """
+    Фейковый WebDriver для нагрузочных тестов без Selenium Grid.
+
+    Моделирует страницы авторизации и поставки (те же селекторы и скрипты, что используют
+    сценарии) как конечный автомат. Каждая команда "ходит в сеть" FAKE_DRIVER_COMMAND_MS,
+    загрузка страницы — FAKE_DRIVER_NAVIGATION_MS, реакция страницы на действие
+    (экран кода, вход, календарь, кнопка "Перенести") — FAKE_DRIVER_REACTION_MS.
+    Режим FAKE_DRIVER_MODE — как у benchmarks/fake_wb_site.py:
+    ok, cooldown, wrong_code, not_authenticated, no_slot, transfer_missing.
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None, mode: str = FAKE_DRIVER_MODE,
+                 create_ms: int = FAKE_DRIVER_CREATE_MS, command_ms: int = FAKE_DRIVER_COMMAND_MS,
+                 navigation_ms: int = FAKE_DRIVER_NAVIGATION_MS, reaction_ms: int = FAKE_DRIVER_REACTION_MS):
+        self.mode = mode
+        self.command_latency = command_ms / 1000
+        self.navigation_latency = navigation_ms / 1000
+        self.reaction_latency = reaction_ms / 1000
+        time.sleep(create_ms / 1000)
+        if profile_dir:
+            # Chrome создает каталог профиля при запуске
+            os.makedirs(profile_dir, exist_ok=True)
+
+        self.session_id = uuid.uuid4().hex
+        self.current_url = "about:blank"
+        self._page = "blank"
+        self._ready_at: Dict[str, float] = {}
+        self._transfer_clicked = False
+        self._cookies: Dict[str, Dict] = {}
+        self._elements = self._build_elements()
+        with _sessions_lock:
+            _sessions[self.session_id] = self
+
+    # --- страницы ---
+
+    def _build_elements(self) -> Dict[str, FakeElement]:
+        options = [FakeElement(self, "country_option", "+" + code.replace("X", "")) for code in COUNTRY_CODES]
+        code_items = [
+            FakeElement(self, "code_item", children={"input": [FakeElement(self, "code_input")]})
+            for _ in range(CODE_LENGTH)
+        ]
+        return {
+            "number_input": FakeElement(self, "number_input"),
+            "country_select": FakeElement(self, "country_select", "+7", on_click=lambda: self._ready("dropdown", 0)),
+            "dropdown": FakeElement(self, "dropdown", children={COUNTRY_OPTION_CSS_SELECTOR: options}),
+            "send": FakeElement(self, "send", "→", on_click=self._on_send),
+            "code_items": code_items,
+            "plan": FakeElement(self, "plan", "Запланировать", on_click=lambda: self._ready("calendar")),
+            "calendar_cell": FakeElement(self, "calendar_cell"),
+            "transfer": FakeElement(self, "transfer", "Перенести", on_click=self._on_transfer),
+        }
+
+    def _ready(self, name: str, delay: Optional[float] = None) -> None:
+        """Элемент name появится через delay (по умолчанию — время реакции страницы)"""
+        self._ready_at[name] = time.monotonic() + (self.reaction_latency if delay is None else delay)
+
+    def _is_ready(self, name: str) -> bool:
+        ready_at = self._ready_at.get(name)
+        return ready_at is not None and time.monotonic() >= ready_at
+
+    def _on_send(self) -> None:
+        self._ready("cooldown" if self.mode == "cooldown" else "code_screen")
+
+    def _on_input(self, element: FakeElement) -> None:
+        if element.name != "code_input":
+            return
+        code = "".join(item.find_element(By.TAG_NAME, "input").value for item in self._elements["code_items"])
+        if len(code) >= CODE_LENGTH:
+            self._ready("code_result")
+
+    def _on_transfer(self) -> None:
+        self._transfer_clicked = True
+
+    def _on_select_date(self) -> None:
+        if self.mode != "transfer_missing":
+            self._ready("transfer")
+
+    def _code_result(self) -> Optional[str]:
+        if not self._is_ready("code_result"):
+            return None
+        if self.mode == "wrong_code":
+            return WRONG_CODE
+        # Вход выполнен — кабинет ставит куку сессии и перенаправляет на главную
+        self._cookies["WBTokenV3"] = {"name": "WBTokenV3", "value": self.session_id, "domain": ".wildberries.ru",
+                                      "path": "/", "secure": True, "httpOnly": True}
+        self._page = "home"
+        self.current_url = WB_SELLER_URL + "/"
+        return LOGGED_IN
+
+    def _visible(self, element: FakeElement) -> bool:
+        if element.name == "dropdown":
+            return self._is_ready("dropdown")
+        if element.name == "transfer":
+            return self._is_ready("transfer") and not self._transfer_clicked
+        return True
+
+    def _command(self) -> None:
+        if self.command_latency:
+            time.sleep(self.command_latency)
+
+    # --- API WebDriver, которым пользуются сценарии ---
+
+    def get(self, url: str) -> None:
+        self._command()
+        time.sleep(self.navigation_latency)
+        self._ready_at.clear()
+        self._transfer_clicked = False
+        self._elements = self._build_elements()
+        if url.startswith(WB_AUTH_URL):
+            self._page = "auth"
+            self.current_url = url
+        elif "supply-detail" in url:
+            if self.mode == "not_authenticated":
+                self._page = "auth"
+                self.current_url = WB_AUTH_URL
+            else:
+                self._page = "supply"
+                self.current_url = url
+        else:
+            self._page = "home"
+            self.current_url = url
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> FakeElement:
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"{by}={value}")
+        return found[0]
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List[FakeElement]:
+        self._command()
+        elements = self._elements
+        if self._page == "auth":
+            self._code_result()
+            on_code_screen = self._is_ready("code_screen")
+            if value == NUMBER_INPUT_CSS_SELECTOR and not on_code_screen:
+                return [elements["number_input"]]
+            if value == COUNTRY_CODE_INPUT_CSS_SELECTOR and not on_code_screen:
+                return [elements["country_select"]]
+            if value == COUNTRY_DROPDOWN_CSS_SELECTOR and self._is_ready("dropdown"):
+                return [elements["dropdown"]]
+            if value == NUMBER_INPUT_BUTTON_CSS_SELECTOR and not on_code_screen:
+                return [elements["send"]]
+            if value == CODE_INPUT_CONTAINER_CSS_SELECTOR and on_code_screen:
+                return list(elements["code_items"])
+        elif self._page == "supply":
+            if value == PLAN_BUTTON_CLASS:
+                return [elements["plan"]]
+            if value == CALENDAR_CELL_CSS_SELECTOR and self._is_ready("calendar"):
+                return [elements["calendar_cell"]]
+            if value == TRANSFER_BUTTON_XPATH and self._is_ready("transfer"):
+                return [elements["transfer"]]
+        return []
+
+    def execute_script(self, script: str, *args):
+        self._command()
+        if script == PAGE_STATE_SCRIPT:
+            return self._page_state()
+        if script == FIND_DATE_CELL_SCRIPT:
+            if args[0] not in self._available_dates():
+                return None
+            cell = FakeElement(self, "calendar_cell", args[0])
+            return [cell, FakeElement(self, "select_date", "Выбрать", on_click=self._on_select_date)]
+        if script == AVAILABLE_DATES_SCRIPT:
+            return self._available_dates()
+        if script.strip() == "return 1":
+            return 1
+        return None
+
+    def _page_state(self) -> List:
+        if self._page != "auth":
+            return [LOGGED_IN, None]
+        result = self._code_result()
+        if result is not None:
+            return [result, None]
+        if self._is_ready("code_screen"):
+            return [CODE_SCREEN, 59]
+        if self._is_ready("cooldown"):
+            return [COOLDOWN, 59]
+        return [UNKNOWN, None]
+
+    def _available_dates(self) -> List[str]:
+        if self._page != "supply" or not self._is_ready("calendar") or self.mode == "no_slot":
+            return []
+        today = date.today()
+        days = (today + timedelta(days=i) for i in range(CALENDAR_DAYS))
+        return [get_formated_date(day) for day in days if day.day % SLOT_EVERY == 0]
+
+    def execute(self, command: str, params: Optional[Dict] = None) -> Dict:
+        """Низкоуровневые команды (действия ActionChains, команды CDP)"""
+        self._command()
+        if params and params.get("cmd") == "Network.setCookies":
+            for cookie in params["params"]["cookies"]:
+                self._cookies[cookie["name"]] = dict(cookie)
+        return {"value": None}
+
+    def get_cookies(self) -> List[Dict]:
+        self._command()
+        return [dict(cookie) for cookie in self._cookies.values()]
+
+    @property
+    def page_source(self) -> str:
+        self._command()
+        text = f"{COOLDOWN_TEXT} 0:59" if self._is_ready("cooldown") else ""
+        return f"<html><body data-page='{self._page}'>{text}</body></html>"
+
+    def get_screenshot_as_png(self) -> bytes:
+        self._command()
+        return b""
+
+    def quit(self) -> None:
+        self._command()
+        with _sessions_lock:
+            _sessions.pop(self.session_id, None)
+
+
+def create_fake_driver(profile_dir: Optional[str] = None) -> FakeDriver:
+    return FakeDriver(profile_dir)
+
+
+def attach_fake_driver(session_id: str) -> FakeDriver:
+    """Фейковая сессия по id (в пределах процесса)"""
+    with _sessions_lock:
+        driver = _sessions.get(session_id)
+    if driver is None:
+        raise NoSuchElementException(f"Фейковая сессия {session_id} не найдена")
+    return driver
@@ -0,0 +1,156 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .executor import BrowserBusy
+
+# Состояния задачи
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class Job:
+    """Сценарий, запущенный в фоне: клиент получает результат по id, а не держит соединение"""
+    kind: str
+    phone: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = RUNNING
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    retry_after: Optional[int] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    finished_monotonic: Optional[float] = field(default=None, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+    def info(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "phone": self.phone,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "retry_after": self.retry_after,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Фоновые задачи браузерных сценариев (request_auth, confirm_auth, book).
+
+    Задача выполняется в event loop и проходит ту же очередь BrowserExecutor, что и
+    синхронный запрос. Завершенные задачи хранятся не дольше retention секунд и не больше
+    history штук (старые вытесняются первыми).
+    """
+
+    def __init__(self, history: int, retention: float):
+        self.history = history
+        self.retention = retention
+        self._active: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        self._started = 0
+        self._failed = 0
+
+    def start(self, kind: str, phone: str, run: Callable[[], Awaitable[Dict]]) -> Job:
+        """Запустить сценарий run() в фоне"""
+        self._purge()
+        job = Job(kind=kind, phone=phone)
+        self._active[job.id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        self._started += 1
+        return job
+
+    async def _run(self, job: Job, run: Callable[[], Awaitable[Dict]]) -> None:
+        try:
+            job.result = await run()
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            raise
+        except BrowserBusy as e:
+            job.status = ERROR
+            job.error = str(e)
+            job.retry_after = e.retry_after
+        except Exception as e:
+            print(f"Ошибка фоновой задачи {job.kind} {job.phone}: {e}")
+            job.status = ERROR
+            job.error = f"{type(e).__name__}: {e}"
+            self._failed += 1
+        finally:
+            self._finish(job)
+
+    def _finish(self, job: Job) -> None:
+        job.finished_at = datetime.utcnow()
+        job.finished_monotonic = time.monotonic()
+        self._active.pop(job.id, None)
+        self._finished[job.id] = job
+        self._purge()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> bool:
+        """Дождаться завершения задачи (не дольше timeout секунд); True — завершилась"""
+        if job.finished:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(job.task), timeout)
+        except asyncio.TimeoutError:
+            return False
+        except (asyncio.CancelledError, Exception):
+            # Отмена или ошибка самой задачи уже записана в job
+            if not job.task.done():
+                raise
+        return True
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Отменить задачу (браузерный сценарий останавливается между шагами)"""
+        job = self._active.get(job_id)
+        if job is None:
+            return self._finished.get(job_id)
+        job.task.cancel()
+        try:
+            await job.task
+        except asyncio.CancelledError:
+            pass
+        if not job.finished:
+            # Задачу отменили до того, как она начала выполняться
+            job.status = CANCELLED
+            self._finish(job)
+        return job
+
+    async def stop(self) -> None:
+        for job_id in list(self._active):
+            await self.cancel(job_id)
+
+    def _purge(self) -> None:
+        """Убрать задачи, завершившиеся раньше retention секунд назад, и лишние сверх history"""
+        expired_before = time.monotonic() - self.retention
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if len(self._finished) <= self.history and job.finished_monotonic >= expired_before:
+                break
+            self._finished.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": len(self._active),
+            "finished": len(self._finished),
+            "started": self._started,
+            "failed": self._failed,
+        }
@@ -0,0 +1,70 @@
+from typing import TYPE_CHECKING, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+if TYPE_CHECKING:
+    from .timing import StepTimer
+
+# Браузерные шаги занимают от долей секунды до минуты
+STEP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+FLOW_STEP_SECONDS = Histogram(
+    "wb_flow_step_seconds",
+    "Время шага сценария (driver_create, navigation, country_select, code_entry, ...)",
+    ["flow", "step"],
+    buckets=STEP_BUCKETS,
+)
+FLOW_DURATION_SECONDS = Histogram(
+    "wb_flow_duration_seconds",
+    "Общее время сценария по всем шагам",
+    ["flow", "outcome"],
+    buckets=STEP_BUCKETS,
+)
+FLOW_OUTCOMES = Counter(
+    "wb_flow_outcomes_total",
+    "Результаты сценариев (success, wrong_code, cooldown, not_authenticated, failed, error, cancelled)",
+    ["flow", "outcome"],
+)
+BROWSER_QUEUE_WAIT_SECONDS = Histogram(
+    "wb_browser_queue_wait_seconds",
+    "Ожидание свободного браузера до начала сценария (отдельно от его выполнения)",
+    ["flow"],
+    buckets=STEP_BUCKETS,
+)
+BROWSER_REJECTED = Counter(
+    "wb_browser_rejected_total",
+    "Сценарии, не допущенные к браузеру: очередь переполнена (full) или ожидание слишком долгое (timeout)",
+    ["flow", "reason"],
+)
+AUTH_SESSIONS = Gauge(
+    "wb_auth_sessions",
+    "Сессии авторизации, ожидающие кода или уже подтвержденные",
+)
+
+# Исходы сценариев
+SUCCESS = "success"
+WRONG_CODE = "wrong_code"
+COOLDOWN = "cooldown"
+NOT_AUTHENTICATED = "not_authenticated"
+FAILED = "failed"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+
+def observe_step(flow: str, step: str, seconds: float) -> None:
+    FLOW_STEP_SECONDS.labels(flow, step).observe(seconds)
+
+
+def record_outcome(flow: str, outcome: str, timer: Optional["StepTimer"] = None) -> None:
+    """Посчитать результат сценария и его общее время"""
+    FLOW_OUTCOMES.labels(flow, outcome).inc()
+    if timer is not None and timer.steps:
+        FLOW_DURATION_SECONDS.labels(flow, outcome).observe(timer.total)
+
+
+def observe_queue_wait(flow: str, seconds: float) -> None:
+    BROWSER_QUEUE_WAIT_SECONDS.labels(flow).observe(seconds)
+
+
+def record_rejected(flow: str, reason: str) -> None:
+    BROWSER_REJECTED.labels(flow, reason).inc()
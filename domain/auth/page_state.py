@@ -0,0 +1,53 @@
+from typing import NamedTuple, Optional
+
+# Состояния страницы авторизации
+CODE_SCREEN = "code_screen"
+COOLDOWN = "cooldown"
+WRONG_CODE = "wrong_code"
+LOGGED_IN = "logged_in"
+UNKNOWN = "unknown"
+
+# Определяет состояние страницы авторизации за один вызов WebDriver.
+# Текст страницы читается внутри браузера, по сети возвращается только [состояние, секунды].
+PAGE_STATE_SCRIPT = """
+const [authUrl, codeInputSelector, codeScreenText, cooldownText, wrongCodeText] = arguments;
+if (!location.href.startsWith(authUrl)) {
+    return ['logged_in', null];
+}
+const text = document.body ? document.body.innerText : '';
+
+let seconds = null;
+const at = text.indexOf(cooldownText);
+if (at !== -1) {
+    const match = text.slice(at + cooldownText.length, at + cooldownText.length + 20).match(/(?:(\\d+):)?(\\d+)/);
+    if (match) {
+        seconds = (match[1] ? parseInt(match[1], 10) * 60 : 0) + parseInt(match[2], 10);
+    }
+}
+
+if (text.includes(wrongCodeText)) {
+    return ['wrong_code', null];
+}
+if (document.querySelector(codeInputSelector) || text.includes(codeScreenText)) {
+    return ['code_screen', seconds];
+}
+if (at !== -1) {
+    return ['cooldown', seconds];
+}
+return ['unknown', null];
+"""
+
+
+class PageState(NamedTuple):
+    """Состояние страницы; seconds — через сколько можно запросить код заново, если известно"""
+    state: str
+    seconds: Optional[int] = None
+
+
+def classify_page(driver, auth_url: str, code_input_selector: str,
+                  code_screen_text: str, cooldown_text: str, wrong_code_text: str) -> PageState:
+    """Определить состояние страницы авторизации одним execute_script"""
+    state, seconds = driver.execute_script(
+        PAGE_STATE_SCRIPT, auth_url, code_input_selector, code_screen_text, cooldown_text, wrong_code_text,
+    )
+    return PageState(state, seconds)
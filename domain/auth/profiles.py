@@ -0,0 +1,310 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import (
+    CHROME_PROFILE_ROOT, PROFILE_TEMPLATE_DIR, PROFILE_CLONE_MODE, PROFILE_QUOTA_MB, PROFILE_QUOTA_CHECK_INTERVAL,
+)
+
+# Служебные каталоги внутри CHROME_PROFILE_ROOT (не профили телефонов)
+WARM_DIR = "_warm"
+TRASH_DIR = "_trash"
+
+# Файлы блокировки запущенного Chrome — в копию профиля не переносим
+LOCK_FILES = {"SingletonLock", "SingletonCookie", "SingletonSocket", "lockfile"}
+
+
+class ProfileManager:
+    """
+    Профили Chrome для телефонов в {root}/{phone}.
+
+    - новые профили клонируются из заранее собранного шаблона (reflink, если файловая система
+      умеет, иначе обычная копия; жесткие ссылки — только по явной настройке, т.к. Chrome
+      меняет часть файлов на месте);
+    - старые профили переименовываются в {root}/_trash и удаляются в фоне;
+    - при превышении квоты удаляются профили неактивных телефонов, давно не использовавшиеся.
+
+    Проверка квоты и сценарии берут одну блокировку профиля телефона: квота проверяет активность
+    и убирает профиль под ней, а сценарий открывает профиль (open, touch, assign) тоже под ней и
+    уже после того, как стал активным (занял очередь browser_executor). Так профиль не исчезает
+    между проверкой и запуском Chrome.
+    """
+
+    def __init__(self, root: str, template_dir: Optional[str], clone_mode: str = "auto",
+                 quota_bytes: int = 0, check_interval: int = 300):
+        self.root = root
+        self.template_dir = template_dir
+        self.clone_mode = clone_mode
+        self.quota_bytes = quota_bytes
+        self.check_interval = check_interval
+        self._reflink_supported: Optional[bool] = None
+        self._template_lock = threading.Lock()
+        self._phone_locks: Dict[str, threading.RLock] = {}
+        self._phone_users: Dict[str, int] = {}
+        self._locks_guard = threading.Lock()
+        self._cleaner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profile-cleaner")
+        self._task: Optional[asyncio.Task] = None
+        self._evicted = 0
+        self._usage = 0
+
+    def path(self, phone: str) -> str:
+        return os.path.abspath(os.path.join(self.root, phone))
+
+    @contextmanager
+    def locked(self, phone: str) -> Iterator[None]:
+        """Блокировка профиля телефона (повторный вход из того же потока разрешен)"""
+        with self._locks_guard:
+            lock = self._phone_locks.get(phone)
+            if lock is None:
+                lock = self._phone_locks[phone] = threading.RLock()
+            self._phone_users[phone] = self._phone_users.get(phone, 0) + 1
+        try:
+            with lock:
+                yield
+        finally:
+            with self._locks_guard:
+                self._phone_users[phone] -= 1
+                if not self._phone_users[phone]:
+                    del self._phone_users[phone]
+                    del self._phone_locks[phone]
+
+    def open(self, phone: str) -> str:
+        """Профиль телефона для запуска Chrome: отмечает использование и возвращает путь"""
+        with self.locked(phone):
+            self.touch(phone)
+            return self.path(phone)
+
+    # --- шаблон ---
+
+    def ensure_template(self, factory: Callable[[Optional[str]], object], warmup_url: Optional[str] = None) -> None:
+        """Собрать шаблон профиля, если он настроен, но еще не создан"""
+        if not self.template_dir:
+            return
+        with self._template_lock:
+            if os.path.isdir(self.template_dir):
+                return
+            building = f"{self.template_dir}.building-{uuid.uuid4().hex}"
+            print("Собираем шаблон профиля Chrome", self.template_dir)
+            try:
+                driver = factory(building)
+                try:
+                    if warmup_url:
+                        driver.get(warmup_url)
+                finally:
+                    driver.quit()
+                os.rename(building, self.template_dir)
+            except Exception:
+                # Недостроенный каталог не нужен: следующая попытка начнет заново
+                shutil.rmtree(building, ignore_errors=True)
+                raise
+
+    # --- создание и удаление ---
+
+    def provision(self, target: str) -> str:
+        """Создать профиль в target: клон шаблона или пустой каталог"""
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if self.template_dir and os.path.isdir(self.template_dir):
+            self._clone(self.template_dir, target)
+        else:
+            os.makedirs(target, exist_ok=True)
+        return target
+
+    def new_slot(self) -> str:
+        """Профиль для прогретого драйвера, еще не привязанный к телефону"""
+        return self.provision(os.path.join(self.root, WARM_DIR, uuid.uuid4().hex))
+
+    def assign(self, phone: str, profile_dir: Optional[str] = None) -> str:
+        """
+        Сделать profile_dir профилем телефона (через ссылку) вместо старого.
+        Без profile_dir телефону создается новый профиль.
+        """
+        target = self.path(phone)
+        with self.locked(phone):
+            self.discard(phone)
+            if profile_dir is None:
+                return self.provision(target)
+            os.makedirs(self.root, exist_ok=True)
+            os.symlink(profile_dir, target)
+            return target
+
+    def touch(self, phone: str) -> None:
+        """Отметить использование профиля (для вытеснения давно неиспользуемых)"""
+        with self.locked(phone):
+            try:
+                os.utime(os.path.realpath(self.path(phone)))
+            except FileNotFoundError:
+                pass
+
+    def discard(self, phone: str) -> None:
+        """Убрать профиль телефона: переименовать сейчас, удалить в фоне"""
+        target = self.path(phone)
+        if os.path.islink(target):
+            real = os.path.realpath(target)
+            os.unlink(target)
+            self.remove_dir(real)
+        elif os.path.exists(target):
+            self.remove_dir(target)
+
+    def remove_dir(self, profile_dir: str) -> None:
+        """Переименовать каталог в корзину и удалить его в фоновом потоке"""
+        if not os.path.exists(profile_dir):
+            return
+        trash = os.path.join(self.root, TRASH_DIR)
+        os.makedirs(trash, exist_ok=True)
+        doomed = os.path.join(trash, f"{os.path.basename(profile_dir)}-{uuid.uuid4().hex}")
+        try:
+            os.rename(profile_dir, doomed)
+        except OSError:
+            # Другая файловая система — удаляем как есть
+            doomed = profile_dir
+        self._cleaner.submit(shutil.rmtree, doomed, True)
+
+    def empty_trash(self) -> None:
+        """Удалить то, что осталось в корзине (например, после перезапуска)"""
+        trash = os.path.join(self.root, TRASH_DIR)
+        if os.path.isdir(trash):
+            for name in os.listdir(trash):
+                self._cleaner.submit(shutil.rmtree, os.path.join(trash, name), True)
+
+    def _clone(self, source: str, target: str) -> None:
+        ignore = shutil.ignore_patterns(*LOCK_FILES)
+        mode = self.clone_mode
+        if mode in ("auto", "reflink") and self._reflink_supported is not False:
+            result = subprocess.run(
+                ["cp", "-a", "--reflink=always", source, target],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            if result.returncode == 0:
+                self._reflink_supported = True
+                for name in LOCK_FILES:
+                    lock = os.path.join(target, name)
+                    if os.path.lexists(lock):
+                        os.unlink(lock)
+                return
+            self._reflink_supported = False
+            shutil.rmtree(target, ignore_errors=True)
+            if mode == "reflink":
+                print("⚠️ Файловая система не поддерживает reflink, копируем профиль")
+
+        if mode == "hardlink":
+            shutil.copytree(source, target, symlinks=True, ignore=ignore, copy_function=os.link)
+        else:
+            shutil.copytree(source, target, symlinks=True, ignore=ignore)
+
+    # --- квота ---
+
+    def phone_profiles(self) -> List[Tuple[str, str]]:
+        """Профили телефонов: (телефон, реальный каталог)"""
+        if not os.path.isdir(self.root):
+            return []
+        profiles = []
+        for name in os.listdir(self.root):
+            if name.startswith("_") or name.startswith("."):
+                continue
+            profiles.append((name, os.path.realpath(os.path.join(self.root, name))))
+        return profiles
+
+    @staticmethod
+    def disk_usage(path: str, seen: Optional[set] = None) -> int:
+        """Место на диске в байтах; общие inode (жесткие ссылки) учитываются один раз"""
+        seen = seen if seen is not None else set()
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    st = os.lstat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+        return total
+
+    def enforce_quota(self, is_active: Callable[[str], bool]) -> int:
+        """Удалить давно неиспользуемые профили неактивных телефонов, пока не уложимся в квоту"""
+        seen = set()
+        if self.template_dir and os.path.isdir(self.template_dir):
+            # Блоки шаблона общие с клонами при жестких ссылках — не считаем их против квоты
+            self.disk_usage(self.template_dir, seen)
+
+        usage = []
+        total = 0
+        for phone, real in self.phone_profiles():
+            size = self.disk_usage(real, seen)
+            total += size
+            try:
+                last_used = os.stat(real).st_mtime
+            except FileNotFoundError:
+                continue
+            usage.append((last_used, phone, size))
+        warm = os.path.join(self.root, WARM_DIR)
+        if os.path.isdir(warm):
+            total += self.disk_usage(warm, seen)
+
+        self._usage = total
+        if not self.quota_bytes or total <= self.quota_bytes:
+            return 0
+
+        evicted = 0
+        for _, phone, size in sorted(usage):
+            if total <= self.quota_bytes:
+                break
+            with self.locked(phone):
+                # Под блокировкой: сценарий не откроет профиль между проверкой и удалением
+                if is_active(phone):
+                    continue
+                print("Профиль вытеснен по квоте", phone, size)
+                self.discard(phone)
+            total -= size
+            evicted += 1
+
+        self._usage = total
+        self._evicted += evicted
+        return evicted
+
+    def start(self, is_active: Callable[[str], bool]) -> None:
+        """Фоновая проверка квоты и очистка корзины"""
+        self.empty_trash()
+        self._task = asyncio.create_task(self._run(is_active))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._cleaner.shutdown(wait=False)
+
+    async def _run(self, is_active: Callable[[str], bool]) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.enforce_quota, is_active)
+            except Exception as e:
+                print(f"Ошибка проверки квоты профилей: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "usage_bytes": self._usage,
+            "quota_bytes": self.quota_bytes,
+            "evicted": self._evicted,
+            "clone_mode": "reflink" if self._reflink_supported else self.clone_mode,
+        }
+
+
+profile_manager = ProfileManager(
+    root=CHROME_PROFILE_ROOT,
+    template_dir=PROFILE_TEMPLATE_DIR or None,
+    clone_mode=PROFILE_CLONE_MODE,
+    quota_bytes=PROFILE_QUOTA_MB * 1024 * 1024,
+    check_interval=PROFILE_QUOTA_CHECK_INTERVAL,
+)
@@ -0,0 +1,16 @@
+from typing import Dict
+
+
+_clients: Dict[str, object] = {}
+
+
+def get_redis(url: str):
+    """Клиент Redis для url (пакет redis нужен только если Redis включен в настройках)"""
+    client = _clients.get(url)
+    if client is None:
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Для работы с Redis нужен пакет redis: pip install redis")
+        client = _clients[url] = redis.Redis.from_url(url)
+    return client
@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+from config import (
+    RESOURCE_BLOCKING_ENABLED, RESOURCE_BLOCKING_FLOWS, RESOURCE_BLOCK_PATTERNS, RESOURCE_ALLOW_PATTERNS,
+    RESOURCE_BLOCKING_DRIVER_FLOWS,
+)
+from .driver import execute_cdp
+
+# Шаблоны URL — как у CDP (Network.setBlockedURLs, Fetch.enable): * — любые символы,
+# шаблон должен совпасть со всем URL
+
+# Картинки, шрифты и медиа: сценарии кликают по разметке и на них не смотрят
+STATIC_EXTENSIONS = (
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "mp4", "webm", "mp3", "ogg",
+)
+STATIC_PATTERNS = tuple(
+    pattern for ext in STATIC_EXTENSIONS for pattern in (f"*.{ext}", f"*.{ext}?*")
+)
+
+# Аналитика, рекламные пиксели и счетчики
+TRACKER_PATTERNS = (
+    "*://mc.yandex.ru/*",
+    "*://mc.yandex.com/*",
+    "*://top-fwz1.mail.ru/*",
+    "*://www.google-analytics.com/*",
+    "*://www.googletagmanager.com/*",
+    "*://*.doubleclick.net/*",
+    "*://connect.facebook.net/*",
+    "*://vk.com/rtrg*",
+    "*://analytics.tiktok.com/*",
+    "*://static.hotjar.com/*",
+    "*://*.criteo.com/*",
+)
+
+
+def split_patterns(value: str) -> Tuple[str, ...]:
+    """Шаблоны из строки через запятую"""
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+@lru_cache(maxsize=256)
+def _pattern_regex(pattern: str) -> "re.Pattern":
+    return re.compile("^" + ".*".join(re.escape(part) for part in pattern.split("*")) + "$")
+
+
+def matches_any(url: str, patterns: Sequence[str]) -> bool:
+    """Подходит ли URL под какой-нибудь из шаблонов"""
+    return any(_pattern_regex(pattern).match(url) for pattern in patterns)
+
+
+@dataclass(frozen=True)
+class BlockingPolicy:
+    """
+    Какие запросы сценарию не нужны: blocked — шаблоны блокировки, allowed — исключения
+    (например, картинка капчи на странице авторизации).
+    """
+
+    blocked: Tuple[str, ...]
+    allowed: Tuple[str, ...] = ()
+
+    def blocks(self, url: str) -> bool:
+        return matches_any(url, self.blocked) and not matches_any(url, self.allowed)
+
+
+DEFAULT_POLICY = BlockingPolicy(
+    blocked=STATIC_PATTERNS + TRACKER_PATTERNS + split_patterns(RESOURCE_BLOCK_PATTERNS),
+    allowed=split_patterns(RESOURCE_ALLOW_PATTERNS),
+)
+
+# Страницы авторизации и поставки используют одно SPA и одинаково обходятся без картинок,
+# шрифтов и аналитики — политика общая, а сценарии включаются через RESOURCE_BLOCKING_FLOWS
+FLOW_POLICIES = {
+    "request_auth": DEFAULT_POLICY,
+    "book": DEFAULT_POLICY,
+    "watch": DEFAULT_POLICY,
+}
+ENABLED_FLOWS = set(split_patterns(RESOURCE_BLOCKING_FLOWS))
+# WebDriver не умеет исключения allowed: там блокируем только в сценариях, которым они не нужны
+DRIVER_FLOWS = ENABLED_FLOWS & set(split_patterns(RESOURCE_BLOCKING_DRIVER_FLOWS))
+
+
+def policy_for(flow: str, enabled_flows: Optional[set] = None) -> Optional[BlockingPolicy]:
+    """Политика сценария или None, если блокировка для него выключена"""
+    enabled_flows = ENABLED_FLOWS if enabled_flows is None else enabled_flows
+    if not RESOURCE_BLOCKING_ENABLED or flow not in enabled_flows:
+        return None
+    return FLOW_POLICIES.get(flow)
+
+
+def apply_to_driver(driver, policy: BlockingPolicy) -> None:
+    """
+    Заблокировать запросы в WebDriver через Network.setBlockedURLs.
+    Исключения allowed здесь не действуют: для перехвата запросов нужны события CDP,
+    а chromedriver их не отдает.
+    """
+    execute_cdp(driver, "Network.enable")
+    execute_cdp(driver, "Network.setBlockedURLs", {"urls": list(policy.blocked)})
+
+
+def block_driver_resources(driver, flow: str) -> None:
+    """Применить политику сценария к драйверу; сценарий продолжается и без блокировки"""
+    policy = policy_for(flow, DRIVER_FLOWS)
+    if policy is None:
+        return
+    try:
+        apply_to_driver(driver, policy)
+    except Exception as e:
+        print(f"⚠️ Не удалось включить блокировку запросов ({flow}): {e}")
+
+
+async def block_browser_resources(browser, flow: str) -> None:
+    """То же для CdpBrowser: исключения allowed работают через перехват запросов (Fetch)"""
+    policy = policy_for(flow)
+    if policy is None:
+        return
+    try:
+        await browser.block_urls(policy.blocked, policy.allowed)
+    except Exception as e:
+        print(f"⚠️ Не удалось включить блокировку запросов ({flow}): {e}")
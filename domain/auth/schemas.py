@@ -1,7 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from datetime import datetime, date
 
+from config import BOOK_BATCH_MAX_SIZE
+
 
 class UserCreate(BaseModel):
     """Схема для создания пользователя"""
@@ -22,6 +24,8 @@ class CookieCreate(BaseModel):
     """Схема для создания куки"""
     name: str = Field(..., description="Название куки")
     value: str = Field(..., description="Значение куки")
+    domain: str = Field("", description="Домен куки")
+    path: str = Field("/", description="Путь куки")
     expire_date: Optional[datetime] = Field(None, description="Дата истечения куки")
 
 
@@ -30,6 +34,8 @@ class CookieResponse(BaseModel):
     id: int
     name: str
     value: str
+    domain: str
+    path: str
     expire_date: Optional[datetime]
     created_at: datetime
     updated_at: datetime
@@ -52,12 +58,15 @@ class RequestAuthResponse(BaseModel):
     """Схема ответа запроса авторизации"""
     success: bool
     message: str
+    retry_after: Optional[int] = Field(None, description="Через сколько секунд можно запросить код заново")
+    timings: Optional[Dict[str, float]] = Field(None, description="Время по шагам сценария, секунды")
 
 
 class ConfirmAuthRequest(BaseModel):
     """Схема для подтверждения авторизации"""
     phone: str = Field(..., description="Номер телефона в формате 9991231212")
     verification_code: str = Field(..., description="6-значный код из SMS")
+    user_id: Optional[int] = Field(None, description="ID пользователя: сохранить куки кабинета для бронирований")
 
 
 class ConfirmAuthResponse(BaseModel):
@@ -66,6 +75,7 @@ class ConfirmAuthResponse(BaseModel):
     message: str
     user_id: Optional[int] = None
     context: Optional[dict] = None
+    timings: Optional[Dict[str, float]] = Field(None, description="Время по шагам сценария, секунды")
 
 
 class CookiesResponse(BaseModel):
@@ -84,8 +94,54 @@ class BookRequest(BaseModel):
     phone: str
     supply_id: int
     dt: date
+    user_id: Optional[int] = Field(None, description="ID пользователя: бронировать через API с его сохраненными куками")
 
 
 class BookResponse(BaseModel):
     success: bool
     message: str
+    timings: Optional[Dict[str, float]] = Field(None, description="Время по шагам сценария, секунды")
+
+
+class BatchBookRequest(BaseModel):
+    """Пакет бронирований: разные телефоны выполняются параллельно, один телефон — по порядку"""
+    bookings: List[BookRequest] = Field(..., min_length=1, max_length=BOOK_BATCH_MAX_SIZE)
+
+
+class BatchBookResult(BaseModel):
+    """Результат одного бронирования из пакета (строка NDJSON)"""
+    index: int = Field(..., description="Позиция бронирования в запросе")
+    phone: str
+    supply_id: int
+    dt: date
+    success: bool
+    message: str
+    timings: Optional[Dict[str, float]] = None
+
+
+class WatchResponse(BaseModel):
+    """Состояние наблюдения за слотом поставки"""
+    id: str
+    phone: str
+    supply_id: int
+    dt: date
+    status: str = Field(..., description="watching, booked, failed, cancelled или expired")
+    polls: int = Field(..., description="Сколько раз перечитан календарь")
+    interval: float = Field(..., description="Текущий интервал опроса, секунды")
+    message: Optional[str] = None
+    timings: Optional[Dict[str, float]] = Field(None, description="Время по шагам бронирования, секунды")
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class JobResponse(BaseModel):
+    """Фоновая задача сценария: результат — в result, когда status станет done"""
+    id: str
+    kind: str = Field(..., description="request_auth, confirm_auth или book")
+    phone: str
+    status: str = Field(..., description="running, done, error или cancelled")
+    result: Optional[Dict[str, Any]] = Field(None, description="Ответ сценария, как у синхронного запроса")
+    error: Optional[str] = None
+    retry_after: Optional[int] = Field(None, description="Все браузеры были заняты: повторить через, секунды")
+    created_at: datetime
+    finished_at: Optional[datetime] = None
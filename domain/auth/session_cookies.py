@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from config import WB_COOKIE_DOMAIN
+from .browser import Browser
+from .driver import execute_cdp
+
+
+def read_driver_cookies(driver) -> Optional[List[Dict]]:
+    """Куки кабинета после входа; None — браузер их не отдал (вход от этого не ломается)"""
+    try:
+        return driver.get_cookies()
+    except Exception as e:
+        print(f"⚠️ Не удалось прочитать куки после входа: {e}")
+        return None
+
+
+async def read_browser_cookies(browser: Browser) -> Optional[List[Dict]]:
+    """То же для браузера асинхронных сценариев"""
+    try:
+        return await browser.cookies()
+    except Exception as e:
+        print(f"⚠️ Не удалось прочитать куки после входа: {e}")
+        return None
+
+
+def cookie_rows(cookies: List[Dict]) -> List[Dict]:
+    """
+    Куки WebDriver в строки для upsert_cookies.
+    Кука определяется именем, доменом и путем: при повторе одной и той же побеждает последняя.
+    """
+    jar = {}
+    for cookie in cookies:
+        name = cookie.get('name')
+        value = cookie.get('value')
+        if not (name and value):
+            continue
+
+        expire_date = None
+        expiry = cookie.get('expiry')
+        if expiry:
+            # expiry у WebDriver — unix-время; в БД (timestamptz) пишем явно в UTC
+            expire_date = datetime.fromtimestamp(expiry, tz=timezone.utc)
+
+        domain = cookie.get('domain') or ""
+        path = cookie.get('path') or "/"
+        jar[(name, domain, path)] = {
+            'name': name,
+            'value': value,
+            'domain': domain,
+            'path': path,
+            'expire_date': expire_date,
+        }
+    return list(jar.values())
+
+
+def cookie_expires(cookie: Dict) -> Optional[datetime]:
+    """Срок действия сохраненной куки (expire_date — datetime или ISO-строка); None — сессионная"""
+    expire_date = cookie.get('expire_date')
+    if not expire_date:
+        return None
+    expires = datetime.fromisoformat(expire_date) if isinstance(expire_date, str) else expire_date
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires
+
+
+def live_cookies(cookies: List[Dict]) -> List[Dict]:
+    """Сохраненные куки без истекших"""
+    now = datetime.now(timezone.utc)
+    live = []
+    for cookie in cookies:
+        expires = cookie_expires(cookie)
+        if expires is None or expires > now:
+            live.append(cookie)
+    return live
+
+
+def cdp_cookies(cookies: List[Dict]) -> List[Dict]:
+    """
+    Сохраненные куки (name, value, domain, path, expire_date) в параметры Network.setCookies.
+    Куки без домена (сохраненные до его появления в БД) ставятся на WB_COOKIE_DOMAIN.
+    Куки только для хоста (домен без точки, в том числе __Host-) ставятся по url,
+    чтобы браузер не превратил их в доменные. Истекшие пропускаются.
+    """
+    params = []
+    for cookie in live_cookies(cookies):
+        domain = cookie.get('domain') or WB_COOKIE_DOMAIN
+        path = cookie.get('path') or "/"
+        item = {
+            "name": cookie['name'],
+            "value": cookie['value'],
+            "path": path,
+            "secure": True,
+        }
+        if domain.startswith("."):
+            item["domain"] = domain
+        else:
+            item["url"] = f"https://{domain}{path}"
+        expires = cookie_expires(cookie)
+        if expires is not None:
+            item["expires"] = expires.timestamp()
+        params.append(item)
+    return params
+
+
+def inject_driver_cookies(driver, cookies: List[Dict]) -> None:
+    """Поставить сохраненные куки в браузер до первой навигации"""
+    execute_cdp(driver, "Network.setCookies", {"cookies": cdp_cookies(cookies)})
+
+
+async def inject_browser_cookies(browser: Browser, cookies: List[Dict]) -> None:
+    """То же для браузера асинхронных сценариев"""
+    await browser.set_cookies(cdp_cookies(cookies))
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .executor import browser_executor
+from .session_store import AuthSession, SessionStore
+
+# Как часто пересчитывать живые сессии для метрики и /health (секунды)
+LIVE_REFRESH_INTERVAL = 15
+# Как часто перечитывать хранилище: сессии других воркеров (в том числе упавших) тоже нужно закрывать
+STORE_RELOAD_INTERVAL = 60
+
+
+class SessionReaper:
+    """
+    Фоновая задача, закрывающая браузеры истекших сессий авторизации.
+
+    Сессии хранятся в куче по времени истечения: задача спит ровно до ближайшего
+    истечения, а не сканирует все хранилище. Записи кучи для уже закрытых или
+    пересозданных сессий пропускаются при извлечении.
+    Хранилище (с Redis — сетевые вызовы) задача опрашивает только в потоке; число живых
+    сессий для метрики и /health берется из live, которое она обновляет раз в LIVE_REFRESH_INTERVAL.
+    Раз в STORE_RELOAD_INTERVAL в кучу добавляются сессии из хранилища, которых в ней нет:
+    сессию, созданную воркером, который потом упал, закроет другой воркер.
+    """
+
+    def __init__(self, store: SessionStore, close: Callable[[str], None], ttl: int):
+        self.store = store
+        self.close = close
+        self.ttl = ttl
+        self._heap: List[Tuple[float, str, datetime]] = []
+        self._scheduled: Set[Tuple[str, datetime]] = set()
+        self._heap_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reaping: Set[asyncio.Task] = set()
+        self._reaped = 0
+        self._live = 0
+
+    def schedule(self, auth_session: AuthSession) -> None:
+        """Запланировать закрытие сессии (можно вызывать из любого потока)"""
+        expires_at = auth_session.created_at.timestamp() + self.ttl
+        key = (auth_session.phone, auth_session.created_at)
+        with self._heap_lock:
+            if key in self._scheduled:
+                return
+            self._scheduled.add(key)
+            heapq.heappush(self._heap, (expires_at, auth_session.phone, auth_session.created_at))
+            is_next = self._heap[0][0] == expires_at
+        if is_next and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self) -> None:
+        """Запустить фоновую задачу в текущем event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def live(self) -> int:
+        """Число живых сессий на момент последнего пересчета"""
+        return self._live
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        reload_at = loop.time()
+        while True:
+            if loop.time() >= reload_at:
+                # Подхватываем сессии, созданные до запуска и другими воркерами
+                await self._reload()
+                reload_at = loop.time() + STORE_RELOAD_INTERVAL
+
+            self._wake.clear()
+            await self._refresh_live()
+            delay = self._next_delay()
+            delay = LIVE_REFRESH_INTERVAL if delay is None else min(delay, LIVE_REFRESH_INTERVAL)
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+            for phone, created_at in self._pop_due():
+                task = asyncio.create_task(self._reap(phone, created_at))
+                self._reaping.add(task)
+                task.add_done_callback(self._reaping.discard)
+
+    async def _reload(self) -> None:
+        try:
+            for auth_session in await asyncio.to_thread(self.store.all):
+                self.schedule(auth_session)
+        except Exception as e:
+            print(f"Ошибка чтения сессий авторизации: {e}")
+
+    async def _refresh_live(self) -> None:
+        try:
+            self._live = await asyncio.to_thread(self.store.count)
+        except Exception as e:
+            print(f"Ошибка подсчета сессий авторизации: {e}")
+
+    def _next_delay(self) -> Optional[float]:
+        with self._heap_lock:
+            if not self._heap:
+                return None
+            return self._heap[0][0] - datetime.utcnow().timestamp()
+
+    def _pop_due(self) -> List[Tuple[str, datetime]]:
+        now = datetime.utcnow().timestamp()
+        due = []
+        with self._heap_lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, phone, created_at = heapq.heappop(self._heap)
+                self._scheduled.discard((phone, created_at))
+                due.append((phone, created_at))
+        return due
+
+    async def _reap(self, phone: str, created_at: datetime) -> None:
+        try:
+            auth_session = await asyncio.to_thread(self.store.get, phone)
+            if auth_session is None or auth_session.created_at != created_at:
+                # Сессия уже закрыта или запрошена заново
+                return
+            # Через пул браузеров: не закрываем драйвер посреди сценария этого телефона
+            await browser_executor.submit(phone, self.close, phone, flow="close")
+            self._reaped += 1
+            print("Сессия истекла, браузер закрыт", phone)
+            await self._refresh_live()
+        except Exception as e:
+            print(f"Ошибка закрытия истекшей сессии {phone}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Закрыто сессий и сколько сейчас живых"""
+        with self._heap_lock:
+            scheduled = len(self._heap)
+        return {
+            "reaped": self._reaped,
+            "live": self._live,
+            "scheduled": scheduled,
+        }
@@ -0,0 +1,158 @@
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import SESSION_STORE, REDIS_URL, SESSION_TTL
+from .redis_client import get_redis
+
+
+@dataclass
+class AuthSession:
+    """Ожидающая ввода SMS-кода сессия: достаточно данных, чтобы переподключиться к браузеру"""
+    phone: str
+    remote_session_id: str
+    executor_url: str
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+    verified: bool = False
+    # Чем открыт браузер сессии: webdriver (Grid) или cdp (executor_url — адрес DevTools)
+    backend: str = "webdriver"
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data['created_at'] = self.created_at.isoformat()
+        data['updated_at'] = self.updated_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "AuthSession":
+        data = json.loads(raw)
+        data['created_at'] = datetime.fromisoformat(data['created_at'])
+        data['updated_at'] = datetime.fromisoformat(data['updated_at'])
+        return cls(**data)
+
+
+class SessionStore(ABC):
+    """Хранилище сессий авторизации"""
+
+    @abstractmethod
+    def get(self, phone: str) -> Optional[AuthSession]:
+        ...
+
+    @abstractmethod
+    def save(self, auth_session: AuthSession) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, phone: str) -> None:
+        ...
+
+    @abstractmethod
+    def all(self) -> List[AuthSession]:
+        ...
+
+    def count(self) -> int:
+        """Число сессий (дешевле, чем all)"""
+        return len(self.all())
+
+    def __contains__(self, phone) -> bool:
+        return self.get(str(phone)) is not None
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class InMemorySessionStore(SessionStore):
+    """Сессии в памяти процесса (только для одного воркера)"""
+
+    def __init__(self):
+        self._sessions: Dict[str, AuthSession] = {}
+        self._lock = threading.Lock()
+
+    def get(self, phone: str) -> Optional[AuthSession]:
+        with self._lock:
+            return self._sessions.get(phone)
+
+    def save(self, auth_session: AuthSession) -> None:
+        auth_session.updated_at = datetime.utcnow()
+        with self._lock:
+            self._sessions[auth_session.phone] = auth_session
+
+    def delete(self, phone: str) -> None:
+        with self._lock:
+            self._sessions.pop(phone, None)
+
+    def all(self) -> List[AuthSession]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Сессии в Redis (или любом сервере с протоколом Redis) — общие для всех воркеров и реплик.
+    Можно передать готовый клиент, например для локального тестового сервера.
+    """
+
+    KEY_PREFIX = "wb_auth:session:"
+    # Телефоны сессий по времени истечения ключа: число сессий и их список без SCAN по всей базе
+    INDEX_KEY = "wb_auth:sessions"
+
+    def __init__(self, url: Optional[str] = None, client=None, ttl: int = SESSION_TTL):
+        self.client = client if client is not None else get_redis(url or REDIS_URL)
+        # Запас сверх времени жизни сессии, чтобы очистка успела закрыть браузер
+        self.ttl = ttl * 2
+
+    def _key(self, phone: str) -> str:
+        return f"{self.KEY_PREFIX}{phone}"
+
+    def get(self, phone: str) -> Optional[AuthSession]:
+        raw = self.client.get(self._key(phone))
+        return AuthSession.from_json(raw) if raw else None
+
+    def save(self, auth_session: AuthSession) -> None:
+        auth_session.updated_at = datetime.utcnow()
+        pipe = self.client.pipeline()
+        pipe.set(self._key(auth_session.phone), auth_session.to_json(), ex=self.ttl)
+        pipe.zadd(self.INDEX_KEY, {auth_session.phone: time.time() + self.ttl})
+        pipe.execute()
+
+    def delete(self, phone: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(phone))
+        pipe.zrem(self.INDEX_KEY, phone)
+        pipe.execute()
+
+    def _live_phones(self) -> List[str]:
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self.INDEX_KEY, "-inf", time.time())
+        pipe.zrange(self.INDEX_KEY, 0, -1)
+        _, phones = pipe.execute()
+        return [phone.decode() if isinstance(phone, bytes) else phone for phone in phones]
+
+    def all(self) -> List[AuthSession]:
+        phones = self._live_phones()
+        if not phones:
+            return []
+        raws = self.client.mget([self._key(phone) for phone in phones])
+        return [AuthSession.from_json(raw) for raw in raws if raw]
+
+    def count(self) -> int:
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(self.INDEX_KEY, "-inf", time.time())
+        pipe.zcard(self.INDEX_KEY)
+        return pipe.execute()[1]
+
+
+def create_session_store() -> SessionStore:
+    """Хранилище по настройке SESSION_STORE: memory (по умолчанию) или redis"""
+    if SESSION_STORE == "redis":
+        return RedisSessionStore(REDIS_URL)
+    return InMemorySessionStore()
@@ -0,0 +1,230 @@
+import asyncio
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .executor import browser_executor, BrowserBusy
+
+# Состояния наблюдателя
+WATCHING = "watching"
+BOOKED = "booked"
+FAILED = "failed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+
+class WatchLimitReached(Exception):
+    """Запущено максимальное число наблюдателей"""
+
+
+class PhoneAlreadyWatched(Exception):
+    """Для телефона уже работает наблюдатель (профиль Chrome занят его браузером)"""
+
+
+@dataclass
+class Watch:
+    """Наблюдение за датой поставки: открытый браузер и состояние опроса календаря"""
+    phone: str
+    supply_id: int
+    dt: date
+    interval: float
+    deadline: float
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = WATCHING
+    polls: int = 0
+    errors: int = 0
+    message: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+    available_dates: List[str] = field(default_factory=list)
+    changed: bool = False
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    driver: Any = field(default=None, repr=False)
+    # Когда в driver открыли календарь (time.monotonic); None — его нужно открыть
+    calendar_opened_at: Optional[float] = field(default=None, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def observe(self, dates: List[str]) -> None:
+        """Запомнить доступные даты; changed — изменились ли они с прошлого опроса"""
+        self.changed = dates != self.available_dates
+        self.available_dates = dates
+
+    def info(self) -> Dict:
+        return {
+            "id": self.id,
+            "phone": self.phone,
+            "supply_id": self.supply_id,
+            "dt": self.dt,
+            "status": self.status,
+            "polls": self.polls,
+            "interval": round(self.interval, 3),
+            "message": self.message,
+            "timings": self.timings,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class SlotWatcher:
+    """
+    Наблюдатели за слотами поставок.
+
+    Каждый наблюдатель держит открытым авторизованный браузер телефона и перечитывает
+    календарь поставки. Пока доступные даты не меняются, интервал опроса растет
+    до max_interval; как только календарь меняется — опрос снова частый.
+    Опросы выполняются в пуле браузеров (с блокировкой телефона), между опросами
+    поток пула не занят. Каждый наблюдатель держит сессию Grid, поэтому их число
+    ограничено max_watchers.
+    """
+
+    def __init__(
+        self,
+        check: Callable[[Watch], Optional[Dict]],
+        close: Callable[[Watch], None],
+        max_watchers: int,
+        min_interval: float,
+        max_interval: float,
+        backoff: float = 1.5,
+        max_duration: float = 3600,
+        max_errors: int = 5,
+        history: int = 100,
+    ):
+        self.check = check
+        self.close = close
+        self.max_watchers = max_watchers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_duration = max_duration
+        self.max_errors = max_errors
+        self.history = history
+        self._active: Dict[str, Watch] = {}
+        self._finished: "OrderedDict[str, Watch]" = OrderedDict()
+        self._booked = 0
+
+    def add(self, phone: str, supply_id: int, dt: date) -> Watch:
+        """Запустить наблюдение за датой dt поставки supply_id"""
+        for watch in self._active.values():
+            if watch.phone == phone:
+                if watch.supply_id == supply_id and watch.dt == dt:
+                    return watch
+                raise PhoneAlreadyWatched(phone)
+        if len(self._active) >= self.max_watchers:
+            raise WatchLimitReached(self.max_watchers)
+
+        watch = Watch(
+            phone=phone,
+            supply_id=supply_id,
+            dt=dt,
+            interval=self.min_interval,
+            deadline=time.monotonic() + self.max_duration,
+        )
+        self._active[watch.id] = watch
+        watch.task = asyncio.create_task(self._run(watch))
+        print("Наблюдение за слотом запущено", phone, supply_id, dt)
+        return watch
+
+    def get(self, watch_id: str) -> Optional[Watch]:
+        return self._active.get(watch_id) or self._finished.get(watch_id)
+
+    def list(self) -> List[Watch]:
+        return list(self._active.values()) + list(self._finished.values())
+
+    def is_watching(self, phone: str) -> bool:
+        return any(watch.phone == phone for watch in self._active.values())
+
+    async def cancel(self, watch_id: str) -> Optional[Watch]:
+        """Остановить наблюдение и закрыть его браузер"""
+        watch = self._active.get(watch_id)
+        if watch is None:
+            return self._finished.get(watch_id)
+        if watch.status == WATCHING:
+            watch.task.cancel()
+        try:
+            await watch.task
+        except asyncio.CancelledError:
+            pass
+        if watch.id in self._active:
+            # Задачу отменили до первого шага: _run не выполнялся, браузер не открывался
+            self._finish(watch, CANCELLED, "Наблюдение отменено")
+            self._retire(watch)
+        return watch
+
+    async def stop(self) -> None:
+        for watch_id in list(self._active):
+            await self.cancel(watch_id)
+
+    def _next_interval(self, watch: Watch) -> float:
+        if watch.changed:
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(watch.interval * self.backoff, self.max_interval)
+        # Немного разброса, чтобы наблюдатели не опрашивали кабинет одновременно
+        return watch.interval * random.uniform(0.9, 1.1)
+
+    async def _run(self, watch: Watch) -> None:
+        try:
+            while True:
+                if time.monotonic() >= watch.deadline or watch.dt < date.today():
+                    self._finish(watch, EXPIRED, "Время наблюдения истекло")
+                    return
+
+                try:
+                    result = await browser_executor.submit(watch.phone, self.check, watch, flow="watch")
+                    watch.errors = 0
+                except BrowserBusy:
+                    # Браузеры заняты сценариями пользователей — пропускаем опрос, это не ошибка
+                    result = None
+                except Exception as e:
+                    watch.errors += 1
+                    print(f"Ошибка опроса календаря {watch.phone}: {e}")
+                    if watch.errors >= self.max_errors:
+                        self._finish(watch, FAILED, f"Ошибка опроса календаря: {str(e)}")
+                        return
+                    result = None
+                watch.polls += 1
+
+                if result is not None:
+                    watch.timings = result.get('timings')
+                    self._finish(watch, BOOKED if result['success'] else FAILED, result['message'])
+                    return
+
+                await asyncio.sleep(self._next_interval(watch))
+        except asyncio.CancelledError:
+            self._finish(watch, CANCELLED, "Наблюдение отменено")
+            raise
+        finally:
+            try:
+                await browser_executor.submit(watch.phone, self.close, watch, flow="close")
+            except Exception as e:
+                print(f"Ошибка закрытия браузера наблюдателя {watch.phone}: {e}")
+            # Телефон считается занятым, пока браузер наблюдателя не закрыт
+            self._retire(watch)
+
+    def _retire(self, watch: Watch) -> None:
+        """Перенести наблюдение в историю"""
+        self._active.pop(watch.id, None)
+        self._finished[watch.id] = watch
+        while len(self._finished) > self.history:
+            self._finished.popitem(last=False)
+
+    def _finish(self, watch: Watch, status: str, message: str) -> None:
+        if watch.status != WATCHING:
+            return
+        watch.status = status
+        watch.message = message
+        watch.finished_at = datetime.utcnow()
+        if status == BOOKED:
+            self._booked += 1
+        print("Наблюдение за слотом завершено", watch.phone, watch.supply_id, status, message)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._active),
+            "max_watchers": self.max_watchers,
+            "booked": self._booked,
+        }
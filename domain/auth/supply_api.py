@@ -0,0 +1,85 @@
+import itertools
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from config import SUPPLY_API_URL, SUPPLY_API_TIMEOUT, SUPPLY_API_MAX_CONNECTIONS
+from .session_cookies import live_cookies
+
+# Метод JSON-RPC, который вызывает страница supply-detail при переносе даты поставки
+BOOK_METHOD = "updatePlanDate"
+# Коды ошибок самого JSON-RPC (нет метода, неверные параметры, ошибка разбора запроса):
+# API изменилось, и бронировать надо через браузер, а не сообщать пользователю об отказе
+PROTOCOL_ERROR_CODES = range(-32768, -31999)
+
+
+class SessionRejected(Exception):
+    """API не принял куки: сессия истекла или пользователь не авторизован"""
+
+
+class UnexpectedResponse(Exception):
+    """Ответ не похож на ответ API (HTML страницы, не объект, ошибка протокола): бронировать через браузер"""
+
+
+class SupplyApi:
+    """
+    HTTP-клиент API управления поставками (тот же, что использует кабинет продавца).
+    Пул соединений общий для всех запросов. Для тестов можно передать
+    другой base_url (локальный mock-сервер) или готовый httpx.AsyncClient.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 15, max_connections: int = 100,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.base_url = base_url.rstrip("/")
+        self._client = client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=False,
+        )
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def cookie_header(cookies: List[Dict]) -> str:
+        """Заголовок Cookie из сохраненных куки (истекшие пропускаются)"""
+        return "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in live_cookies(cookies))
+
+    async def call(self, method: str, params: Dict, cookies: List[Dict]) -> Dict:
+        """Вызвать метод JSON-RPC и вернуть result"""
+        response = await self._client.post(
+            f"{self.base_url}/{method}",
+            json={"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params},
+            headers={"Cookie": self.cookie_header(cookies), "Content-Type": "application/json"},
+        )
+        if response.status_code in (401, 403) or response.is_redirect:
+            raise SessionRejected(f"HTTP {response.status_code}")
+        response.raise_for_status()
+
+        try:
+            body = response.json()
+        except ValueError:
+            raise UnexpectedResponse(f"не JSON: {response.headers.get('content-type')}")
+        if not isinstance(body, dict) or ("result" not in body and "error" not in body):
+            raise UnexpectedResponse(f"не ответ JSON-RPC: {type(body).__name__}")
+
+        error = body.get("error")
+        if error is not None and not isinstance(error, dict):
+            raise UnexpectedResponse(f"ошибка не объект: {error!r}")
+        if error:
+            if error.get("code") in (401, 403):
+                raise SessionRejected(error.get("message", "unauthorized"))
+            if error.get("code") in PROTOCOL_ERROR_CODES:
+                raise UnexpectedResponse(f"ошибка JSON-RPC {error.get('code')}: {error.get('message')}")
+            return {"success": False, "message": error.get("message", "Ошибка API поставок")}
+        return {"success": True, "result": body.get("result")}
+
+    async def book(self, cookies: List[Dict], supply_id: int, dt: date) -> Dict:
+        """Перенести поставку на дату dt"""
+        delivery_date = datetime(dt.year, dt.month, dt.day, tzinfo=timezone.utc).isoformat().replace("+00:00", "Z")
+        return await self.call(BOOK_METHOD, {"supplyId": supply_id, "deliveryDate": delivery_date}, cookies)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+supply_api = SupplyApi(SUPPLY_API_URL, SUPPLY_API_TIMEOUT, SUPPLY_API_MAX_CONNECTIONS)
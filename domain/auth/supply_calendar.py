@@ -0,0 +1,95 @@
+from typing import List, Optional, Tuple
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from config import WB_SELLER_URL
+
+PLAN_BUTTON_CLASS = "Supply-detail-options__plan-desktop-button__-N407e2FDC"
+CONFIRM_POPUP_XPATH = """//*[@id="Portal-modal"]/div[5]/div/div/div[4]/div[1]/button"""
+CALENDAR_CELL_CSS_SELECTOR = "td span"
+TRANSFER_BUTTON_XPATH = "//button[normalize-space(.)='Перенести']"
+
+# Ищет ячейку календаря с нужной датой и доступным слотом за один вызов WebDriver.
+# Возвращает [ячейка, последняя кнопка в ячейке] или null.
+FIND_DATE_CELL_SCRIPT = """
+const target = arguments[0];
+for (const cell of document.querySelectorAll('tr td')) {
+    const span = cell.querySelector('span');
+    if (!span || !span.textContent.includes(target)) {
+        continue;
+    }
+    if (!cell.querySelector('div.Custom-popup')) {
+        continue;
+    }
+    cell.scrollIntoView(true);
+    const buttons = cell.querySelectorAll('button');
+    return [cell, buttons.length ? buttons[buttons.length - 1] : null];
+}
+return null;
+"""
+
+# То же для асинхронных сценариев: элементы нельзя вернуть из браузера,
+# поэтому ячейка и кнопка помечаются атрибутом data-wb-target для кликов по селектору.
+MARK_DATE_CELL_SCRIPT = """
+const target = arguments[0];
+document.querySelectorAll('[data-wb-target]').forEach(el => el.removeAttribute('data-wb-target'));
+for (const cell of document.querySelectorAll('tr td')) {
+    const span = cell.querySelector('span');
+    if (!span || !span.textContent.includes(target)) {
+        continue;
+    }
+    if (!cell.querySelector('div.Custom-popup')) {
+        continue;
+    }
+    const buttons = cell.querySelectorAll('button');
+    if (!buttons.length) {
+        return false;
+    }
+    cell.setAttribute('data-wb-target', 'date-cell');
+    buttons[buttons.length - 1].setAttribute('data-wb-target', 'date-button');
+    return true;
+}
+return false;
+"""
+DATE_CELL_SELECTOR = '[data-wb-target="date-cell"]'
+DATE_BUTTON_SELECTOR = '[data-wb-target="date-button"]'
+
+# Даты календаря, на которые сейчас есть доступный слот
+AVAILABLE_DATES_SCRIPT = """
+const dates = [];
+for (const cell of document.querySelectorAll('tr td')) {
+    const span = cell.querySelector('span');
+    if (span && cell.querySelector('div.Custom-popup')) {
+        dates.push(span.textContent.trim());
+    }
+}
+return dates;
+"""
+
+
+def supply_detail_url(supply_id: int) -> str:
+    return f"{WB_SELLER_URL}/supplies-management/all-supplies/supply-detail?preorderId&supplyId={supply_id}"
+
+
+def find_date_cell(driver, target_date: str) -> Optional[Tuple[WebElement, Optional[WebElement]]]:
+    """
+    Найти в календаре поставки ячейку с датой target_date (например "5 ноября"),
+    в которой есть доступный слот. Возвращает (ячейка, кнопка выбора) или None.
+    """
+    found = driver.execute_script(FIND_DATE_CELL_SCRIPT, target_date)
+    if not found:
+        return None
+    cell, button = found
+    return cell, button
+
+
+def available_dates(driver) -> List[str]:
+    """Даты с доступными слотами в открытом календаре (за один вызов WebDriver)"""
+    return driver.execute_script(AVAILABLE_DATES_SCRIPT) or []
+
+
+def calendar_is_open(driver, supply_id: int) -> bool:
+    """Календарь поставки все еще открыт: страница та же и ячейки на месте"""
+    return driver.current_url == supply_detail_url(supply_id) \
+        and bool(driver.find_elements(By.CSS_SELECTOR, CALENDAR_CELL_CSS_SELECTOR))
@@ -0,0 +1,75 @@
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from .executor import FlowCancelled, current_queue_wait
+from .metrics import observe_step
+from .tracing import artifact_writer
+
+
+class StepTimer:
+    """
+    Трасса браузерного сценария: время по шагам (спаны).
+    С flow шаги попадают в метрики. Если к трассе привязан драйвер, для упавших
+    и медленных шагов сохраняются скриншот и DOM страницы.
+    Ожидание браузера в очереди BrowserExecutor в шаги не входит и в отчете идет отдельно (queue_wait).
+    """
+
+    def __init__(self, flow: Optional[str] = None, driver=None):
+        self.flow = flow
+        self.driver = driver
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = datetime.utcnow()
+        self.steps: Dict[str, float] = {}
+        self.queue_wait = current_queue_wait()
+        self.spans: List[Dict] = []
+        self._start = time.perf_counter()
+        self._captures = 0
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        span = {"name": name, "start": round(start - self._start, 3)}
+        self.spans.append(span)
+        try:
+            yield
+        except FlowCancelled:
+            span["status"] = "cancelled"
+            raise
+        except Exception as e:
+            span["status"] = "error"
+            span["error"] = f"{type(e).__name__}: {e}"
+            self.capture(name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            span["duration"] = round(elapsed, 3)
+            self.steps[name] = round(self.steps.get(name, 0) + elapsed, 3)
+            if self.flow:
+                observe_step(self.flow, name, elapsed)
+
+        span["status"] = "ok"
+        if elapsed > artifact_writer.threshold(name):
+            span["status"] = "slow"
+            self.capture(name)
+
+    def capture(self, name: str) -> None:
+        """Сохранить скриншот и DOM текущей страницы (для неудачного шага)"""
+        if self.driver is None or not artifact_writer.enabled or self._captures >= artifact_writer.max_captures:
+            return
+        self._captures += 1
+        trace_dir = f"{self.started_at:%Y%m%d-%H%M%S}-{self.flow or 'flow'}-{self.trace_id}"
+        artifact_writer.capture(trace_dir, self.driver, f"{self._captures}-{name}", [dict(span) for span in self.spans])
+
+    @property
+    def total(self) -> float:
+        return round(sum(self.steps.values()), 3)
+
+    def report(self) -> Dict[str, float]:
+        """Время по шагам, общее время и ожидание в очереди (секунды)"""
+        report = {**self.steps, "total": self.total}
+        if self.queue_wait is not None:
+            report["queue_wait"] = self.queue_wait
+        return report
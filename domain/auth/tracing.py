@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import (
+    TRACE_ARTIFACTS_ENABLED, TRACE_ARTIFACT_DIR, TRACE_SLOW_STEP_SECONDS, TRACE_STEP_THRESHOLDS,
+    TRACE_MAX_TRACES, TRACE_RETENTION_HOURS, TRACE_MAX_CAPTURES,
+)
+
+
+def parse_thresholds(value: str) -> Dict[str, float]:
+    """Пороги шагов из строки вида "navigation=5,code_result=8" """
+    thresholds = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            thresholds[name.strip()] = float(seconds)
+    return thresholds
+
+
+class ArtifactWriter:
+    """
+    Запись скриншотов и снимков DOM упавших или медленных шагов.
+
+    Снимок снимается в потоке сценария (драйвер живет там), а на диск пишется
+    в отдельном фоновом потоке. Каждая трасса — свой каталог {root}/{начало}-{flow}-{trace_id};
+    хранится не больше max_traces трасс и не дольше max_age секунд.
+    """
+
+    def __init__(self, root: str, enabled: bool = True, slow_step: float = 15,
+                 thresholds: Optional[Dict[str, float]] = None, max_traces: int = 200,
+                 max_age: float = 24 * 3600, max_captures: int = 3):
+        self.root = root
+        self.enabled = enabled
+        self.slow_step = slow_step
+        self.thresholds = thresholds or {}
+        self.max_traces = max_traces
+        self.max_age = max_age
+        self.max_captures = max_captures
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-writer")
+        self._captured = 0
+        self._dropped = 0
+
+    def threshold(self, step: str) -> float:
+        """Порог времени шага, после которого он считается медленным"""
+        return self.thresholds.get(step, self.slow_step)
+
+    def capture(self, trace_dir: str, driver, name: str, spans: List[Dict]) -> None:
+        """Снять скриншот и DOM и отдать их на запись (ошибки не прерывают сценарий)"""
+        try:
+            screenshot = driver.get_screenshot_as_png()
+        except Exception as e:
+            print(f"Не удалось снять скриншот {name}: {e}")
+            screenshot = None
+        try:
+            dom = driver.page_source
+        except Exception as e:
+            print(f"Не удалось снять DOM {name}: {e}")
+            dom = None
+        try:
+            url = driver.current_url
+        except Exception:
+            url = None
+
+        self._captured += 1
+        print("Сохраняем артефакты шага", name, os.path.join(self.root, trace_dir))
+        self._writer.submit(self._write, trace_dir, name, screenshot, dom, {"url": url, "spans": spans})
+
+    def _write(self, trace_dir: str, name: str, screenshot: Optional[bytes], dom: Optional[str], trace: Dict) -> None:
+        path = os.path.join(self.root, trace_dir)
+        try:
+            is_new = not os.path.isdir(path)
+            os.makedirs(path, exist_ok=True)
+            if screenshot is not None:
+                with open(os.path.join(path, f"{name}.png"), "wb") as f:
+                    f.write(screenshot)
+            if dom is not None:
+                with open(os.path.join(path, f"{name}.html"), "w", encoding="utf-8") as f:
+                    f.write(dom)
+            with open(os.path.join(path, "trace.json"), "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False, indent=2)
+            if is_new:
+                self.prune()
+        except OSError as e:
+            print(f"Ошибка записи артефактов трассы {trace_dir}: {e}")
+
+    def prune(self) -> None:
+        """Удалить трассы сверх лимита и старше max_age"""
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return
+        expired_before = time.time() - self.max_age
+        excess = len(names) - self.max_traces
+        for i, name in enumerate(names):
+            path = os.path.join(self.root, name)
+            try:
+                expired = os.stat(path).st_mtime < expired_before
+            except FileNotFoundError:
+                continue
+            # Имена начинаются со времени начала трассы — первые по порядку самые старые
+            if i < excess or expired:
+                shutil.rmtree(path, ignore_errors=True)
+                self._dropped += 1
+
+    def shutdown(self) -> None:
+        self._writer.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "captured": self._captured,
+            "dropped": self._dropped,
+        }
+
+
+artifact_writer = ArtifactWriter(
+    root=TRACE_ARTIFACT_DIR,
+    enabled=TRACE_ARTIFACTS_ENABLED,
+    slow_step=TRACE_SLOW_STEP_SECONDS,
+    thresholds=parse_thresholds(TRACE_STEP_THRESHOLDS),
+    max_traces=TRACE_MAX_TRACES,
+    max_age=TRACE_RETENTION_HOURS * 3600,
+    max_captures=TRACE_MAX_CAPTURES,
+)
@@ -1,16 +1,54 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from config import PORT, BROWSER_BACKEND
+from api.routes import auth, jobs
+from domain.auth.executor import browser_executor
+from domain.auth.driver_pool import driver_pool
+from domain.auth.auth_service import (
+    session_reaper, slot_watcher, auth_flights, job_manager, browser_cache, is_profile_active, close_local_browsers,
+)
+from domain.auth.profiles import profile_manager
+from domain.auth.supply_api import supply_api
+from domain.auth.cookie_cache import cookie_cache
+from domain.auth.cookie_purge import cookie_purger
+from domain.auth.tracing import artifact_writer
 
-from config import PORT
-from api.routes import auth
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка фоновых компонентов"""
+    profile_manager.start(is_profile_active)
+    if BROWSER_BACKEND == "webdriver":
+        # Прогретые драйверы Grid нужны только Selenium-сценариям
+        driver_pool.start()
+    session_reaper.start()
+    browser_cache.start()
+    cookie_purger.start()
+    yield
+    await job_manager.stop()
+    await slot_watcher.stop()
+    await cookie_purger.stop()
+    await session_reaper.stop()
+    await browser_cache.stop()
+    browser_executor.shutdown()
+    await close_local_browsers()
+    driver_pool.shutdown()
+    await profile_manager.stop()
+    await supply_api.close()
+    artifact_writer.shutdown()
 
 
 # Создаем приложение FastAPI
 app = FastAPI(
     title="Wildberries Auth Service",
     description="Микросервис для авторизации в Wildberries",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Настройка CORS
@@ -24,6 +62,7 @@ app.add_middleware(
 
 # Подключаем роуты
 app.include_router(auth.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -35,7 +74,26 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Проверка здоровья сервиса"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "browser_executor": browser_executor.stats(),
+        "auth_flights": auth_flights.stats(),
+        "driver_pool": driver_pool.stats(),
+        "chrome_profiles": profile_manager.stats(),
+        "auth_sessions": session_reaper.stats(),
+        "browser_cache": browser_cache.stats(),
+        "cookie_cache": cookie_cache.stats(),
+        "cookie_purge": cookie_purger.stats(),
+        "slot_watchers": slot_watcher.stats(),
+        "jobs": job_manager.stats(),
+        "trace_artifacts": artifact_writer.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Метрики Prometheus: шаги сценариев, их исходы, сессии, пул БД"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,27 @@
+from selenium.common.exceptions import TimeoutException
+
+from domain.auth import auth_service
+
+
+def test_failed_request_auth_quits_the_driver(monkeypatch):
+    drivers = []
+    create_new_driver = auth_service.WildberriesAuthService.create_new_driver
+
+    def create(self, phone, new_profile=False):
+        drivers.append(create_new_driver(self, phone, new_profile))
+        return drivers[-1]
+
+    def request_code(driver, phone, timer):
+        raise TimeoutException("кнопка не появилась")
+
+    quit_calls = []
+    monkeypatch.setattr(auth_service.WildberriesAuthService, "create_new_driver", create)
+    monkeypatch.setattr(auth_service, "request_code", request_code)
+    monkeypatch.setattr(auth_service, "quit_driver", lambda driver: quit_calls.append(driver))
+    result = auth_service.WildberriesAuthService(None)._request_auth("79990000020")
+    for driver in drivers:
+        driver.quit()
+
+    assert not result["success"]
+    assert quit_calls == drivers and len(drivers) == 1
+    assert "79990000020" not in auth_service.local_drivers
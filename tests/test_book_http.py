@@ -0,0 +1,76 @@
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+from domain.auth import auth_service
+from domain.auth.auth_service import WildberriesAuthService, browser_cache
+from domain.auth.cookie_cache import cookie_cache
+from domain.auth.fake_driver import SLOT_EVERY
+from domain.auth.schemas import BookRequest
+from domain.auth.supply_api import SupplyApi
+
+USER_ID = 1
+COOKIES = [{"name": "WBTokenV3", "value": "token", "expire_date": None}]
+
+
+def free_date() -> date:
+    """Дата, на которую в календаре фейкового кабинета есть слот"""
+    day = date.today() + timedelta(days=1)
+    while day.day % SLOT_EVERY:
+        day += timedelta(days=1)
+    return day
+
+
+def book(monkeypatch, respond, phone: str) -> dict:
+    """Забронировать с API поставок, который отвечает respond(request)"""
+    api = SupplyApi("http://supply.test", client=httpx.AsyncClient(transport=httpx.MockTransport(respond)))
+    monkeypatch.setattr(auth_service, "supply_api", api)
+    monkeypatch.setattr(auth_service, "SUPPLY_HTTP_ENABLED", True)
+
+    async def main():
+        await cookie_cache.set(USER_ID, COOKIES)
+        service = WildberriesAuthService(None)
+        try:
+            return await service.book(BookRequest(phone=phone, supply_id=1, dt=free_date(), user_id=USER_ID))
+        finally:
+            await api.close()
+            auth_service.close_session(phone)
+
+    return asyncio.run(main())
+
+
+def rpc(body, status: int = 200, **kwargs):
+    return lambda request: httpx.Response(status, json=body, **kwargs)
+
+
+def test_booked_over_http_without_a_browser(monkeypatch):
+    result = book(monkeypatch, rpc({"jsonrpc": "2.0", "id": 1, "result": {}}), "79990000001")
+    assert result["success"] and "http_book" in result["timings"]
+    assert not browser_cache.has("79990000001")
+
+
+def test_business_error_is_returned_without_a_browser(monkeypatch):
+    error = {"jsonrpc": "2.0", "id": 1, "error": {"code": 1, "message": "Дата недоступна"}}
+    result = book(monkeypatch, rpc(error), "79990000002")
+    assert result == {"success": False, "message": "Дата недоступна", "timings": result["timings"]}
+    assert "http_book" in result["timings"]
+
+
+@pytest.mark.parametrize("respond", [
+    # Сессия отклонена
+    rpc({"jsonrpc": "2.0", "id": 1, "error": {"code": 401, "message": "unauthorized"}}),
+    # Ошибка HTTP
+    rpc({}, status=502),
+    # HTML вместо ответа API
+    lambda request: httpx.Response(200, text="<html></html>", headers={"content-type": "text/html"}),
+    # JSON, но не ответ JSON-RPC
+    rpc([1, 2, 3]),
+    # Ошибка протокола: метода нет
+    rpc({"jsonrpc": "2.0", "id": 1, "error": {"code": -32601, "message": "Method not found"}}),
+], ids=["session_rejected", "http_error", "html", "not_rpc", "method_not_found"])
+def test_falls_back_to_the_browser(monkeypatch, respond):
+    result = book(monkeypatch, respond, "79990000003")
+    assert result["success"]
+    assert "driver_create" in result["timings"] and "http_book" not in result["timings"]
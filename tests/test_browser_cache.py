@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from domain.auth import auth_service, fake_driver
+from domain.auth.browser_cache import BrowserCache, CachedBrowser
+from domain.auth.session_store import AuthSession
+
+
+class Closer:
+    """Запоминает закрытые браузеры"""
+
+    def __init__(self):
+        self.closed = []
+
+    async def __call__(self, entry: CachedBrowser) -> None:
+        self.closed.append(entry.browser)
+
+
+def test_put_evicts_least_recently_used():
+    async def main():
+        closer = Closer()
+        cache = BrowserCache(closer, max_size=2, idle_timeout=60)
+        cache.start()
+        cache.put("1", "browser 1", "webdriver")
+        cache.put("2", "browser 2", "webdriver")
+        assert cache.take("1", "webdriver") == "browser 1"
+        cache.put("1", "browser 1", "webdriver")
+        cache.put("3", "browser 3", "webdriver")
+        await asyncio.sleep(0.01)
+
+        assert closer.closed == ["browser 2"]
+        assert cache.has("1") and cache.has("3") and not cache.has("2")
+        assert cache.stats()["evicted_size"] == 1
+        await cache.stop()
+        assert sorted(closer.closed) == ["browser 1", "browser 2", "browser 3"]
+
+    asyncio.run(main())
+
+
+def test_take_of_another_backend_closes_the_browser():
+    async def main():
+        closer = Closer()
+        cache = BrowserCache(closer, max_size=2, idle_timeout=60)
+        cache.start()
+        cache.put("1", "cdp browser", "cdp")
+        assert cache.take("1", "webdriver") is None
+        await asyncio.sleep(0.01)
+
+        assert closer.closed == ["cdp browser"] and not cache.has("1")
+        stats = cache.stats()
+        assert stats["misses"] == 1 and stats["evicted_idle"] == 0
+        await cache.stop()
+
+    asyncio.run(main())
+
+
+def test_idle_browsers_are_closed():
+    async def main():
+        closer = Closer()
+        cache = BrowserCache(closer, max_size=2, idle_timeout=0.05)
+        cache.start()
+        cache.put("1", "browser 1", "webdriver")
+        cache.put("2", "browser 2", "webdriver")
+        # Взятый после простоя браузер не отдается, а закрывается
+        cache._entries["1"].last_used = time.monotonic() - 1
+        assert cache.take("1", "webdriver") is None
+        # Остальные закрывает фоновая задача
+        await asyncio.sleep(0.15)
+
+        assert sorted(closer.closed) == ["browser 1", "browser 2"]
+        assert cache.stats()["size"] == 0 and cache.stats()["evicted_idle"] == 2
+        await cache.stop()
+
+    asyncio.run(main())
+
+
+def test_without_cache_booking_closes_the_session_browser_first():
+    phone = "79990000050"
+    session_driver = fake_driver.FakeDriver()
+    # Вход подтвержден, а кэш выключен: браузер сессии так и работает с профилем телефона
+    auth_service.local_drivers[phone] = session_driver
+    auth_service.sessions.save(AuthSession(phone=phone, remote_session_id=session_driver.session_id,
+                                           executor_url="", verified=True))
+
+    driver = auth_service.WildberriesAuthService(None).create_book_driver(phone)
+    driver.quit()
+
+    assert session_driver.session_id not in fake_driver._sessions
+    assert phone not in auth_service.local_drivers and phone not in auth_service.sessions
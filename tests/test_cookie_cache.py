@@ -0,0 +1,56 @@
+from domain.auth.cookie_cache import CookieCache
+
+COOKIES = [{"name": "WBTokenV3", "value": "token", "expire_date": None}]
+
+
+def test_get_returns_a_copy():
+    cache = CookieCache(ttl=60, max_entries=10, max_bytes=10_000)
+    cookies = [dict(cookie) for cookie in COOKIES]
+    cache.set(1, cookies)
+    cookies[0]["value"] = "changed by caller"
+
+    cached = cache.get(1)
+    assert cached == COOKIES
+    cached[0]["value"] = "changed again"
+    assert cache.get(1) == COOKIES
+
+
+def test_set_after_invalidate_is_dropped():
+    cache = CookieCache(ttl=60, max_entries=10, max_bytes=10_000)
+    generation = cache.generation(1)
+    # Пока читали БД, куки перезаписали и сбросили кэш
+    cache.invalidate(1)
+    cache.set(1, COOKIES, generation=generation)
+    assert cache.get(1) is None
+
+    cache.set(1, COOKIES, generation=cache.generation(1))
+    assert cache.get(1) == COOKIES
+
+
+def test_invalidate_of_another_user_does_not_drop_set():
+    cache = CookieCache(ttl=60, max_entries=10, max_bytes=10_000)
+    generation = cache.generation(1)
+    cache.invalidate(2)
+    cache.set(1, COOKIES, generation=generation)
+    assert cache.get(1) == COOKIES
+
+
+def test_forgotten_invalidations_stay_conservative():
+    cache = CookieCache(ttl=60, max_entries=2, max_bytes=10_000)
+    generation = cache.generation(1)
+    for user_id in (1, 2, 3, 4):
+        cache.invalidate(user_id)
+    # Сброс пользователя 1 уже вытеснен из памяти — запись со старым поколением все равно не проходит
+    cache.set(1, COOKIES, generation=generation)
+    assert cache.get(1) is None
+
+
+def test_lru_eviction_by_entries():
+    cache = CookieCache(ttl=60, max_entries=2, max_bytes=10_000)
+    cache.set(1, COOKIES)
+    cache.set(2, COOKIES)
+    cache.get(1)
+    cache.set(3, COOKIES)
+    assert cache.get(2) is None
+    assert cache.get(1) == COOKIES and cache.get(3) == COOKIES
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,299 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from domain.auth.executor import BrowserBusy, BrowserExecutor, check_cancelled, current_queue_wait
+
+
+async def hold(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+async def started(executor: BrowserExecutor, queued: int) -> None:
+    """Дождаться, пока в очереди executor окажется queued сценариев"""
+    for _ in range(100):
+        if len(executor._queue) == queued:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"в очереди {len(executor._queue)} сценариев, ждали {queued}")
+
+
+async def occupy(executor: BrowserExecutor, release: asyncio.Event) -> asyncio.Task:
+    """Занять единственный браузер executor до release"""
+    holder = asyncio.create_task(executor.run("holder", hold, release))
+    for _ in range(100):
+        if executor._busy == executor.max_workers:
+            return holder
+        await asyncio.sleep(0)
+    raise AssertionError("сценарий не занял браузер")
+
+
+def test_queued_flows_run_by_priority():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+        release = asyncio.Event()
+        order = []
+
+        async def flow(name):
+            order.append(name)
+
+        holder = await occupy(executor, release)
+        tasks = [
+            asyncio.create_task(executor.run("1", flow, "watch", flow="watch")),
+            asyncio.create_task(executor.run("2", flow, "book", flow="book")),
+            asyncio.create_task(executor.run("3", flow, "request_auth", flow="request_auth")),
+            asyncio.create_task(executor.run("4", flow, "confirm_auth", flow="confirm_auth")),
+        ]
+        await started(executor, 4)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        assert order == ["confirm_auth", "request_auth", "book", "watch"]
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_same_priority_keeps_arrival_order():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+        release = asyncio.Event()
+        order = []
+
+        async def flow(name):
+            order.append(name)
+
+        holder = await occupy(executor, release)
+        tasks = []
+        for phone in "123":
+            tasks.append(asyncio.create_task(executor.run(phone, flow, phone)))
+            await started(executor, len(tasks))
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        assert order == ["1", "2", "3"]
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=1, queue_timeout=5)
+        release = asyncio.Event()
+        holder = await occupy(executor, release)
+        waiting = asyncio.create_task(executor.run("1", asyncio.sleep, 0))
+        await started(executor, 1)
+
+        with pytest.raises(BrowserBusy) as busy:
+            await executor.run("2", asyncio.sleep, 0)
+        assert busy.value.retry_after >= 1
+        with pytest.raises(BrowserBusy):
+            executor.ensure_capacity("book")
+
+        release.set()
+        await asyncio.gather(holder, waiting)
+        assert executor.stats()["rejected"] == 2
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_close_flow_is_never_rejected():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=0, queue_timeout=0.01)
+        release = asyncio.Event()
+        holder = await occupy(executor, release)
+        closing = asyncio.create_task(executor.run("1", asyncio.sleep, 0, flow="close"))
+        await asyncio.sleep(0.05)
+        assert not closing.done()
+        release.set()
+        await asyncio.gather(holder, closing)
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_queue_timeout_rejects_and_frees_the_queue():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = await occupy(executor, release)
+
+        with pytest.raises(BrowserBusy):
+            await executor.run("1", asyncio.sleep, 0)
+        stats = executor.stats()
+        assert stats["timed_out"] == 1 and stats["queued"] == 0
+
+        release.set()
+        await holder
+        # Браузер освободился — следующий сценарий получает его сразу
+        assert await executor.run("1", asyncio.sleep, 0, "ok") == "ok"
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+        release = asyncio.Event()
+        holder = await occupy(executor, release)
+        waiting = asyncio.create_task(executor.run("1", asyncio.sleep, 0))
+        await started(executor, 1)
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert executor.stats()["queued"] == 0
+
+        release.set()
+        await holder
+        assert executor._busy == 0
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_popped_by_release_does_not_fail():
+    """Отмененную запись вынул _release, пока отмена шла до except в _slot: нет ValueError, слот свободен"""
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+        release = asyncio.Event()
+        holder = await occupy(executor, release)
+        waiting = asyncio.create_task(executor.run("1", asyncio.sleep, 0))
+        await started(executor, 1)
+        future = executor._queue[0][2]
+
+        waiting.cancel()
+        for _ in range(10):
+            if future.cancelled():
+                break
+            await asyncio.sleep(0)
+        if waiting.done():
+            pytest.skip("в этой версии Python отмена доходит до _slot без промежуточного шага")
+
+        # Освобождение браузера в этот момент вынимает отмененную запись из очереди
+        executor._release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert executor._queue == [] and executor._busy == 0
+
+        release.set()
+        await holder
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_slot_handed_to_cancelled_waiter_goes_to_the_next():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+        release = asyncio.Event()
+        holder = await occupy(executor, release)
+        first = asyncio.create_task(executor.run("1", asyncio.sleep, 0, "first"))
+        await started(executor, 1)
+        second = asyncio.create_task(executor.run("2", asyncio.sleep, 0, "second"))
+        await started(executor, 2)
+
+        # Браузер передается первому, но тот отменен раньше, чем успел его занять
+        release.set()
+        await holder
+        first.cancel()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError) or results[0] == "first"
+        assert results[1] == "second"
+        assert executor._busy == 0
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_queue_wait_is_visible_inside_the_flow():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+
+        async def flow():
+            return current_queue_wait()
+
+        assert await executor.run("1", flow) == 0.0
+        assert current_queue_wait() is None
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_flows_of_one_phone_run_one_at_a_time():
+    async def main():
+        executor = BrowserExecutor(max_workers=2, queue_max=10, queue_timeout=5)
+        running = set()
+        overlaps = []
+        parallel = []
+
+        async def flow(name):
+            phone = name[0]
+            if phone in running:
+                overlaps.append(name)
+            running.add(phone)
+            parallel.append(len(running))
+            await asyncio.sleep(0.01)
+            running.discard(phone)
+
+        await asyncio.gather(*(executor.run(name[0], flow, name) for name in ("1a", "1b", "2a", "2b")))
+        assert overlaps == []
+        # Разные телефоны при этом шли параллельно
+        assert max(parallel) == 2
+        assert not executor.is_busy("1") and not executor.is_busy("2")
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_submit_runs_in_the_pool_and_raises_flow_errors():
+    async def main():
+        executor = BrowserExecutor(max_workers=1, queue_max=10, queue_timeout=5)
+
+        def fail():
+            raise ValueError("сломалось")
+
+        assert await executor.submit("1", sum, [1, 2]) == 3
+        with pytest.raises(ValueError):
+            await executor.submit("1", fail)
+        stats = executor.stats()
+        assert stats["completed"] == 1 and stats["failed"] == 1 and stats["running"] == 0
+        executor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancelled_submit_stops_the_flow_before_the_next_one_of_the_phone():
+    async def main():
+        executor = BrowserExecutor(max_workers=2, queue_max=10, queue_timeout=5)
+        started_flow = threading.Event()
+        order = []
+
+        def long_flow():
+            started_flow.set()
+            try:
+                while True:
+                    check_cancelled()
+                    time.sleep(0.005)
+            finally:
+                order.append("long stopped")
+
+        def next_flow():
+            order.append("next")
+
+        first = asyncio.create_task(executor.submit("1", long_flow))
+        await asyncio.to_thread(started_flow.wait, 5)
+        second = asyncio.create_task(executor.submit("1", next_flow))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await second
+        assert order == ["long stopped", "next"]
+        assert executor.stats()["cancelled"] == 1
+        executor.shutdown()
+
+    asyncio.run(main())
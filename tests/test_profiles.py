@@ -0,0 +1,60 @@
+import os
+import threading
+
+import pytest
+
+from domain.auth.profiles import ProfileManager
+
+
+def make_profile(manager: ProfileManager, phone: str, size: int) -> None:
+    os.makedirs(manager.path(phone))
+    with open(os.path.join(manager.path(phone), "data"), "wb") as f:
+        f.write(b"x" * size)
+
+
+def test_quota_evicts_only_inactive_profiles(tmp_path):
+    manager = ProfileManager(str(tmp_path), None, quota_bytes=64 * 1024)
+    make_profile(manager, "1", 64 * 1024)
+    make_profile(manager, "2", 64 * 1024)
+
+    assert manager.enforce_quota(lambda phone: phone == "1") == 1
+    assert os.path.isdir(manager.path("1"))
+    assert not os.path.exists(manager.path("2"))
+
+
+def test_profile_cannot_be_opened_between_check_and_discard(tmp_path):
+    manager = ProfileManager(str(tmp_path), None, quota_bytes=1)
+    make_profile(manager, "1", 64 * 1024)
+    opened = []
+    opener = threading.Thread(target=lambda: opened.append(manager.open("1")))
+
+    def is_active(phone):
+        # Сценарий пытается открыть профиль, пока квота решает его судьбу
+        opener.start()
+        opener.join(0.05)
+        assert opener.is_alive()
+        return False
+
+    assert manager.enforce_quota(is_active) == 1
+    opener.join(1)
+    assert opened == [manager.path("1")]
+    assert manager._phone_locks == {}
+
+
+def test_failed_template_build_leaves_nothing_behind(tmp_path):
+    manager = ProfileManager(str(tmp_path / "profiles"), str(tmp_path / "template"), quota_bytes=1)
+
+    class Driver:
+        def get(self, url):
+            raise RuntimeError("warmup failed")
+
+        def quit(self):
+            pass
+
+    def factory(profile_dir):
+        os.makedirs(profile_dir)
+        return Driver()
+
+    with pytest.raises(RuntimeError):
+        manager.ensure_template(factory, "https://seller.wildberries.ru")
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,66 @@
+import time
+from datetime import datetime, timezone
+
+from domain.auth import auth_service
+from domain.auth.profiles import profile_manager
+from config import WB_COOKIE_DOMAIN
+from domain.auth.session_cookies import cdp_cookies, cookie_rows, live_cookies
+from domain.auth.supply_api import SupplyApi
+
+
+def saved(name: str, expiry: float) -> dict:
+    """Кука так, как ее сохраняет save_cookies и отдает get_user_cookies"""
+    return {"name": name, "value": name, "expire_date": datetime.fromtimestamp(expiry, tz=timezone.utc).isoformat()}
+
+
+def test_expiry_round_trips_in_utc():
+    expiry = int(time.time()) + 3600
+    [param] = cdp_cookies([saved("WBTokenV3", expiry)])
+    assert param["expires"] == expiry
+
+
+def test_expired_cookies_are_skipped_everywhere():
+    now = time.time()
+    cookies = [saved("old", now - 60), saved("new", now + 60), {"name": "session", "value": "s", "expire_date": None}]
+    assert [cookie["name"] for cookie in live_cookies(cookies)] == ["new", "session"]
+    assert SupplyApi.cookie_header(cookies) == "new=new; session=s"
+
+
+def test_same_name_cookies_on_other_domains_are_kept_apart():
+    rows = cookie_rows([
+        {"name": "x", "value": "1", "domain": ".wildberries.ru", "path": "/"},
+        {"name": "x", "value": "2", "domain": "seller.wildberries.ru", "path": "/"},
+        {"name": "x", "value": "3", "domain": ".wildberries.ru", "path": "/api"},
+        {"name": "x", "value": "4", "domain": ".wildberries.ru", "path": "/"},
+    ])
+    assert [(row["value"], row["domain"], row["path"]) for row in rows] == [
+        ("4", ".wildberries.ru", "/"),
+        ("2", "seller.wildberries.ru", "/"),
+        ("3", ".wildberries.ru", "/api"),
+    ]
+
+
+def test_host_only_cookies_are_set_by_url():
+    host, domain, legacy = cdp_cookies([
+        {"name": "__Host-wbx", "value": "h", "domain": "seller.wildberries.ru", "path": "/", "expire_date": None},
+        {"name": "wbx", "value": "d", "domain": ".wildberries.ru", "path": "/api", "expire_date": None},
+        {"name": "old", "value": "o", "expire_date": None},
+    ])
+    assert host["url"] == "https://seller.wildberries.ru/" and "domain" not in host
+    assert (domain["domain"], domain["path"]) == (".wildberries.ru", "/api") and "url" not in domain
+    assert legacy["domain"] == WB_COOKIE_DOMAIN
+
+
+def test_all_expired_jar_books_with_the_phone_profile(monkeypatch):
+    profiles = []
+
+    def create_driver(profile_dir=None):
+        profiles.append(profile_dir)
+        return real_create_driver(profile_dir)
+
+    real_create_driver = auth_service.create_driver
+    monkeypatch.setattr(auth_service, "create_driver", create_driver)
+    phone = "79990000010"
+    driver = auth_service.WildberriesAuthService(None).create_book_driver(phone, [saved("WBTokenV3", time.time() - 60)])
+    driver.quit()
+    assert profiles == [profile_manager.path(phone)]
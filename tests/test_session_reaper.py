@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from domain.auth import session_reaper
+from domain.auth.session_reaper import SessionReaper
+from domain.auth.session_store import AuthSession, InMemorySessionStore
+
+
+def test_sessions_of_other_workers_are_reaped(monkeypatch):
+    monkeypatch.setattr(session_reaper, "STORE_RELOAD_INTERVAL", 0.05)
+    monkeypatch.setattr(session_reaper, "LIVE_REFRESH_INTERVAL", 0.05)
+
+    async def main():
+        store = InMemorySessionStore()
+        closed = []
+
+        def close(phone):
+            closed.append(phone)
+            store.delete(phone)
+
+        reaper = SessionReaper(store, close, ttl=60)
+        reaper.start()
+        # Сессию создал другой воркер (и, может быть, упал): в куче этого процесса ее нет
+        store.save(AuthSession(phone="79990000060", remote_session_id="s", executor_url="",
+                               created_at=datetime.utcnow() - timedelta(seconds=120)))
+        for _ in range(100):
+            if closed:
+                break
+            await asyncio.sleep(0.01)
+        await reaper.stop()
+
+        assert closed == ["79990000060"]
+        assert reaper.stats()["scheduled"] == 0
+
+    asyncio.run(main())
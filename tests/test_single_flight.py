@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from domain.auth.executor import SingleFlight
+
+
+def test_single_flight_joins_concurrent_calls():
+    async def main():
+        flights = SingleFlight()
+        calls = []
+
+        async def flow(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(*(flights.do("1", flow, n) for n in range(3)))
+        assert results == [0, 0, 0] and calls == [0]
+        assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 2}
+        # Закончившийся сценарий не переиспользуется
+        assert await flights.do("1", flow, 5) == 5
+
+    asyncio.run(main())
+
+
+def test_single_flight_cancels_only_when_nobody_waits():
+    async def main():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        cancelled = []
+
+        async def flow():
+            try:
+                await release.wait()
+                return "done"
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        first = asyncio.create_task(flights.do("1", flow))
+        second = asyncio.create_task(flights.do("1", flow))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert cancelled == [] and flights.stats()["in_flight"] == 1
+        release.set()
+        assert await second == "done"
+
+        release.clear()
+        alone = asyncio.create_task(flights.do("2", flow))
+        await asyncio.sleep(0)
+        alone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await alone
+        await asyncio.sleep(0)
+        assert cancelled == [True] and flights.stats()["in_flight"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from domain.auth.auth_service import WildberriesAuthService, slot_watcher
+from domain.auth.slot_watcher import CANCELLED, PhoneAlreadyWatched
+
+
+def far_date() -> date:
+    """Даты с таким сроком в календаре нет: наблюдатель просто опрашивает его"""
+    return date.today() + timedelta(days=400)
+
+
+def test_watch_cancelled_before_its_first_poll_is_released():
+    async def main():
+        phone = "79990000041"
+        watch = slot_watcher.add(phone, 1, far_date())
+        await slot_watcher.cancel(watch.id)
+        assert watch.status == CANCELLED
+        assert not slot_watcher.is_watching(phone)
+        assert slot_watcher.get(watch.id) is watch
+
+    asyncio.run(main())
+
+
+def test_request_auth_is_refused_while_the_phone_is_watched():
+    async def main():
+        phone = "79990000040"
+        watch = slot_watcher.add(phone, 1, far_date())
+        try:
+            with pytest.raises(PhoneAlreadyWatched):
+                await WildberriesAuthService(None).request_auth(phone)
+        finally:
+            await slot_watcher.cancel(watch.id)
+
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+import time
+
+from config import WB_SELLER_URL
+from domain.auth import auth
+from domain.auth.fake_driver import FakeDriver
+from domain.auth.page_state import CODE_SCREEN, LOGGED_IN, WRONG_CODE
+
+
+def code_screen(mode: str = "ok") -> FakeDriver:
+    driver = FakeDriver(mode=mode)
+    auth.request_code(driver, "79990000030")
+    assert auth.wait_code_screen(driver).state == CODE_SCREEN
+    return driver
+
+
+def test_correct_code_logs_in():
+    driver = code_screen()
+    assert auth.verify_code(driver, "123456")["success"]
+    driver.quit()
+
+
+def test_wrong_code_is_rejected():
+    driver = code_screen("wrong_code")
+    result = auth.verify_code(driver, "123456")
+    assert not result["success"] and result["state"] == WRONG_CODE
+    driver.quit()
+
+
+def test_timeout_without_login_is_not_a_success(monkeypatch):
+    driver = code_screen()
+    # Кабинет не отвечает на введенный код: страница так и остается экраном ввода
+    monkeypatch.setattr(driver, "_code_result", lambda: None)
+    monkeypatch.setattr(auth, "CODE_RESULT_TIMEOUT", 0.05)
+    result = auth.verify_code(driver, "123456")
+    assert not result["success"] and result["state"] == CODE_SCREEN
+    driver.quit()
+
+
+def test_wait_code_screen_stops_on_login():
+    driver = FakeDriver()
+    driver.get(WB_SELLER_URL + "/")
+    start = time.monotonic()
+    assert auth.wait_code_screen(driver, timeout=5).state == LOGGED_IN
+    assert time.monotonic() - start < 1
+    driver.quit()